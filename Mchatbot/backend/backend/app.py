@@ -1,23 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, Header, HTTPException, status, WebSocket, WebSocketDisconnect, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import uvicorn
+import asyncio
 import logging
+import time
 from typing import List, Optional
 from datetime import datetime
 
 from models.database import init_db
+from models.db_writer import db_writer
+from models.write_behind import write_behind
 from models.user import User, UserCreate, UserLogin, UserResponse
-from models.chat import ChatMessage, ChatResponse, ChatCreate
-from models.mood import MoodEntry, MoodCreate, MoodAnalytics
+from models.chat import ChatMessage, ChatResponse, ChatCreate, EmotionTrend
+from models.mood import MoodEntry, MoodCreate, MoodAnalytics, MoodDashboard
 from services.auth_service import AuthService
-from services.chat_service import ChatService
+from services.chat_service import TREND_PERIODS, ChatService
 from services.mood_service import MoodService
-from services.ml_service import MLService
-from utils.security import verify_token
+from services.ml_service import get_ml_service
+from services.coping_index import coping_index
+from services.context_cache import context_cache
+from utils.security import verify_admin_token, verify_token, token_verifier
 from utils.exceptions import CustomHTTPException
 from utils.rate_limiter import rate_limit
+from utils import ws_codec
+from utils.memory import get_memory_usage
+from utils.profiler import PROFILE_MAX_SECONDS, install_signal_handler, profiler
+from utils.loop_watchdog import LOOP_WATCHDOG, loop_watchdog
+from utils.tracing import TRACE_SERVER_TIMING, trace
+from utils.metrics import METRICS_ENABLED, CONTENT_TYPE, REGISTRY, Gauge, Histogram, MetricsMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,14 +50,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms (outermost, so CORS and error handling are included)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
+
 # Security
 security = HTTPBearer()
 
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "Open chat WebSocket connections")
+WEBSOCKET_SEND_SECONDS = Histogram("websocket_send_seconds", "Time to encode and send one WebSocket message")
+
 # Initialize services
 auth_service = AuthService()
-chat_service = ChatService()
+ml_service = get_ml_service()
+chat_service = ChatService(ml_service)
 mood_service = MoodService()
-ml_service = MLService()
 
 # WebSocket manager for real-time chat
 class ConnectionManager:
@@ -53,29 +72,42 @@ class ConnectionManager:
         self.active_connections: List[WebSocket] = []
         self.user_connections: dict = {}
         self.user_typing_status: dict = {}
+        self.connection_codecs: dict = {}
 
     async def connect(self, websocket: WebSocket, user_id: int):
-        await websocket.accept()
+        codec, subprotocol = ws_codec.negotiate_codec(websocket)
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
         self.user_connections[user_id] = websocket
-        logger.info(f"User {user_id} connected to WebSocket")
+        self.connection_codecs[websocket] = codec
+        logger.info(f"User {user_id} connected to WebSocket ({codec.name} frames)")
 
     def disconnect(self, websocket: WebSocket, user_id: int):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.connection_codecs.pop(websocket, None)
         if user_id in self.user_connections:
             del self.user_connections[user_id]
         if user_id in self.user_typing_status:
             del self.user_typing_status[user_id]
         logger.info(f"User {user_id} disconnected from WebSocket")
 
+    def get_codec(self, websocket: WebSocket):
+        return self.connection_codecs.get(websocket, ws_codec.JSON_CODEC)
+
+    async def receive_message(self, websocket: WebSocket) -> dict:
+        return await ws_codec.receive_message(websocket, self.get_codec(websocket))
+
     async def send_personal_message(self, message: dict, user_id: int):
         if user_id in self.user_connections:
+            websocket = self.user_connections[user_id]
+            started = time.perf_counter()
             try:
-                await self.user_connections[user_id].send_json(message)
+                await ws_codec.send_message(websocket, self.get_codec(websocket), message)
+                WEBSOCKET_SEND_SECONDS.observe(time.perf_counter() - started)
             except Exception as e:
                 logger.error(f"Failed to send message to user {user_id}: {e}")
-                await self.disconnect(self.user_connections[user_id], user_id)
+                self.disconnect(websocket, user_id)
 
     async def broadcast_typing_status(self, user_id: int, is_typing: bool):
         """Broadcast typing status to all connected users"""
@@ -84,9 +116,14 @@ class ConnectionManager:
             "user_id": user_id,
             "is_typing": is_typing
         }
+        # Encode once per codec rather than once per connection
+        encoded = {}
         for connection in self.active_connections:
+            codec = self.get_codec(connection)
+            if codec.name not in encoded:
+                encoded[codec.name] = codec.encode(message)
             try:
-                await connection.send_json(message)
+                await ws_codec.send_encoded(connection, codec, encoded[codec.name])
             except Exception as e:
                 logger.error(f"Failed to broadcast typing status: {e}")
 
@@ -99,14 +136,28 @@ class ConnectionManager:
         }, user_id)
 
 manager = ConnectionManager()
+WEBSOCKET_CONNECTIONS.set_function(lambda: len(manager.active_connections))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and ML models on startup"""
     init_db()
+    write_behind.replay()
+    coping_index.load()
     await ml_service.initialize()
+    install_signal_handler(asyncio.get_running_loop())
+    if LOOP_WATCHDOG:
+        loop_watchdog.start(asyncio.get_running_loop())
     logger.info("Mchatbot API started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered writes and release worker pools"""
+    await loop_watchdog.stop()
+    auth_service.password_hasher.shutdown()
+    await write_behind.close()
+    db_writer.shutdown()
+
 # Authentication endpoints
 @app.post("/api/auth/register", response_model=UserResponse)
 @rate_limit("auth", "register")
@@ -130,10 +181,17 @@ async def register(user_data: UserCreate):
 
 @app.post("/api/auth/login")
 @rate_limit("auth", "login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks):
     """Authenticate user and return JWT token"""
     try:
         result = await auth_service.authenticate_user(credentials)
+        if result.get("rehash"):
+            # Upgrade outdated password hashes after the response is sent
+            background_tasks.add_task(
+                auth_service.upgrade_password_hash,
+                password=credentials.password,
+                **result["rehash"]
+            )
         return {
             "access_token": result["access_token"],
             "token_type": "bearer",
@@ -152,40 +210,49 @@ async def login(credentials: UserLogin):
 @rate_limit("chat", "message")
 async def send_message(
     message_data: ChatCreate,
+    response: Response,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """Send a message to the chatbot"""
     try:
         user_id = verify_token(credentials.credentials)
         
-        # Analyze emotion and sentiment
-        emotion_analysis = await ml_service.analyze_emotion(message_data.content)
-        sentiment_analysis = await ml_service.analyze_sentiment(message_data.content)
-        sentiment = sentiment_analysis.get("sentiment", "neutral")
-        
-        # Save user message
-        user_message = await chat_service.save_message(
-            user_id=user_id,
-            content=message_data.content,
-            is_user=True,
-            emotion_score=emotion_analysis.get("distress_level", 0),
-            sentiment=sentiment
-        )
-        
-        # Generate AI response
-        ai_response = await chat_service.generate_response(
-            user_id=user_id,
-            user_message=message_data.content,
-            emotion_analysis=emotion_analysis,
-            sentiment=sentiment
-        )
-        
-        # Save AI response
-        ai_message = await chat_service.save_message(
-            user_id=user_id,
-            content=ai_response,
-            is_user=False
-        )
+        with trace("chat.turn", transport="http", user_id=user_id) as turn:
+            # Analyze emotion and sentiment
+            emotion_analysis, sentiment = await chat_service.analyze_message(message_data.content)
+            
+            # Save user message
+            user_message = await chat_service.save_message(
+                user_id=user_id,
+                content=message_data.content,
+                is_user=True,
+                emotion_score=emotion_analysis.get("distress_level", 0),
+                sentiment=sentiment,
+                detected_emotions=emotion_analysis.get("emotions"),
+                intent=chat_service.detect_intent(message_data.content)
+            )
+            
+            # Generate AI response
+            ai_response, response_type = await chat_service.generate_reply(
+                user_id=user_id,
+                user_message=message_data.content,
+                emotion_analysis=emotion_analysis,
+                sentiment=sentiment
+            )
+            
+            # Save AI response (buffered when write-behind is enabled)
+            ai_message = await chat_service.save_message(
+                user_id=user_id,
+                content=ai_response,
+                is_user=False,
+                response_type=response_type,
+                defer=True
+            )
+            
+        # Empty when tracing is off
+        server_timing = turn.server_timing() if TRACE_SERVER_TIMING else ""
+        if server_timing:
+            response.headers["Server-Timing"] = server_timing
         
         return ChatResponse(
             id=ai_message.id,
@@ -221,6 +288,33 @@ async def get_chat_history(
             error_code="HISTORY_ERROR"
         )
 
+@app.get("/api/chat/emotion-trend", response_model=EmotionTrend)
+@rate_limit("chat", "analytics")
+async def get_chat_emotion_trend(
+    days: int = 30,
+    period: str = "day",
+    materialize: bool = False,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Average distress and sentiment mix of the user's chat messages per day or week"""
+    if days < 1 or period not in TREND_PERIODS:
+        raise CustomHTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"days must be positive and period one of {', '.join(TREND_PERIODS)}",
+            error_code="INVALID_TREND_REQUEST"
+        )
+    try:
+        user_id = verify_token(credentials.credentials)
+        trend = await chat_service.get_emotion_trend(user_id, days, period, materialize)
+        return trend
+    except Exception as e:
+        logger.error(f"Chat emotion trend error: {str(e)}")
+        raise CustomHTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve chat emotion trend",
+            error_code="EMOTION_TREND_ERROR"
+        )
+
 # Mood tracking endpoints
 @app.post("/api/mood/entry", response_model=dict)
 @rate_limit("mood", "entry")
@@ -278,10 +372,33 @@ async def get_mood_history(
             error_code="MOOD_HISTORY_ERROR"
         )
 
+@app.get("/api/mood/dashboard", response_model=MoodDashboard)
+@rate_limit("mood", "analytics")
+async def get_mood_dashboard(
+    days: int = 30,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Get mood history and analytics in one response"""
+    try:
+        user_id = verify_token(credentials.credentials)
+        dashboard = await mood_service.get_mood_dashboard(user_id, days)
+        return dashboard
+    except Exception as e:
+        logger.error(f"Mood dashboard error: {str(e)}")
+        raise CustomHTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve mood dashboard",
+            error_code="MOOD_DASHBOARD_ERROR"
+        )
+
 # WebSocket endpoint for real-time chat
 @app.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket, token: str):
-    """WebSocket endpoint for real-time chat"""
+    """WebSocket endpoint for real-time chat
+
+    Frames are JSON text by default. Clients can negotiate MessagePack
+    binary frames with the ``msgpack`` subprotocol or ``?encoding=msgpack``.
+    """
     try:
         user_id = verify_token(token)
         await manager.connect(websocket, user_id)
@@ -291,7 +408,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
         
         while True:
             try:
-                data = await websocket.receive_json()
+                data = await manager.receive_message(websocket)
                 message_type = data.get("type", "message")
                 
                 if message_type == "message":
@@ -303,35 +420,38 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                         "is_typing": True
                     }, user_id)
                     
-                    # Analyze emotion and sentiment
-                    emotion_analysis = await ml_service.analyze_emotion(content)
-                    sentiment_analysis = await ml_service.analyze_sentiment(content)
-                    sentiment = sentiment_analysis.get("sentiment", "neutral")
-                    
-                    # Save user message
-                    user_message = await chat_service.save_message(
-                        user_id=user_id,
-                        content=content,
-                        is_user=True,
-                        emotion_score=emotion_analysis.get("distress_level", 0),
-                        sentiment=sentiment
-                    )
-                    
-                    # Generate AI response
-                    ai_response = await chat_service.generate_response(
-                        user_id=user_id,
-                        user_message=content,
-                        emotion_analysis=emotion_analysis,
-                        sentiment=sentiment
-                    )
-                    
-                    # Save AI response
-                    ai_message = await chat_service.save_message(
-                        user_id=user_id,
-                        content=ai_response,
-                        is_user=False
-                    )
-                    
+                    with trace("chat.turn", transport="websocket", user_id=user_id) as turn:
+                        # Analyze emotion and sentiment
+                        emotion_analysis, sentiment = await chat_service.analyze_message(content)
+                        
+                        # Save user message
+                        user_message = await chat_service.save_message(
+                            user_id=user_id,
+                            content=content,
+                            is_user=True,
+                            emotion_score=emotion_analysis.get("distress_level", 0),
+                            sentiment=sentiment,
+                            detected_emotions=emotion_analysis.get("emotions"),
+                            intent=chat_service.detect_intent(content)
+                        )
+                        
+                        # Generate AI response
+                        ai_response, response_type = await chat_service.generate_reply(
+                            user_id=user_id,
+                            user_message=content,
+                            emotion_analysis=emotion_analysis,
+                            sentiment=sentiment
+                        )
+                        
+                        # Save AI response (buffered when write-behind is enabled)
+                        ai_message = await chat_service.save_message(
+                            user_id=user_id,
+                            content=ai_response,
+                            is_user=False,
+                            response_type=response_type,
+                            defer=True
+                        )
+                        
                     # Stop typing indicator
                     await manager.send_personal_message({
                         "type": "typing_indicator",
@@ -339,19 +459,25 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                     }, user_id)
                     
                     # Send AI response
-                    await manager.send_personal_message({
+                    reply = {
                         "type": "message",
                         "id": ai_message.id,
                         "content": ai_response,
                         "is_user": False,
                         "timestamp": ai_message.timestamp.isoformat(),
                         "emotion_analysis": emotion_analysis
-                    }, user_id)
+                    }
+                    stage_timings = turn.stage_timings() if TRACE_SERVER_TIMING else {}
+                    if stage_timings:
+                        reply["server_timing"] = stage_timings
+                    await manager.send_personal_message(reply, user_id)
                     
                 elif message_type == "typing_status":
                     is_typing = data.get("is_typing", False)
                     await manager.broadcast_typing_status(user_id, is_typing)
                     
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"Error processing WebSocket message: {e}")
                 await manager.send_personal_message({
@@ -378,6 +504,87 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness check: 503 until the emotion model has finished warming up"""
+    readiness = ml_service.get_readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={**readiness, "timestamp": datetime.utcnow().isoformat()}
+    )
+
+@app.get("/api/health/memory")
+async def memory_health():
+    """Resident memory of the worker serving this request (unique vs shared)"""
+    return get_memory_usage()
+
+@app.get("/api/health/auth")
+async def auth_health():
+    """Password hashing pool and token cache statistics"""
+    return {
+        "password_hashing": auth_service.password_hasher.get_stats(),
+        "token_cache": token_verifier.get_stats()
+    }
+
+@app.get("/api/health/ml")
+async def ml_health():
+    """Emotion inference backend, batching and load-shedding statistics"""
+    return ml_service.get_stats()
+
+@app.get("/api/health/chat")
+async def chat_health():
+    """Conversation context cache, coping strategy index and database writer statistics"""
+    return {
+        "context_cache": context_cache.get_stats(),
+        "coping_index": coping_index.get_stats(),
+        "db_writer": db_writer.get_stats(),
+        "write_behind": write_behind.get_stats()
+    }
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics of the worker serving this request"""
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/admin/profile", include_in_schema=False)
+async def profile_worker(seconds: float = 10, format: str = "collapsed", x_admin_token: Optional[str] = Header(None)):
+    """Sample this worker's stacks and event-loop lag for ``seconds``
+
+    Returns collapsed stacks for flame graph tools, or with ``format=json``
+    the stacks together with the loop lag statistics.
+    """
+    verify_admin_token(x_admin_token)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or format not in ("collapsed", "json"):
+        raise CustomHTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}] and format collapsed or json",
+            error_code="INVALID_PROFILE_REQUEST"
+        )
+    try:
+        result = await profiler.profile(seconds)
+    except RuntimeError:
+        raise CustomHTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running in this worker",
+            error_code="PROFILER_BUSY"
+        )
+    if format == "json":
+        return result
+    return PlainTextResponse(
+        result["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{result["pid"]}.collapsed"'}
+    )
+
+@app.get("/api/admin/loop-blockers", include_in_schema=False)
+async def loop_blockers(reset: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Call sites that blocked this worker's event loop, worst first (LOOP_WATCHDOG)"""
+    verify_admin_token(x_admin_token)
+    report = loop_watchdog.get_report()
+    if reset:
+        loop_watchdog.reset()
+    return report
+
 # Exception handlers
 @app.exception_handler(CustomHTTPException)
 async def custom_exception_handler(request, exc: CustomHTTPException):
@@ -396,5 +603,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        ws_per_message_deflate=True
     )
\ No newline at end of file
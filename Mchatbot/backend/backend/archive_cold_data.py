@@ -0,0 +1,31 @@
+"""
+Move old chat messages and mood entries out of the database into
+compressed month files (see models/archive.py). Safe to re-run, e.g. daily
+from cron; reads keep seeing archived rows.
+
+Usage:
+    python archive_cold_data.py [--hot-months N]
+"""
+
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from models.archive import ARCHIVE_DIR, ARCHIVE_HOT_MONTHS, archive_cold_months
+from models.database import init_db
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hot-months", type=int, default=ARCHIVE_HOT_MONTHS, help="months kept in the database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    archived = archive_cold_months(hot_months=args.hot_months)
+    for table, months in archived.items():
+        total = sum(months.values())
+        print(f"{table}: {total} rows from {len(months)} months archived to {ARCHIVE_DIR}")
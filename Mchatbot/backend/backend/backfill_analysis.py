@@ -0,0 +1,57 @@
+"""
+Fill in emotion, sentiment, intent and response type on chat messages
+saved before they were recorded (see services/analysis_backfill.py).
+Resumes from its checkpoint file; safe to interrupt and re-run.
+
+Usage:
+    python backfill_analysis.py [--chunk-size N] [--batch-size N] [--workers N] [--rule-based] [--from-start]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from models.database import init_db
+from services.analysis_backfill import BACKFILL_CHECKPOINT, AnalysisBackfill
+from services.chat_service import ChatService
+from services.ml_service import get_ml_service
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows read and updated per transaction")
+    parser.add_argument("--batch-size", type=int, default=32, help="texts per emotion model call")
+    parser.add_argument("--workers", type=int, default=2, help="inference threads")
+    parser.add_argument("--limit", type=int, help="stop after this many rows")
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT)
+    parser.add_argument("--rule-based", action="store_true", help="skip the emotion model, use keyword detection")
+    parser.add_argument("--from-start", action="store_true", help="ignore the checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    ml_service = get_ml_service()
+    if args.rule_based:
+        try:
+            ml_service.sentiment_analyzer = ml_service._load_sentiment_analyzer()
+        except Exception as e:
+            logging.warning(f"VADER unavailable ({type(e).__name__}); scoring sentiment with TextBlob")
+    else:
+        # Sentiment analyzer and (unless ML_WARMUP=disabled) the emotion model
+        ml_service.preload()
+    backfill = AnalysisBackfill(
+        ml_service,
+        ChatService(ml_service),
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        use_model=not args.rule_based
+    )
+    result = asyncio.run(backfill.run(from_start=args.from_start, limit=args.limit))
+    print(f"backfilled {result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/s), "
+          f"last id {result['last_id']}")
@@ -0,0 +1,160 @@
+"""
+Helpers shared by the benchmark scripts: latency percentiles, result files
+with run metadata, and comparison of two result files.
+
+Result files are JSON objects with a ``meta`` block (commit, time, host)
+and a ``results`` mapping of ``{name: {metric: value}}``. Metrics ending in
+``_ms`` or ``_ns`` are lower-is-better; ``*_per_sec`` and ``*_rps`` are
+higher-is-better; anything else is informational.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import platform
+import subprocess
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float], percentiles=(50, 95, 99)) -> Dict:
+    """Request count and percentiles/max in milliseconds of latencies in seconds"""
+    summary = {"requests": len(latencies)}
+    for pct in percentiles:
+        summary[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 2)
+    summary["max_ms"] = round(max(latencies) * 1000, 2) if latencies else 0.0
+    return summary
+
+
+def git_revision() -> Tuple[str, bool]:
+    """Short commit of the working tree and whether it has local changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BENCHMARKS_DIR, capture_output=True, text=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_metadata(benchmark: str, params: Optional[Dict] = None) -> Dict:
+    commit, dirty = git_revision()
+    return {
+        "benchmark": benchmark,
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params or {}
+    }
+
+
+def save_results(benchmark: str, results: Dict, path: Optional[str] = None, params: Optional[Dict] = None) -> str:
+    """Write results with run metadata; defaults to results/<benchmark>-<commit>-<time>.json"""
+    document = {"meta": run_metadata(benchmark, params), "results": results}
+    if path is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{document['meta']['commit']}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _direction(metric: str) -> int:
+    """1 if higher is better, -1 if lower is better, 0 if not compared"""
+    if metric.endswith(("_per_sec", "_rps")):
+        return 1
+    if metric.endswith(("_ms", "_ns")):
+        return -1
+    return 0
+
+
+def compare_results(baseline: Dict, current: Dict, threshold_pct: float) -> List[Dict]:
+    """Per-metric changes between two result documents
+
+    A change is a regression when the metric got worse by more than
+    ``threshold_pct`` percent.
+    """
+    rows = []
+    for name, current_metrics in current["results"].items():
+        baseline_metrics = baseline["results"].get(name)
+        if not baseline_metrics:
+            continue
+        for metric, value in current_metrics.items():
+            direction = _direction(metric)
+            old = baseline_metrics.get(metric)
+            if not direction or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change_pct = (value - old) / old * 100
+            rows.append({
+                "name": name,
+                "metric": metric,
+                "baseline": old,
+                "current": value,
+                "change_pct": round(change_pct, 1),
+                "regression": -direction * change_pct > threshold_pct
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict], baseline: Dict, current: Dict):
+    print(f"baseline {baseline['meta']['commit']} ({baseline['meta']['created_at']})  "
+          f"current {current['meta']['commit']} ({current['meta']['created_at']})")
+    width = max([28] + [len(row["name"]) + 2 for row in rows])
+    print(f"{'benchmark':<{width}}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:<{width}}{row['metric']:<16}{row['baseline']:>12}{row['current']:>12}"
+            f"{row['change_pct']:>+9.1f}%{flag}"
+        )
+
+
+def compare_main(argv=None):
+    """CLI: compare two result files, exit 1 on regressions
+
+    Usage: python -m benchmarks.common BASELINE.json CURRENT.json [--threshold PCT]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    rows = compare_results(baseline, current, args.threshold)
+    print_comparison(rows, baseline, current)
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    compare_main()
@@ -0,0 +1,125 @@
+"""
+Chat write throughput under concurrent chat turns, per SQLite profile.
+
+Each chat turn saves a user message and an AI reply through
+``ChatService.save_message``. ``--clients`` concurrent clients per process
+run turns back to back, in ``--processes`` processes sharing one database
+file (as API workers do). Profiles:
+  - default:     rollback journal, synchronous=FULL (the old engine settings)
+  - wal:         WAL, synchronous=NORMAL, mmap/cache/busy_timeout pragmas
+  - wal+writer:  wal, with writes routed through the group-commit writer
+
+With ``--database-url`` (e.g. the PostgreSQL from docker-compose.yml) the
+SQLite pragmas do not apply, and the profiles are ``direct`` and ``writer``.
+
+Reported: turns/sec across all processes and per-save latency percentiles.
+
+Run from the backend directory:
+    python -m benchmarks.db_write_throughput [--turns N] [--clients N] [--processes N] [--json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "default": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "DB_SINGLE_WRITER": "false"},
+    "wal": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "DB_SINGLE_WRITER": "false"},
+    "wal+writer": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL", "DB_SINGLE_WRITER": "true"},
+}
+SERVER_PROFILES = {
+    "direct": {"DB_SINGLE_WRITER": "false"},
+    "writer": {"DB_SINGLE_WRITER": "true"},
+}
+
+INIT = "from models.database import init_db; init_db()"
+
+PROBE = r"""
+import asyncio, json, sys, time
+from services.chat_service import ChatService
+
+clients, turns = int(sys.argv[1]), int(sys.argv[2])
+service = ChatService()
+latencies = []
+
+async def client(user_id):
+    for turn in range(turns):
+        for is_user in (True, False):
+            started = time.perf_counter()
+            await service.save_message(user_id, f"turn {turn} message", is_user, sentiment="neutral")
+            latencies.append(time.perf_counter() - started)
+
+async def main():
+    started = time.perf_counter()
+    await asyncio.gather(*[client(user_id) for user_id in range(1, clients + 1)])
+    return time.perf_counter() - started
+
+elapsed = asyncio.run(main())
+print(json.dumps({"elapsed": elapsed, "latencies": latencies}))
+"""
+
+
+def run_profile(name, args):
+    workdir = tempfile.mkdtemp(prefix="mchatbot-bench-")
+    if args.database_url:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATABASE_URL=args.database_url, **SERVER_PROFILES[name])
+    else:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATABASE_URL="sqlite:///./bench.db", **PROFILES[name])
+    subprocess.run([sys.executable, "-c", INIT], cwd=workdir, env=env, check=True, capture_output=True)
+
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", PROBE, str(args.clients), str(args.turns)],
+            cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        for _ in range(args.processes)
+    ]
+    results = []
+    for worker in workers:
+        stdout, stderr = worker.communicate()
+        if worker.returncode:
+            raise RuntimeError(f"{name} worker failed:\n{stderr}")
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    elapsed = max(result["elapsed"] for result in results)
+    total_turns = args.turns * args.clients * args.processes
+    return {
+        "turns": total_turns,
+        "turns_per_sec": round(total_turns / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50, help="turns per client")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients per process")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--profiles", help="comma-separated, default all")
+    parser.add_argument("--database-url", help="benchmark this database instead of a scratch SQLite file")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(",") if args.profiles else list(SERVER_PROFILES if args.database_url else PROFILES)
+    report = {name: run_profile(name, args) for name in profiles}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'profile':<12}{'turns/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in report.items():
+        print(f"{name:<12}{row['turns_per_sec']:>10}{row['p50_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Emotion inference latency and accuracy by message length.
+
+Messages of 1 to ~1000 characters (the ChatCreate limit) are built from
+emotional sentences and grouped by token length. For each bucket:
+  - latency of one message per model call, for the original untruncated
+    call, truncation only, and sentence-chunked scoring
+  - agreement with the untruncated scores: how often the dominant emotion
+    matches, and the mean absolute score difference
+Then a mixed-length batch is timed padded as one call vs length-bucketed.
+
+"Accuracy" is measured against the full-length model output, not labels;
+it shows what truncation and chunking change, not model quality.
+
+Needs the emotion model (set ML_BUNDLE_DIR/ML_OFFLINE to use a bundle).
+Run from the backend directory:
+    python -m benchmarks.emotion_length_buckets [--messages N] [--max-length N] [--json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from services.ml_service import ML_MAX_SEQ_LENGTH, MLService
+
+SENTENCES = [
+    "I have been feeling really down for the past few weeks.",
+    "Work has been overwhelming and I can't keep up with anything.",
+    "Honestly today was a good day and I felt calm for once.",
+    "My chest gets tight every time I think about the exam.",
+    "I am so angry at how my friend treated me at the party.",
+    "Nothing seems to matter much anymore and I feel empty.",
+    "I finally went for a walk and it helped a little bit.",
+    "I keep worrying that something terrible is about to happen.",
+    "My family doesn't understand what I'm going through.",
+    "I was surprised by how much better I slept last night.",
+    "Everything feels pointless when I wake up in the morning.",
+    "I'm excited about the trip but nervous about the flight.",
+]
+
+BUCKETS = [16, 32, 64, 128, 256]
+
+
+def build_messages(count, seed=7):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        sentences = rng.randint(1, 18)
+        text = " ".join(rng.choice(SENTENCES) for _ in range(sentences))
+        messages.append(text[:1000])
+    return messages
+
+
+def bucket_label(length):
+    lower = 0
+    for bound in BUCKETS:
+        if length <= bound:
+            return f"{lower + 1}-{bound}"
+        lower = bound
+    return f">{BUCKETS[-1]}"
+
+
+def to_scores(result):
+    return {item["label"].lower(): item["score"] for item in result}
+
+
+def dominant(scores):
+    return max(scores.items(), key=lambda item: item[1])[0]
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(args):
+    service = MLService()
+    service._load_emotion_model()
+    if service.emotion_pipeline is None:
+        raise SystemExit(f"Emotion model not available: {service.model_load_error}")
+    pipe = service.emotion_pipeline
+    tokenizer = pipe.tokenizer
+    model_max = tokenizer.model_max_length if tokenizer.model_max_length < 100000 else 512
+
+    messages = build_messages(args.messages)
+    lengths = [len(ids) for ids in tokenizer(messages)["input_ids"]]
+    # Warm up kernels before timing
+    pipe(messages[:4])
+
+    modes = {
+        "full": lambda text: to_scores(pipe(text, truncation=True, max_length=model_max)[0]),
+        "truncate": lambda text: service._predict_emotions_batch([text], args.max_length, chunk_long_texts=False)[0],
+        "chunk": lambda text: service._predict_emotions_batch([text], args.max_length, chunk_long_texts=True)[0],
+    }
+
+    rows = {}
+    for text, length in zip(messages, lengths):
+        row = rows.setdefault(bucket_label(length), {"messages": 0, **{mode: {"ms": [], "agree": [], "abs_diff": []} for mode in modes}})
+        row["messages"] += 1
+        reference = None
+        for mode, predict in modes.items():
+            scores, elapsed = timed(lambda: predict(text))
+            if reference is None:
+                reference = scores
+            row[mode]["ms"].append(elapsed)
+            row[mode]["agree"].append(dominant(scores) == dominant(reference))
+            row[mode]["abs_diff"].append(statistics.mean(abs(scores.get(k, 0.0) - v) for k, v in reference.items()))
+
+    report = {"max_length": args.max_length, "buckets": {}}
+    for label in sorted(rows, key=lambda l: int(l.lstrip(">").split("-")[0])):
+        row = rows[label]
+        report["buckets"][label] = {"messages": row["messages"]}
+        for mode in modes:
+            stats = row[mode]
+            report["buckets"][label][mode] = {
+                "mean_ms": round(statistics.mean(stats["ms"]), 2),
+                "agreement": round(sum(stats["agree"]) / len(stats["agree"]), 3),
+                "mean_abs_diff": round(statistics.mean(stats["abs_diff"]), 4),
+            }
+
+    # One mixed-length batch: padded to the longest vs one call per length bucket
+    batch = messages[:args.batch_size]
+    _, padded_ms = timed(lambda: pipe(batch, batch_size=len(batch), truncation=True, max_length=args.max_length))
+    _, bucketed_ms = timed(lambda: service._predict_emotions_batch(batch, args.max_length, chunk_long_texts=False))
+    report["mixed_batch"] = {
+        "size": len(batch),
+        "padded_ms": round(padded_ms, 2),
+        "bucketed_ms": round(bucketed_ms, 2),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=120)
+    parser.add_argument("--max-length", type=int, default=ML_MAX_SEQ_LENGTH)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"max_length={report['max_length']}")
+    print(f"{'tokens':<10}{'n':>5}  {'full ms':>8}{'trunc ms':>9}{'chunk ms':>9}  {'trunc agree':>11}{'chunk agree':>12}  {'trunc diff':>10}{'chunk diff':>11}")
+    for label, row in report["buckets"].items():
+        print(
+            f"{label:<10}{row['messages']:>5}  {row['full']['mean_ms']:>8}{row['truncate']['mean_ms']:>9}{row['chunk']['mean_ms']:>9}"
+            f"  {row['truncate']['agreement']:>11}{row['chunk']['agreement']:>12}"
+            f"  {row['truncate']['mean_abs_diff']:>10}{row['chunk']['mean_abs_diff']:>11}"
+        )
+    mixed = report["mixed_batch"]
+    print(f"mixed batch of {mixed['size']}: padded {mixed['padded_ms']} ms, length-bucketed {mixed['bucketed_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Deterministic stand-ins for the emotion pipeline and the VADER sentiment
+analyzer, so API benchmarks run offline and give the same analysis for the
+same text on every run.
+
+``FakeEmotionPipeline`` has the call signature and output shape of the
+transformers text-classification pipeline used by ``MLService`` (including
+``.tokenizer`` for length bucketing) and sleeps ``latency_ms`` per call plus
+``per_item_ms`` per text to stand in for model cost.
+"""
+
+import hashlib
+import time
+from typing import Dict, List
+
+LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class FakeTokenizer:
+    """Whitespace tokenizer with the parts of the HF tokenizer API MLService uses"""
+
+    def num_special_tokens_to_add(self, pair: bool = False) -> int:
+        return 2
+
+    def __call__(self, texts, add_special_tokens: bool = True, **kwargs) -> Dict[str, List[List[int]]]:
+        if isinstance(texts, str):
+            texts = [texts]
+        extra = 2 if add_special_tokens else 0
+        return {"input_ids": [[0] * (len(text.split()) + extra) for text in texts]}
+
+
+class FakeEmotionPipeline:
+    def __init__(self, latency_ms: float = 5.0, per_item_ms: float = 0.5):
+        self.latency = latency_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self.tokenizer = FakeTokenizer()
+        self.calls = 0
+
+    def __call__(self, texts, **kwargs) -> List[List[Dict]]:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        self.calls += 1
+        time.sleep(self.latency + self.per_item * len(texts))
+        results = []
+        for text in texts:
+            weights = [b + 1 for b in _digest(text)[:len(LABELS)]]
+            total = sum(weights)
+            results.append([{"label": label, "score": weight / total} for label, weight in zip(LABELS, weights)])
+        return results[0] if single else results
+
+
+class FakeSentimentAnalyzer:
+    """VADER-shaped polarity scores derived from the text hash"""
+
+    def polarity_scores(self, text: str) -> Dict[str, float]:
+        compound = round(_digest(text)[0] / 127.5 - 1, 4)
+        positive = max(compound, 0.0)
+        negative = max(-compound, 0.0)
+        return {"neg": negative, "neu": round(1 - positive - negative, 4), "pos": positive, "compound": compound}
+
+
+def install(ml_service, latency_ms: float = 5.0, per_item_ms: float = 0.5):
+    """Put the fakes into ``ml_service`` before it initializes, so nothing is loaded"""
+    ml_service.emotion_pipeline = FakeEmotionPipeline(latency_ms, per_item_ms)
+    ml_service.sentiment_analyzer = FakeSentimentAnalyzer()
@@ -0,0 +1,238 @@
+"""
+Offline load test of the API against a seeded database and a fake model.
+
+Seeds a scratch database (see benchmarks/seed.py), starts the API with
+uvicorn in a separate process with the emotion and sentiment models
+replaced by deterministic fakes (benchmarks/fake_model.py) and rate limits
+lifted, then drives each scenario with ``--clients`` concurrent closed-loop
+clients for ``--duration`` seconds:
+  - chat:   POST /api/chat/message
+  - ws:     /ws/chat message -> reply round trip
+  - mood:   GET /api/mood/analytics?days=30
+  - login:  POST /api/auth/login (bcrypt/argon2 cost included)
+
+Reports throughput and p50/p95/p99 per scenario and saves them as JSON
+(benchmarks/results/ by default, not committed) for comparison across
+commits:
+    python -m benchmarks.common OLD.json NEW.json [--threshold 10]
+
+Run from the backend directory:
+    python -m benchmarks.load_test [--scenarios chat,ws,mood,login] [--clients 16] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.seed import BENCH_PASSWORD, USER_MESSAGES, email_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["chat", "ws", "mood", "login"]
+
+
+def serve(port: int, fake_model_ms: float):
+    """Server process: the real app with fake models and no rate limits"""
+    import uvicorn
+
+    from app import app, ml_service
+    from benchmarks import fake_model
+    from utils.rate_limiter import rate_limiter
+
+    fake_model.install(ml_service, latency_ms=fake_model_ms)
+    logging.disable(logging.INFO)
+    rate_limiter.limits = {"default": 10 ** 9}
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", ws="websockets")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def access_token(user_id: int) -> str:
+    from datetime import datetime, timedelta
+    from jose import jwt
+
+    from utils.security import ALGORITHM, SECRET_KEY
+
+    return jwt.encode({"sub": str(user_id), "exp": datetime.utcnow() + timedelta(hours=1)}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def run_clients(clients: int, duration: float, request, states):
+    """Closed loop: each client sends its next request when the last one returns
+
+    ``states[index]`` is client ``index``'s scratch space (e.g. its
+    WebSocket) and carries over from the warm-up run.
+    """
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client(index):
+        nonlocal errors
+        state = states[index]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            ok = await request(index, state)
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(index) for index in range(clients)])
+    elapsed = time.perf_counter() - started
+    return {"throughput_rps": round(len(latencies) / elapsed, 1), "errors": errors, **latency_summary(latencies)}
+
+
+async def run_scenario(name, base_url, tokens, user_ids, args):
+    import httpx
+    import websockets
+
+    rng = random.Random(name)
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        if name == "chat":
+            async def request(index, state):
+                token = tokens[index % len(tokens)]
+                response = await http.post(
+                    "/api/chat/message",
+                    json={"content": rng.choice(USER_MESSAGES)},
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                return response.status_code == 200
+
+        elif name == "mood":
+            async def request(index, state):
+                token = tokens[index % len(tokens)]
+                response = await http.get("/api/mood/analytics?days=30", headers={"Authorization": f"Bearer {token}"})
+                return response.status_code == 200
+
+        elif name == "login":
+            async def request(index, state):
+                state["n"] = state.get("n", index) + args.clients
+                email = email_for(state["n"] % len(user_ids))
+                response = await http.post("/api/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+                return response.status_code == 200
+
+        elif name == "ws":
+            ws_url = base_url.replace("http://", "ws://")
+            connections = []
+
+            async def request(index, state):
+                if "ws" not in state:
+                    state["ws"] = await websockets.connect(f"{ws_url}/ws/chat?token={tokens[index % len(tokens)]}")
+                    connections.append(state["ws"])
+                    json.loads(await state["ws"].recv())  # greeting
+                    return True
+                connection = state["ws"]
+                await connection.send(json.dumps({"type": "message", "content": rng.choice(USER_MESSAGES)}))
+                while True:
+                    frame = json.loads(await connection.recv())
+                    if frame.get("type") == "message":
+                        return True
+                    if frame.get("type") == "error":
+                        return False
+
+        else:
+            raise ValueError(f"unknown scenario {name}")
+
+        # Warm caches, pools and connections outside the measured window
+        states = [{} for _ in range(args.clients)]
+        await run_clients(args.clients, args.warmup, request, states)
+        result = await run_clients(args.clients, args.duration, request, states)
+        if name == "ws":
+            await asyncio.gather(*[connection.close() for connection in connections])
+        return result
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("API server exited during start-up")
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50, help="seeded chat messages per user")
+    parser.add_argument("--mood-entries", type=int, default=60, help="seeded mood entries per user")
+    parser.add_argument("--fake-model-ms", type=float, default=5.0, help="simulated emotion model latency per call")
+    parser.add_argument("--database-url", help="use this (empty) database instead of a scratch SQLite file")
+    parser.add_argument("--output", help="result file (default benchmarks/results/load_test-<commit>-<time>.json)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.fake_model_ms)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    workdir = tempfile.mkdtemp(prefix="mchatbot-load-")
+    env = dict(
+        os.environ,
+        PYTHONPATH=BACKEND_DIR,
+        DATABASE_URL=args.database_url or f"sqlite:///{workdir}/load.db",
+        SECRET_KEY=os.getenv("SECRET_KEY", "load-test-secret"),
+        ARCHIVE_DIR=os.path.join(workdir, "archive"),
+        WRITE_BEHIND_DIR=os.path.join(workdir, "write_behind")
+    )
+    os.environ.update(env)
+    logging.disable(logging.INFO)
+
+    from benchmarks.seed import seed_database
+
+    seeded = seed_database(args.users, args.messages, args.mood_entries)
+    print(f"seeded {seeded['users']} users, {seeded['messages']} messages, {seeded['mood_entries']} mood entries")
+    user_ids = seeded["user_ids"]
+    tokens = [access_token(user_id) for user_id in user_ids]
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--serve", str(port), "--fake-model-ms", str(args.fake_model_ms)],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        wait_for_server(base_url, server)
+        results = {}
+        for name in scenarios:
+            results[name] = asyncio.run(run_scenario(name, base_url, tokens, user_ids, args))
+            row = results[name]
+            print(f"{name:<8}{row['throughput_rps']:>10} req/s  p50 {row['p50_ms']:>8} ms  "
+                  f"p95 {row['p95_ms']:>8} ms  p99 {row['p99_ms']:>8} ms  errors {row['errors']}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    params = {key: value for key, value in vars(args).items() if key not in ("serve", "output", "database_url")}
+    params["database"] = "custom" if args.database_url else "sqlite"
+    path = save_results("load_test", results, args.output, params)
+    print(f"results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Chat-endpoint latency while a burst of logins is in flight.
+
+Drives the real FastAPI app in-process (httpx ASGI transport) against a
+throwaway SQLite database. For each password hashing mode it measures
+/api/chat/message latency first on its own, then while ``--logins``
+concurrent /api/auth/login requests are running, and reports p50/p99 for
+both windows together with the login wall time and hashing queue stats.
+
+Run from the backend directory:
+    python -m benchmarks.login_storm [--logins 50] [--modes inline,thread,process]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import latency_summary
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(latencies):
+    return latency_summary(latencies, percentiles=(50, 99))
+
+
+async def chat_probe(client, token, interval, stop, latencies):
+    """Issue chat requests at a fixed rate.
+
+    Latency is measured from when each request was *due*, so time the event
+    loop spends blocked before the request could even start is counted
+    (a closed-loop probe would silently skip it).
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+    while not stop.is_set():
+        due += interval
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        response = await client.post("/api/chat/message", json={"content": "I had a long day at work"}, headers=headers)
+        latencies.append(loop.time() - due)
+        if response.status_code != 200:
+            raise RuntimeError(f"chat request failed: {response.status_code} {response.text}")
+
+
+async def measure_chat(client, token, clients, interval, duration=None, during=None):
+    """Run chat probes for a fixed duration, or for as long as ``during`` runs"""
+    stop = asyncio.Event()
+    latencies = []
+    probes = [asyncio.create_task(chat_probe(client, token, interval, stop, latencies)) for _ in range(clients)]
+    result = None
+    if during is not None:
+        result = await during
+    else:
+        await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*probes)
+    return latencies, result
+
+
+async def login_storm(client, emails, password):
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post("/api/auth/login", json={"email": email, "password": password})
+        for email in emails
+    ])
+    failures = [r.status_code for r in responses if r.status_code != 200]
+    if failures:
+        raise RuntimeError(f"{len(failures)} logins failed: {failures[:5]}")
+    return time.perf_counter() - started
+
+
+async def run(args):
+    import httpx
+
+    from app import app, auth_service
+    from models.database import SessionLocal, UserModel, init_db
+    from utils.password_hasher import PasswordHasher
+    from utils.rate_limiter import rate_limiter
+
+    # The benchmark is about the event loop, not about throttling
+    rate_limiter.limits = {"default": 10 ** 9}
+    init_db()
+
+    password = "benchmark-password"
+    hashed = auth_service.pwd_context.hash(password)
+    db = SessionLocal()
+    try:
+        users = [
+            UserModel(email=f"storm{i}@example.com", name=f"Storm {i}", hashed_password=hashed)
+            for i in range(args.logins + 1)
+        ]
+        db.add_all(users)
+        db.commit()
+        chat_user_id = users[-1].id
+        emails = [user.email for user in users[:-1]]
+    finally:
+        db.close()
+
+    token = auth_service.create_access_token({"sub": str(chat_user_id)})
+    results = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for mode in args.modes:
+            auth_service.password_hasher.shutdown()
+            auth_service.password_hasher = PasswordHasher(auth_service.pwd_context, mode=mode)
+
+            # Warm the pool so worker start-up is not billed to the storm
+            await auth_service.password_hasher.verify(password, hashed)
+
+            interval = args.chat_interval_ms / 1000
+            idle, _ = await measure_chat(client, token, args.chat_clients, interval, duration=args.idle_seconds)
+            busy, login_seconds = await measure_chat(
+                client, token, args.chat_clients, interval, during=login_storm(client, emails, password)
+            )
+            results[mode] = {
+                "chat_idle": summarize(idle),
+                "chat_during_logins": summarize(busy),
+                "login_wall_seconds": round(login_seconds, 2),
+                "hashing": auth_service.password_hasher.get_stats()
+            }
+
+    auth_service.password_hasher.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--chat-clients", type=int, default=4)
+    parser.add_argument("--chat-interval-ms", type=float, default=50.0, help="per-client request interval")
+    parser.add_argument("--idle-seconds", type=float, default=3.0)
+    parser.add_argument("--modes", default="inline,thread,process")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+
+    logging.disable(logging.INFO)
+
+    # Keep the benchmark database out of the working tree
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(tempfile.mkdtemp(prefix="mchatbot-bench-"))
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<10}{'idle p99 ms':>14}{'storm p50 ms':>15}{'storm p99 ms':>15}{'logins s':>11}{'avg wait ms':>14}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<10}{stats['chat_idle']['p99_ms']:>14}{stats['chat_during_logins']['p50_ms']:>15}"
+            f"{stats['chat_during_logins']['p99_ms']:>15}{stats['login_wall_seconds']:>11}"
+            f"{stats['hashing']['avg_wait_ms']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
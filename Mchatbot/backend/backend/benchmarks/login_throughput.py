@@ -0,0 +1,88 @@
+"""
+Login throughput at each password hashing cost setting.
+
+Login cost is dominated by password verification, so this drives
+``PasswordHasher.verify`` (the same path /api/auth/login uses) with enough
+concurrent callers to keep every pool worker busy, and reports logins/sec
+and mean latency for each setting.
+
+Settings are given as ``scheme:key=value,...``, for example:
+    python -m benchmarks.login_throughput \\
+        --setting bcrypt:rounds=10 --setting bcrypt:rounds=12 \\
+        --setting argon2:time_cost=2,memory_cost=19456,parallelism=1
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from utils.password_hasher import PASSWORD_HASH_POOL, PASSWORD_HASH_WORKERS, PasswordHasher, build_password_context
+
+DEFAULT_SETTINGS = [
+    "bcrypt:rounds=10",
+    "bcrypt:rounds=12",
+    "bcrypt:rounds=13",
+    "argon2:time_cost=2,memory_cost=19456,parallelism=1",
+    "argon2:time_cost=3,memory_cost=65536,parallelism=4",
+]
+
+
+def parse_setting(spec):
+    scheme, _, params = spec.partition(":")
+    settings = {}
+    for pair in filter(None, params.split(",")):
+        key, _, value = pair.partition("=")
+        settings[f"{scheme}__{key.strip()}"] = value.strip()
+    return scheme, settings
+
+
+async def measure(spec, logins, mode, workers):
+    scheme, settings = parse_setting(spec)
+    context = build_password_context([scheme], settings)
+    hasher = PasswordHasher(context, mode=mode, max_workers=workers)
+    password = "benchmark-password"
+    try:
+        hashed = await hasher.hash(password)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[hasher.verify(password, hashed) for _ in range(logins)])
+        elapsed = time.perf_counter() - started
+        assert all(results)
+
+        stats = hasher.get_stats()
+        return {
+            "logins_per_second": round(logins / elapsed, 2),
+            "avg_verify_ms": stats["avg_run_ms"],
+            "avg_queue_wait_ms": stats["avg_wait_ms"]
+        }
+    finally:
+        hasher.shutdown(wait=True)
+
+
+async def run(args):
+    return {spec: await measure(spec, args.logins, args.mode, args.workers) for spec in args.setting}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--setting", action="append", help="scheme:key=value,... (repeatable)")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--mode", default=PASSWORD_HASH_POOL, choices=["process", "thread"])
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.setting = args.setting or DEFAULT_SETTINGS
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'setting':<55}{'logins/s':>10}{'verify ms':>11}{'wait ms':>10}")
+    for spec, stats in results.items():
+        print(f"{spec:<55}{stats['logins_per_second']:>10}{stats['avg_verify_ms']:>11}{stats['avg_queue_wait_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Micro-benchmarks of MLService and MoodService internals.
+
+Each case times one call of a hot helper (best of ``--repeat`` runs, each
+auto-ranged to at least ``--min-time`` seconds) and reports nanoseconds
+per call as ``op_ns``:
+  - ml.*:   rule-based emotion detection, crisis keywords and distress level
+            on a short and a long message, cache keys, and cache inserts
+            into a full cache (so every 100th insert evicts)
+  - mood.*: trend, correlations and insights over synthetic entry lists of
+            each ``--sizes`` length
+
+Sized cases also get a ``<group>:scaling`` row with the log-log slope of
+time against size (1.0 is linear); a slope well above the expected one
+points at a complexity blow-up before the absolute numbers get large, and
+``--compare`` also fails when a slope grows by more than 0.25.
+
+Baselines are machine-specific and kept out of git under
+benchmarks/results/:
+    python -m benchmarks.micro --save-baseline      # record this machine's baseline
+    python -m benchmarks.micro --compare            # exit 1 if any case is >25% slower
+
+Run from the backend directory:
+    python -m benchmarks.micro [--filter mood.] [--sizes 10,100,1000,10000] [--threshold 25]
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import itertools
+import logging
+import math
+import os
+import random
+import re
+import sys
+import timeit
+
+from benchmarks.common import RESULTS_DIR, compare_results, load_results, print_comparison, save_results
+
+BASELINE_PATH = os.path.join(RESULTS_DIR, "micro-baseline.json")
+# Increase of the log-log slope that fails --compare
+SCALING_TOLERANCE = 0.25
+
+SHORT_MESSAGE = "I've been so anxious and worried about work, I can't sleep."
+LONG_MESSAGE = " ".join([
+    "I have been feeling really down and hopeless for the past few weeks.",
+    "Work has been overwhelming and I'm frustrated that I can't keep up.",
+    "Some days are good and I feel calm, but mostly I'm tired and nervous.",
+] * 10)
+
+MOOD_EMOTIONS = ["happy", "sad", "anxious", "calm", "grateful", "tired", "frustrated", "content", "worried", "excited"]
+
+
+def time_call(func, min_time: float, repeat: int) -> float:
+    """Best-of-``repeat`` nanoseconds per call of ``func``"""
+    timer = timeit.Timer(func)
+    number = 1
+    elapsed = timer.timeit(number)
+    while elapsed < min_time / 10 and number < 10 ** 7:
+        number *= 10
+        elapsed = timer.timeit(number)
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9
+
+
+def mood_entries(count: int, seed: int = 3):
+    """``count`` decoded mood entries, oldest first, one per six hours"""
+    from models.mood import MoodEntry
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [
+        MoodEntry(
+            id=i + 1,
+            user_id=1,
+            mood_score=rng.randint(1, 10),
+            emotions=rng.sample(MOOD_EMOTIONS, rng.randint(1, 3)),
+            energy_level=rng.randint(1, 10),
+            stress_level=rng.randint(1, 10),
+            sleep_quality=rng.randint(1, 10),
+            timestamp=start + timedelta(hours=6 * i)
+        )
+        for i in range(count)
+    ]
+
+
+def ml_cases():
+    """(name, callable) pairs for MLService helpers"""
+    from services.ml_service import MLService
+
+    ml = MLService()
+    emotions = ml._rule_based_emotion_detection(LONG_MESSAGE)
+    cases = []
+    for label, text in (("short", SHORT_MESSAGE), ("long", LONG_MESSAGE)):
+        cases += [
+            (f"ml.rule_based_emotion_detection[{label}]", lambda text=text: ml._rule_based_emotion_detection(text)),
+            (f"ml.detect_crisis_keywords[{label}]", lambda text=text: ml._detect_crisis_keywords(text)),
+            (f"ml.get_cache_key[{label}]", lambda text=text: ml._get_cache_key(text, "emotion")),
+        ]
+    cases.append(("ml.calculate_distress_level", lambda: ml._calculate_distress_level(emotions)))
+
+    # Inserts of new keys into a cache kept at capacity: the steady state
+    # of a busy server, where eviction runs every 100 inserts
+    for capacity in (ml.max_cache_size, ml.max_cache_size * 10):
+        owner = MLService()
+        owner.max_cache_size = capacity
+        cache = {}
+        keys = (f"key-{n}" for n in itertools.count())
+        result = {"emotions": emotions}
+        for _ in range(capacity):
+            owner._add_to_cache(cache, next(keys), result)
+        cases.append((
+            f"ml.add_to_cache_full[n={capacity}]",
+            lambda owner=owner, cache=cache, keys=keys, result=result: owner._add_to_cache(cache, next(keys), result)
+        ))
+    return cases
+
+
+def mood_cases(sizes):
+    from services.mood_service import MoodService
+
+    mood = MoodService()
+    cases = []
+    for size in sizes:
+        entries = mood_entries(size)
+        average = sum(entry.mood_score for entry in entries) / size
+        trend = mood._calculate_trend(entries)
+        emotion_count = mood._calculate_emotion_frequency(entries)
+        cases += [
+            (f"mood.calculate_trend[n={size}]", lambda entries=entries: mood._calculate_trend(entries)),
+            (f"mood.calculate_correlations[n={size}]", lambda entries=entries: mood._calculate_correlations(entries)),
+            (
+                f"mood.generate_insights[n={size}]",
+                lambda entries=entries, average=average, trend=trend, emotion_count=emotion_count:
+                    mood._generate_insights(entries, average, trend, emotion_count)
+            ),
+        ]
+    return cases
+
+
+_SIZED = re.compile(r"^(?P<group>.+)\[n=(?P<size>\d+)\]$")
+
+
+def scaling(results):
+    """Log-log slope of op_ns against n for each sized group"""
+    groups = {}
+    for name, row in results.items():
+        match = _SIZED.match(name)
+        if match:
+            groups.setdefault(match["group"], []).append((int(match["size"]), row["op_ns"]))
+    slopes = {}
+    for group, points in groups.items():
+        points.sort()
+        (small_n, small_ns), (large_n, large_ns) = points[0], points[-1]
+        if large_n > small_n and small_ns > 0:
+            slopes[f"{group}:scaling"] = {
+                "exponent": round(math.log(large_ns / small_ns) / math.log(large_n / small_n), 2),
+                "sizes": f"{small_n}-{large_n}"
+            }
+    return slopes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="mood entry list sizes")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=25.0, help="allowed slowdown in percent for --compare")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {os.path.relpath(BASELINE_PATH)}")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, metavar="BASELINE",
+                        help="compare with a result file (default: the saved baseline)")
+    parser.add_argument("--output", help="result file (default benchmarks/results/micro-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    cases = [(name, func) for name, func in ml_cases() + mood_cases(sizes) if args.filter in name]
+
+    results = {}
+    for name, func in cases:
+        results[name] = {"op_ns": round(time_call(func, args.min_time, args.repeat), 1)}
+        print(f"{name:<44}{results[name]['op_ns']:>14,.1f} ns/op")
+    for name, row in scaling(results).items():
+        results[name] = row
+        print(f"{name:<44}{row['exponent']:>14} (log-log slope, n={row['sizes']})")
+
+    params = {"sizes": sizes, "min_time": args.min_time, "repeat": args.repeat, "filter": args.filter}
+    path = save_results("micro", results, BASELINE_PATH if args.save_baseline else args.output, params)
+    print(f"results saved to {path}")
+
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"no baseline at {args.compare}; record one with --save-baseline")
+            sys.exit(2)
+        baseline = load_results(args.compare)
+        current = load_results(path)
+        rows = compare_results(baseline, current, args.threshold)
+        print()
+        print_comparison(rows, baseline, current)
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            print(f"\n{len(regressions)} cases are more than {args.threshold}% slower than the baseline")
+        # A growing slope is a complexity change even while sizes are small
+        steeper = [
+            name for name, row in current["results"].items()
+            if "exponent" in row and name in baseline["results"]
+            and row["exponent"] - baseline["results"][name]["exponent"] > SCALING_TOLERANCE
+        ]
+        for name in steeper:
+            print(f"{name} scales worse: slope {baseline['results'][name]['exponent']} -> {current['results'][name]['exponent']}")
+        if regressions or steeper:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
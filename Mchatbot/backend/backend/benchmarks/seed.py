@@ -0,0 +1,136 @@
+"""
+Fill a database with synthetic users, chat messages and mood entries.
+
+Everything is derived from ``--seed``, so the same arguments always produce
+the same data. Users are ``bench<N>@example.com`` with password
+``benchmark-password``; history is spread over the last ``--days`` days.
+
+Run from the backend directory (DATABASE_URL selects the database):
+    python -m benchmarks.seed [--users N] [--messages N] [--mood-entries N] [--days N]
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict
+import argparse
+import json
+import random
+import time
+
+BENCH_PASSWORD = "benchmark-password"
+
+USER_MESSAGES = [
+    "I had a long day at work and I'm exhausted.",
+    "I've been feeling anxious about my exams all week.",
+    "Today was actually pretty good, I went for a walk.",
+    "I can't sleep and my thoughts keep racing.",
+    "My friend and I had an argument and I feel awful.",
+    "I'm feeling a bit lonely since I moved to the new city.",
+    "Work is stressful but I'm managing somehow.",
+    "I feel grateful for my family today.",
+    "Everything feels overwhelming right now.",
+    "I tried the breathing exercise and it helped a little.",
+]
+REPLIES = [
+    "Thank you for sharing that with me. How has your day been overall?",
+    "It sounds like you're carrying a lot right now. What's weighing on you most?",
+    "I'm glad to hear that! What's been contributing to these positive feelings?",
+    "That sounds really hard. Would you like to try a grounding exercise together?",
+]
+EMOTIONS = ["happy", "sad", "anxious", "calm", "grateful", "tired", "frustrated", "content", "worried", "excited"]
+TRIGGERS = ["work", "sleep", "family", "exercise", "social", "weather", "health"]
+ACTIVITIES = ["walk", "reading", "meditation", "gym", "friends", "cooking", "music"]
+
+
+def email_for(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def seed_database(users: int = 200, messages: int = 50, mood_entries: int = 60, days: int = 90, seed: int = 1) -> Dict:
+    """Insert synthetic data; returns row counts and the seeded user ids"""
+    from sqlalchemy import insert
+
+    from models.database import SessionLocal, ChatMessageModel, MoodEntryModel, UserModel, init_db
+    from services.auth_service import AuthService
+
+    init_db()
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    span_seconds = days * 86400
+    started = time.perf_counter()
+
+    # One hash for everyone: seeding should not take minutes of bcrypt
+    hashed = AuthService().pwd_context.hash(BENCH_PASSWORD)
+    db = SessionLocal()
+    try:
+        db.execute(insert(UserModel.__table__), [
+            {"email": email_for(i), "name": f"Bench User {i}", "hashed_password": hashed, "is_active": True}
+            for i in range(users)
+        ])
+        user_ids = [
+            user_id for (user_id,) in
+            db.query(UserModel.id).filter(UserModel.email.like("bench%@example.com")).order_by(UserModel.id)
+        ][-users:]
+
+        message_rows, mood_rows = [], []
+        for user_id in user_ids:
+            # Pairs of user message and reply, oldest first
+            offsets = sorted((rng.randrange(span_seconds) for _ in range(messages // 2)), reverse=True)
+            for offset in offsets:
+                timestamp = now - timedelta(seconds=offset)
+                distress = round(rng.random(), 3)
+                message_rows.append({
+                    "user_id": user_id, "content": rng.choice(USER_MESSAGES), "is_user": True,
+                    "timestamp": timestamp, "sentiment": rng.choice(["positive", "negative", "neutral"]),
+                    "emotion_score": distress, "escalation_triggered": False
+                })
+                message_rows.append({
+                    "user_id": user_id, "content": rng.choice(REPLIES), "is_user": False,
+                    "timestamp": timestamp + timedelta(seconds=1), "sentiment": None,
+                    "emotion_score": None, "escalation_triggered": False
+                })
+            for offset in sorted((rng.randrange(span_seconds) for _ in range(mood_entries)), reverse=True):
+                mood_rows.append({
+                    "user_id": user_id,
+                    "mood_score": rng.randint(1, 10),
+                    "emotions": json.dumps(rng.sample(EMOTIONS, rng.randint(1, 3))),
+                    "energy_level": rng.randint(1, 10),
+                    "stress_level": rng.randint(1, 10),
+                    "sleep_quality": rng.randint(1, 10),
+                    "triggers": json.dumps(rng.sample(TRIGGERS, rng.randint(0, 2))),
+                    "activities": json.dumps(rng.sample(ACTIVITIES, rng.randint(0, 2))),
+                    "timestamp": now - timedelta(seconds=offset)
+                })
+
+        if message_rows:
+            db.execute(insert(ChatMessageModel.__table__), message_rows)
+        if mood_rows:
+            db.execute(insert(MoodEntryModel.__table__), mood_rows)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "users": len(user_ids),
+        "messages": len(message_rows),
+        "mood_entries": len(mood_rows),
+        "user_ids": user_ids,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50, help="chat messages per user (half are replies)")
+    parser.add_argument("--mood-entries", type=int, default=60, help="mood entries per user")
+    parser.add_argument("--days", type=int, default=90, help="history spread over this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    seeded = seed_database(args.users, args.messages, args.mood_entries, args.days, args.seed)
+    print(f"seeded {seeded['users']} users, {seeded['messages']} messages, "
+          f"{seeded['mood_entries']} mood entries in {seeded['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Event-loop blocking by sentiment scoring, on the loop vs on the executor.
+
+``--messages`` distinct messages are scored by ``--concurrency`` concurrent
+callers while a probe task measures how late the loop wakes up from 1 ms
+sleeps. Modes:
+  - inline:  scoring called directly in the coroutine (how
+             analyze_sentiment worked before it moved to the executor)
+  - batched: MLService.analyze_sentiment (micro-batched on the executor)
+  - bulk:    one MLService.analyze_sentiment_batch call for all messages
+
+Reported: messages/sec, total loop lag (time the loop was held beyond
+the probe's sleep) and lag p50/p99/max. Uses VADER when its lexicon is
+available (see ML_BUNDLE_DIR), else the TextBlob fallback.
+
+Run from the backend directory:
+    python -m benchmarks.sentiment_loop_blocking [--messages 2000] [--concurrency 32] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from services.ml_service import MLService
+from utils.profiler import lag_summary
+
+SENTENCES = [
+    "I have been feeling really down for the past few weeks.",
+    "Work has been overwhelming and I can't keep up with anything.",
+    "Honestly today was a good day and I felt calm for once.",
+    "I am so angry at how my friend treated me at the party.",
+    "I finally went for a walk and it helped a little bit.",
+    "I keep worrying that something terrible is about to happen.",
+    "I'm excited about the trip but nervous about the flight.",
+]
+
+MODES = ["inline", "batched", "bulk"]
+
+
+def build_messages(count, seed=11):
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 4)))} ({i})" for i in range(count)]
+
+
+async def probe_lag(stop: asyncio.Event, lags, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run_mode(ml: MLService, mode: str, messages, concurrency: int):
+    ml.sentiment_cache.clear()
+    queue = list(reversed(messages))
+
+    async def inline_caller():
+        while queue:
+            ml._score_sentiment(queue.pop())
+            await asyncio.sleep(0)
+
+    async def batched_caller():
+        while queue:
+            await ml.analyze_sentiment(queue.pop())
+
+    lags, stop = [], asyncio.Event()
+    probe = asyncio.ensure_future(probe_lag(stop, lags))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    if mode == "bulk":
+        await ml.analyze_sentiment_batch(messages, use_cache=False)
+    else:
+        caller = inline_caller if mode == "inline" else batched_caller
+        await asyncio.gather(*[caller() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    summary = lag_summary(lags)
+    return {
+        "messages_per_sec": round(len(messages) / elapsed, 1),
+        "loop_lag_total_ms": round(sum(lags) * 1000, 1),
+        "lag_p50_ms": summary["p50_ms"],
+        "lag_p99_ms": summary["p99_ms"],
+        "lag_max_ms": summary["max_ms"],
+    }
+
+
+async def run(args):
+    ml = MLService()
+    try:
+        ml.sentiment_analyzer = ml._load_sentiment_analyzer()
+        analyzer = "vader"
+    except Exception as e:
+        analyzer = f"textblob ({type(e).__name__} loading VADER)"
+    messages = build_messages(args.messages)
+    # Warm imports (TextBlob corpora) and the executor threads
+    await ml.analyze_sentiment_batch(messages[:10], use_cache=False)
+    results = {mode: await run_mode(ml, mode, messages, args.concurrency) for mode in args.modes}
+    ml.executor.shutdown(wait=False)
+    return analyzer, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+
+    logging.disable(logging.WARNING)
+    analyzer, results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps({"analyzer": analyzer, "results": results}, indent=2))
+        return
+
+    print(f"analyzer: {analyzer}")
+    print(f"{'mode':<10}{'msgs/s':>10}{'loop lag ms':>14}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for mode, row in results.items():
+        print(
+            f"{mode:<10}{row['messages_per_sec']:>10}{row['loop_lag_total_ms']:>14}"
+            f"{row['lag_p50_ms']:>12}{row['lag_p99_ms']:>12}{row['lag_max_ms']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
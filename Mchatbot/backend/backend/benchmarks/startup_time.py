@@ -0,0 +1,95 @@
+"""
+Import time, startup time and time-to-ready for the API.
+
+Each measurement runs in a fresh interpreter so module caches do not hide
+import cost. Reported per run:
+  - ml_service_import: ``import services.ml_service``
+  - app_import:        ``import app`` (all services, models and routes)
+  - startup:           the FastAPI startup handler (what blocks serving)
+  - ready:             until ``/api/ready`` would report ready
+
+Environment variables (ML_OFFLINE, ML_BUNDLE_DIR, ML_WARMUP, ...) are passed
+through, so compare modes by running e.g.:
+    ML_WARMUP=blocking python -m benchmarks.startup_time
+    ML_WARMUP=background ML_OFFLINE=true ML_BUNDLE_DIR=./ml_bundle python -m benchmarks.startup_time
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import services.ml_service
+t1 = time.perf_counter()
+import app
+t2 = time.perf_counter()
+
+async def start():
+    await app.startup_event()
+    t3 = time.perf_counter()
+    while not app.ml_service.is_ready:
+        await asyncio.sleep(0.01)
+    return t3, time.perf_counter()
+
+t3, t4 = asyncio.run(start())
+print(json.dumps({
+    "ml_service_import": t1 - t0,
+    "app_import": t2 - t1,
+    "startup": t3 - t2,
+    "ready": t4 - t2,
+    "model_loaded": app.ml_service.emotion_pipeline is not None,
+}))
+"""
+
+
+def run_once():
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    # Run from a scratch directory so the SQLite file is not created in the tree
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=tempfile.mkdtemp(prefix="mchatbot-bench-"),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    phases = ["ml_service_import", "app_import", "startup", "ready"]
+    summary = {
+        phase: {
+            "median_s": round(statistics.median(run[phase] for run in runs), 3),
+            "max_s": round(max(run[phase] for run in runs), 3)
+        }
+        for phase in phases
+    }
+    summary["model_loaded"] = all(run["model_loaded"] for run in runs)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"{'phase':<20}{'median s':>10}{'max s':>10}")
+    for phase in phases:
+        print(f"{phase:<20}{summary[phase]['median_s']:>10}{summary[phase]['max_s']:>10}")
+    print(f"model loaded: {summary['model_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
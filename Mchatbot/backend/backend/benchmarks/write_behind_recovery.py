@@ -0,0 +1,143 @@
+"""
+Crash recovery of the write-behind journal, including pid reuse.
+
+Each scenario leaves journal segments behind as a crashed worker would,
+starts a fresh WriteBehindBuffer on a scratch SQLite database, replays,
+enqueues one new row and closes, then checks which rows reached the
+database and what is left in the journal directory:
+  - dead-pid:     segment of a process that no longer exists
+  - same-pid:     segment of a previous instance with this process's pid
+                  (a container restart where the worker is PID 1 again)
+  - legacy-pid:   same, with the older ``<pid>-<n>.jsonl`` name
+  - live-sibling: segment of another instance that is still running; it
+                  must be left alone
+
+Run from the backend directory:
+    python -m benchmarks.write_behind_recovery [--rows 50] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+SCENARIOS = ["dead-pid", "same-pid", "legacy-pid", "live-sibling"]
+
+
+def dead_pid():
+    """Pid of a process that has exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def journal_rows(first_id, count, user_id=1):
+    from models.write_behind import _encode
+    return [
+        _encode({
+            "id": first_id + i,
+            "user_id": user_id,
+            "content": f"journaled reply {first_id + i}",
+            "is_user": False,
+            "timestamp": datetime.utcnow(),
+            "response_type": "conversational",
+            "escalation_triggered": False
+        })
+        for i in range(count)
+    ]
+
+
+async def run_scenario(name, rows, root):
+    from models.database import SessionLocal, ChatMessageModel, UserModel
+    from models.write_behind import WriteBehindBuffer, _decode
+
+    journal_dir = os.path.join(root, name)
+    os.makedirs(journal_dir)
+    db = SessionLocal()
+    db.query(ChatMessageModel).delete()
+    if db.get(UserModel, 1) is None:
+        db.add(UserModel(id=1, email="recovery@example.com", name="recovery", hashed_password="x"))
+    db.commit()
+    db.close()
+
+    sibling = None
+    if name == "live-sibling":
+        sibling = WriteBehindBuffer(journal_dir=journal_dir, flush_interval_ms=60000)
+        sibling._open_segment()
+        left_path = sibling._segment.name
+        sibling._segment.write("\n".join(journal_rows(1, rows)) + "\n")
+        sibling._segment.flush()
+    else:
+        owner = {
+            "dead-pid": f"{dead_pid()}-0badc0de",
+            "same-pid": f"{os.getpid()}-0badc0de",
+            "legacy-pid": f"{os.getpid()}"
+        }[name]
+        left_path = os.path.join(journal_dir, f"{owner}-1.jsonl")
+        with open(left_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(journal_rows(1, rows)) + "\n")
+
+    buffer = WriteBehindBuffer(journal_dir=journal_dir)
+    replayed = buffer.replay()
+    new_id = rows + 1000
+    buffer.enqueue(_decode(journal_rows(new_id, 1)[0]))
+    await buffer.close()
+
+    db = SessionLocal()
+    ids = {id_ for (id_,) in db.query(ChatMessageModel.id)}
+    db.close()
+    left = sorted(os.listdir(journal_dir))
+    # Only a running sibling's segment (and its lock file) may remain
+    expected_left = []
+    if sibling is not None:
+        expected_left.append(os.path.basename(left_path))
+        if sibling._lock_file is not None:
+            expected_left.append(os.path.basename(sibling._lock_file.name))
+        sibling._rotate_segment()
+        sibling._release_lock()
+
+    ok = (
+        new_id in ids
+        and len(ids) == (1 if sibling is not None else rows + 1)
+        and left == sorted(expected_left)
+    )
+    return {"replayed": replayed, "rows_in_db": len(ids), "journal_left": left, "ok": ok}
+
+
+async def run(args):
+    root = tempfile.mkdtemp(prefix="write-behind-recovery-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(root, 'recovery.db')}"
+    from models.database import init_db
+    init_db()
+    return {name: await run_scenario(name, args.rows, root) for name in args.scenarios}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50, help="journaled rows left behind per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+
+    logging.disable(logging.WARNING)
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<14}{'replayed':>10}{'rows in db':>12}  journal left  result")
+        for name, row in results.items():
+            print(
+                f"{name:<14}{row['replayed']:>10}{row['rows_in_db']:>12}  "
+                f"{len(row['journal_left']):>12}  {'ok' if row['ok'] else 'FAILED'}"
+            )
+    sys.exit(0 if all(row["ok"] for row in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
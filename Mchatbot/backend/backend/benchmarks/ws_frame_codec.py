@@ -0,0 +1,122 @@
+"""
+Benchmark /ws/chat frame size and serialization cost per encoding.
+
+Compares the JSON text frames produced by the original ``send_json`` path
+against the negotiated codecs in ``utils.ws_codec``, with and without
+permessage-deflate (raw DEFLATE, as negotiated by browsers and the
+``websockets`` server).
+
+Run from the backend directory:
+    python -m benchmarks.ws_frame_codec [--iterations N] [--json]
+"""
+
+import argparse
+import json
+import timeit
+import zlib
+from datetime import datetime
+
+from utils.ws_codec import JSON_CODEC, MSGPACK_CODEC
+
+
+def sample_frames():
+    """Representative server->client frames for one chat turn"""
+    emotion_analysis = {
+        "dominant_emotion": "sadness",
+        "distress_level": 0.7213498711585999,
+        "emotions": {
+            "anger": 0.012449126876890659,
+            "disgust": 0.0051237922161817551,
+            "fear": 0.15386344492435455,
+            "joy": 0.0041352589614689350,
+            "neutral": 0.08829174935817719,
+            "sadness": 0.7303786873817444,
+            "surprise": 0.005958002712577581,
+        },
+        "crisis_detected": False,
+        "model_used": "ml_model",
+        "confidence": 0.8764544248580933,
+    }
+    return {
+        "typing_indicator": {"type": "typing_indicator", "is_typing": True},
+        "system_message": {
+            "type": "system_message",
+            "content": "Connected to real-time chat!",
+            "timestamp": datetime(2024, 1, 1, 12, 0, 0).isoformat(),
+        },
+        "message": {
+            "type": "message",
+            "id": 123456,
+            "content": (
+                "It sounds like you're carrying some heavy feelings right now. "
+                "Sadness can feel overwhelming, but it's also a natural response "
+                "to difficult situations.\n\nCan you tell me a bit more about "
+                "what's contributing to these feelings?"
+            ),
+            "is_user": False,
+            "timestamp": datetime(2024, 1, 1, 12, 0, 1).isoformat(),
+            "emotion_analysis": emotion_analysis,
+        },
+    }
+
+
+def starlette_send_json(message):
+    """Encoding used by ``WebSocket.send_json`` before negotiation existed"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def deflated_size(payload):
+    """Frame size under permessage-deflate without context takeover.
+
+    This is the conservative case: every frame is compressed on its own, so
+    the figure does not benefit from repetition across frames.
+    """
+    data = payload.encode() if isinstance(payload, str) else payload
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    chunk = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    # The trailing 0x00 0x00 0xff 0xff is stripped on the wire
+    return len(chunk) - 4
+
+
+def run(iterations):
+    encoders = {"send_json": starlette_send_json, "json": JSON_CODEC.encode}
+    if MSGPACK_CODEC is not None:
+        encoders["msgpack"] = MSGPACK_CODEC.encode
+
+    results = {}
+    for frame_name, frame in sample_frames().items():
+        results[frame_name] = {}
+        for encoder_name, encode in encoders.items():
+            payload = encode(frame)
+            raw_size = len(payload.encode() if isinstance(payload, str) else payload)
+            seconds = timeit.timeit(lambda: encode(frame), number=iterations)
+            results[frame_name][encoder_name] = {
+                "bytes": raw_size,
+                "deflate_bytes": deflated_size(payload),
+                "encode_us": round(seconds / iterations * 1e6, 3),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'frame':<18}{'encoding':<12}{'bytes':>8}{'deflate':>10}{'encode us':>12}")
+    for frame_name, by_encoder in results.items():
+        for encoder_name, stats in by_encoder.items():
+            print(
+                f"{frame_name:<18}{encoder_name:<12}{stats['bytes']:>8}"
+                f"{stats['deflate_bytes']:>10}{stats['encode_us']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Fetch the ML resources into a local bundle so the API can start offline.
+
+Usage:
+    python bundle_ml_resources.py ./ml_bundle
+
+Then run the API with ML_BUNDLE_DIR=./ml_bundle and ML_OFFLINE=true.
+"""
+
+import os
+import sys
+
+from services.ml_service import EMOTION_MODEL_NAME
+
+
+def bundle(bundle_dir: str):
+    import nltk
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    nltk_dir = os.path.join(bundle_dir, "nltk_data")
+    os.makedirs(nltk_dir, exist_ok=True)
+    nltk.download("vader_lexicon", download_dir=nltk_dir, quiet=True)
+
+    model_dir = os.path.join(bundle_dir, "emotion_model")
+    AutoTokenizer.from_pretrained(EMOTION_MODEL_NAME).save_pretrained(model_dir)
+    AutoModelForSequenceClassification.from_pretrained(EMOTION_MODEL_NAME).save_pretrained(model_dir)
+
+    print(f"ML resources bundled in {os.path.abspath(bundle_dir)}")
+
+
+if __name__ == "__main__":
+    bundle(sys.argv[1] if len(sys.argv) > 1 else "ml_bundle")
@@ -0,0 +1,266 @@
+"""
+Cold storage for old chat messages and mood entries.
+
+Months older than ``ARCHIVE_HOT_MONTHS`` are moved out of the database into
+one compressed, columnar file per table, user and month, plus an index of
+the months archived so far:
+
+    <ARCHIVE_DIR>/<table>/months.json
+    <ARCHIVE_DIR>/<table>/<user_id>/<YYYY-MM>.json.gz
+
+Each file holds every column as one array (similar values sit together and
+compress well), rows in time order. Reading a user's archived history lists
+that user's directory and decodes only their own files, newest first, so it
+costs nothing for users without archived rows and stops at their oldest
+month. The hot tables stay small, which keeps recent-history queries and
+their indexes fast as data grows; reads that need older rows fall through
+to the archive.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+import gzip
+import json
+import logging
+import os
+
+from sqlalchemy import DateTime, func, select
+
+from models.database import Base, SessionLocal, ChatMessageModel, MoodEntryModel
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+# Whole calendar months kept in the database, besides the current one
+ARCHIVE_HOT_MONTHS = int(os.getenv("ARCHIVE_HOT_MONTHS", 3))
+# Decoded user-month files kept in memory per process
+ARCHIVE_CACHE_FILES = int(os.getenv("ARCHIVE_CACHE_FILES", 1024))
+
+ARCHIVED_MODELS = {
+    ChatMessageModel.__tablename__: ChatMessageModel,
+    MoodEntryModel.__tablename__: MoodEntryModel
+}
+
+MONTH_SUFFIX = ".json.gz"
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _write_atomically(path: str, write):
+    """``write(tmp_path)``, fsync, then rename over ``path``"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ColdStore:
+    """Per-user month files of archived rows, read back as transient model instances"""
+
+    def __init__(self, root: str = ARCHIVE_DIR, cache_files: int = ARCHIVE_CACHE_FILES):
+        self.root = root
+        self.cache_files = cache_files
+        self._cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._months: Dict[str, tuple] = {}
+
+    def _path(self, table: str, user_id: int, month: str) -> str:
+        return os.path.join(self.root, table, str(user_id), f"{month}{MONTH_SUFFIX}")
+
+    def _index_path(self, table: str) -> str:
+        return os.path.join(self.root, table, "months.json")
+
+    def months(self, table: str) -> List[str]:
+        """Archived months of ``table`` (any user), newest first"""
+        path = self._index_path(table)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        cached = self._months.get(table)
+        if cached is None or cached[0] != mtime:
+            with open(path, encoding="utf-8") as f:
+                cached = self._months[table] = (mtime, sorted(json.load(f), reverse=True))
+        return cached[1]
+
+    def user_months(self, table: str, user_id: int) -> List[str]:
+        """Archived months holding rows of ``user_id``, newest first
+
+        Only months in the index count: a month being archived becomes
+        visible once all its files are written, while its rows are still in
+        the database, so readers see each row exactly once.
+        """
+        try:
+            names = os.listdir(os.path.join(self.root, table, str(user_id)))
+        except FileNotFoundError:
+            return []
+        archived = set(self.months(table))
+        months = (name[:-len(MONTH_SUFFIX)] for name in names if name.endswith(MONTH_SUFFIX))
+        return sorted((month for month in months if month in archived), reverse=True)
+
+    def archived_until(self, table: str) -> Optional[datetime]:
+        """Start of the month after the newest archived one: rows before it live here"""
+        months = self.months(table)
+        if not months:
+            return None
+        return _add_months(datetime.strptime(months[0], "%Y-%m"), 1)
+
+    def _add_month(self, table: str, month: str):
+        months = set(self.months(table)) | {month}
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(sorted(months), f)
+
+        _write_atomically(self._index_path(table), write)
+
+    def _load(self, table: str, user_id: int, month: str) -> Dict:
+        path = self._path(table, user_id, month)
+        key = (table, user_id, month, os.stat(path).st_mtime_ns)
+        data = self._cache.get(key)
+        if data is None:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            self._cache[key] = data
+            while len(self._cache) > self.cache_files:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return data
+
+    def read_month(self, table: str, month: str, user_id: int) -> List[Dict]:
+        """Rows of one user in one archived month, oldest first"""
+        try:
+            data = self._load(table, user_id, month)
+        except FileNotFoundError:
+            return []
+
+        model = ARCHIVED_MODELS[table]
+        datetime_columns = {c.name for c in model.__table__.columns if isinstance(c.type, DateTime)}
+        columns = {
+            name: [datetime.fromisoformat(v) if v and name in datetime_columns else v for v in values]
+            for name, values in data["columns"].items()
+        }
+        return [{name: values[i] for name, values in columns.items()} for i in range(data["rows"])]
+
+    def write_month(self, table: str, month: str, user_id: int, rows: List[Dict]) -> int:
+        """Write (or merge into) one user's month file; returns the rows it now holds"""
+        path = self._path(table, user_id, month)
+        by_id = {}
+        if os.path.exists(path):
+            by_id = {row["id"]: row for row in self.read_month(table, month, user_id)}
+        by_id.update((row["id"], row) for row in rows)
+        merged = sorted(by_id.values(), key=lambda row: (row["timestamp"], row["id"]))
+
+        names = [c.name for c in ARCHIVED_MODELS[table].__table__.columns]
+        data = {
+            "table": table,
+            "month": month,
+            "user_id": user_id,
+            "rows": len(merged),
+            "columns": {
+                name: [row[name].isoformat() if isinstance(row[name], datetime) else row[name] for row in merged]
+                for name in names
+            }
+        }
+
+        def write(tmp_path):
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+
+        _write_atomically(path, write)
+        return len(merged)
+
+    def _instances(self, model, rows: List[Dict]) -> List[Base]:
+        return [model(**row) for row in rows]
+
+    def with_recent(self, model, user_id: int, hot_rows: List, limit: int) -> List:
+        """``hot_rows`` (newest first) topped up with archived rows up to ``limit``"""
+        table = model.__tablename__
+        rows = list(hot_rows)
+        seen = {row.id for row in rows}
+        for month in self.user_months(table, user_id):
+            if len(rows) >= limit:
+                break
+            cold = [row for row in self.read_month(table, month, user_id) if row["id"] not in seen]
+            cold.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+            rows.extend(self._instances(model, cold[:limit - len(rows)]))
+        return rows
+
+    def with_since(self, model, user_id: int, hot_rows: List, start: datetime) -> List:
+        """``hot_rows`` plus archived rows with timestamp >= ``start``, newest first"""
+        table = model.__tablename__
+        start = _naive(start)
+        first_month = _month_start(start).strftime("%Y-%m")
+        rows = list(hot_rows)
+        seen = {row.id for row in rows}
+        for month in self.user_months(table, user_id):
+            if month < first_month:
+                break
+            cold = [
+                row for row in self.read_month(table, month, user_id)
+                if row["id"] not in seen and row["timestamp"] and _naive(row["timestamp"]) >= start
+            ]
+            cold.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+            rows.extend(self._instances(model, cold))
+        return rows
+
+
+cold_store = ColdStore()
+
+
+def archive_cold_months(hot_months: int = ARCHIVE_HOT_MONTHS, store: ColdStore = cold_store, now: Optional[datetime] = None) -> Dict[str, Dict[str, int]]:
+    """Move whole months older than ``hot_months`` from the database to ``store``
+
+    Each month's files are written and fsynced, then the month is added to
+    the index, then its rows are deleted. Writing merges with existing
+    files, so an interrupted run is simply repeated.
+    """
+    cutoff = _add_months(_month_start(now or datetime.utcnow()), -hot_months)
+    archived: Dict[str, Dict[str, int]] = {}
+
+    for table, model in ARCHIVED_MODELS.items():
+        archived[table] = {}
+        while True:
+            db = SessionLocal()
+            try:
+                oldest = db.query(func.min(model.timestamp)).filter(model.timestamp < cutoff).scalar()
+                if oldest is None:
+                    break
+                month_start = _month_start(_naive(oldest))
+                month_end = min(_add_months(month_start, 1), cutoff)
+                in_month = (model.timestamp >= month_start) & (model.timestamp < month_end)
+
+                rows = [dict(row) for row in db.execute(select(model.__table__).where(in_month)).mappings()]
+                month = month_start.strftime("%Y-%m")
+                by_user: Dict[int, List[Dict]] = {}
+                for row in rows:
+                    by_user.setdefault(row["user_id"], []).append(row)
+                for user_id, user_rows in by_user.items():
+                    store.write_month(table, month, user_id, user_rows)
+                store._add_month(table, month)
+
+                db.query(model).filter(in_month).delete(synchronize_session=False)
+                db.commit()
+                archived[table][month] = len(rows)
+                logger.info(f"Archived {len(rows)} {table} rows from {month}")
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    return archived
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
 from typing import Optional, Dict, List
-from datetime import datetime
+from datetime import date, datetime
 
 class ChatBase(BaseModel):
     content: str
@@ -46,4 +46,17 @@ class ConversationContext(BaseModel):
     mood_trend: Optional[str] = None
     current_emotion_state: Optional[Dict] = None
     conversation_topic: Optional[str] = None
-    session_length: int = 0
\ No newline at end of file
+    session_length: int = 0
+
+class EmotionTrendBucket(BaseModel):
+    start: date
+    messages: int
+    scored_messages: int
+    average_emotion_score: Optional[float] = None
+    sentiment: Dict[str, int]
+
+class EmotionTrend(BaseModel):
+    period: str  # day or week
+    days: int
+    buckets: List[EmotionTrendBucket]
+    materialized: int = 0
@@ -1,15 +1,94 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, DateTime, Boolean, Text, Float, ForeignKey
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
 from sqlalchemy.sql import func
+import itertools
 import os
+import time
 from pathlib import Path
 
+from utils.metrics import Histogram
+
 # Database configuration
-DATABASE_URL = "sqlite:///./mental_health_chatbot.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mental_health_chatbot.db")
+
+# SQLite tuning, applied to every new connection. WAL lets readers proceed
+# while a write commits; synchronous=NORMAL is durable in WAL mode except for
+# the last transactions on power loss (not on an application crash).
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64000))  # negative = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+# Connection pool for server databases (PostgreSQL); per process, so the
+# server must allow WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Comma-separated read replica URLs for history and analytics reads
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """Engine for ``url`` with the settings that suit its backend"""
+    if make_url(url).get_backend_name() == "sqlite":
+        db_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        )
+        event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+        return db_engine
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read replicas, used round-robin; without any, reads go to the primary
+read_engines = [create_db_engine(url) for url in DATABASE_REPLICA_URLS]
+_read_sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in read_engines] or [SessionLocal]
+_next_read_session = itertools.cycle(_read_sessions)
+
+DB_TRANSACTION_SECONDS = Histogram(
+    "db_transaction_seconds", "Time a session holds a connection, from first statement to commit or rollback", ["role"]
+)
+_PRIMARY_TRANSACTIONS = DB_TRANSACTION_SECONDS.labels("primary")
+_REPLICA_TRANSACTIONS = DB_TRANSACTION_SECONDS.labels("replica")
+
+
+@event.listens_for(Session, "after_begin")
+def _transaction_started(session, transaction, connection):
+    session.info["transaction_started"] = (time.perf_counter(), connection.engine is engine)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    if transaction.parent is None and "transaction_started" in session.info:
+        started, primary = session.info.pop("transaction_started")
+        (_PRIMARY_TRANSACTIONS if primary else _REPLICA_TRANSACTIONS).observe(time.perf_counter() - started)
 Base = declarative_base()
 
 # Database models
@@ -56,6 +135,11 @@ class ChatMessageModel(Base):
     
     # Relationships
     user = relationship("UserModel", back_populates="chat_messages")
+    
+    __table_args__ = (
+        # History, context and trend queries: one user's messages in time order
+        Index("ix_chat_messages_user_id_timestamp", "user_id", "timestamp"),
+    )
 
 class MoodEntryModel(Base):
     __tablename__ = "mood_entries"
@@ -101,6 +185,17 @@ class UserProgressModel(Base):
     metric_value = Column(Float, nullable=False)
     date = Column(DateTime(timezone=True), server_default=func.now())
     period = Column(String, default="daily")  # daily, weekly, monthly
+    
+    __table_args__ = (
+        Index("ix_user_progress_user_metric", "user_id", "metric_name", "period", "date"),
+    )
+
+class IdSequenceModel(Base):
+    __tablename__ = "id_sequences"
+    
+    # Next unreserved id per table, for databases without native sequences
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
 
 def get_db():
     """Get database session"""
@@ -110,14 +205,33 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """Get a database session for reads that tolerate replication lag"""
+    db = next(_next_read_session)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def dispose_engines():
+    """Close pooled connections, e.g. before forking worker processes"""
+    engine.dispose()
+    for read_engine in read_engines:
+        read_engine.dispose()
+
 def init_db():
     """Initialize database and create tables"""
     # Create database directory if it doesn't exist
-    db_dir = Path(DATABASE_URL.split("///")[-1]).parent
-    db_dir.mkdir(exist_ok=True)
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        Path(url.database).parent.mkdir(parents=True, exist_ok=True)
     
     # Create tables
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes declared since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     
     # Seed initial data
     _seed_coping_strategies()
@@ -176,6 +290,24 @@ def _seed_coping_strategies():
                 "duration_minutes": 10,
                 "difficulty_level": "easy",
                 "effectiveness_emotions": '["stress", "rumination", "restlessness"]'
+            },
+            {
+                "name": "Box Breathing",
+                "category": "breathing",
+                "description": "A simple breathing technique to reduce anxiety",
+                "instructions": "Breathe in for 4, hold for 4, breathe out for 4, hold for 4. Repeat 4 times.",
+                "duration_minutes": 2,
+                "difficulty_level": "easy",
+                "effectiveness_emotions": '["anxiety", "fear", "panic", "anger"]'
+            },
+            {
+                "name": "Gentle Self-Care",
+                "category": "self_care",
+                "description": "Simple activities to nurture yourself",
+                "instructions": "Try a warm bath, listen to comforting music, or reach out to someone who cares about you.",
+                "duration_minutes": 20,
+                "difficulty_level": "easy",
+                "effectiveness_emotions": '["sadness", "depression", "loneliness"]'
             }
         ]
         
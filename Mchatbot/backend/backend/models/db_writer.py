@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+import logging
+import os
+
+from sqlalchemy.orm import Session
+
+from models.database import Base, SessionLocal
+from utils.batching import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+# Route chat writes through one writer thread that commits concurrent writes
+# together (group commit): one fsync per batch instead of one per message,
+# and no writers queueing on the SQLite database lock
+DB_SINGLE_WRITER = os.getenv("DB_SINGLE_WRITER", "false").lower() == "true"
+DB_WRITER_BATCH_SIZE = int(os.getenv("DB_WRITER_BATCH_SIZE", 64))
+DB_WRITER_BATCH_WAIT_MS = float(os.getenv("DB_WRITER_BATCH_WAIT_MS", 2))
+DB_WRITER_QUEUE = int(os.getenv("DB_WRITER_QUEUE", 10000))
+
+
+class _FailedWrite:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class DatabaseWriter:
+    """Single-threaded writer with group commit.
+
+    ``submit`` takes a function that adds rows to a session and returns the
+    ORM instance (or any value) the caller needs. Writes submitted while a
+    commit is running are applied in one transaction. If that transaction
+    fails, its writes are retried one per transaction so only the faulty
+    write fails.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_batch_size: int = DB_WRITER_BATCH_SIZE,
+        max_wait_ms: float = DB_WRITER_BATCH_WAIT_MS,
+        max_queue: int = DB_WRITER_QUEUE
+    ):
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.batcher = MicroBatcher(
+            self._write_batch,
+            self.executor,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            max_queue=max_queue,
+            name="db_writer"
+        )
+        self.commits = 0
+        self.failed_writes = 0
+
+    async def submit(self, write: Callable[[Session], Any]) -> Any:
+        """Apply ``write`` in the next group commit and return its result"""
+        result = await self.batcher.submit(write)
+        if isinstance(result, _FailedWrite):
+            raise result.error
+        return result
+
+    def _commit(self, writes: List[Callable[[Session], Any]]) -> List[Any]:
+        db = self.session_factory()
+        # Instances keep the values loaded below once committed and detached
+        db.expire_on_commit = False
+        try:
+            results = [write(db) for write in writes]
+            db.flush()
+            # Load server-side defaults (ids, timestamps) inside the transaction:
+            # nothing may fail after the commit, or _write_batch would retry
+            # writes that are already committed
+            for result in results:
+                if isinstance(result, Base):
+                    db.refresh(result)
+            db.commit()
+            self.commits += 1
+            return results
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_batch(self, writes: List[Callable[[Session], Any]]) -> List[Any]:
+        try:
+            return self._commit(writes)
+        except Exception as e:
+            if len(writes) == 1:
+                self.failed_writes += 1
+                logger.error(f"Database write failed: {e}")
+                return [_FailedWrite(e)]
+            logger.warning(f"Group commit of {len(writes)} writes failed ({e}); retrying individually")
+        return [self._write_batch([write])[0] for write in writes]
+
+    def shutdown(self):
+        """Finish queued commits and stop the writer thread"""
+        self.executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        """Writer statistics"""
+        return {
+            "enabled": DB_SINGLE_WRITER,
+            "commits": self.commits,
+            "failed_writes": self.failed_writes,
+            **self.batcher.get_stats()
+        }
+
+
+db_writer = DatabaseWriter()
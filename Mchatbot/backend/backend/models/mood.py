@@ -60,6 +60,11 @@ class MoodAnalytics(BaseModel):
     insights: List[str]
     recommendations: List[str]
 
+class MoodDashboard(BaseModel):
+    days: int
+    history: List[MoodEntry]  # newest first
+    analytics: MoodAnalytics
+
 class MoodInsight(BaseModel):
     type: str  # pattern, correlation, recommendation
     title: str
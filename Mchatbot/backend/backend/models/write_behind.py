@@ -0,0 +1,448 @@
+"""
+Write-behind persistence for chat messages that the user does not wait for.
+
+With ``WRITE_BEHIND=true`` an AI reply is appended to a local journal and
+answered straight away; a background task inserts buffered replies in
+batches. The journal is split into segments, one open segment per process
+instance (``<pid>-<token>-<n>.jsonl``, with a random token per instance so a
+restarted process that gets its predecessor's pid, e.g. PID 1 in a
+container, never mistakes the old segments for its own); a segment is
+created fresh, never appended to after a restart, and deleted only after its
+rows are committed. Each instance holds a lock on ``<pid>-<token>.lock``
+while it runs. On shutdown everything pending is flushed, and on startup
+segments of every other instance whose lock is free are replayed (rows
+already in the database are skipped), so a crash loses nothing that reached
+the journal. A row whose id turns out to hold a different message is not
+dropped but logged and kept in ``conflicts.rejected``.
+
+Message ids are reserved in blocks up front (PostgreSQL sequence, or the
+``id_sequences`` table elsewhere) so a reply has its final id before it is
+written. Blocks are reserved on a worker thread, the next one in the
+background while the current one still lasts, so the event loop never waits
+on the database lock for an id. While write-behind is on, every chat message
+takes its id from the same allocator, so directly inserted rows never collide
+with reserved ones.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import glob
+import json
+import logging
+import os
+import secrets
+
+try:
+    import fcntl
+except ImportError:  # Windows: owners are checked by pid only
+    fcntl = None
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import IntegrityError
+
+from models.database import SessionLocal, ChatMessageModel, IdSequenceModel
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+WRITE_BEHIND_DIR = os.getenv("WRITE_BEHIND_DIR", "./write_behind")
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", 200))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", 100))
+# fsync each journal append: survives power loss, not just a process crash
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "false").lower() == "true"
+WRITE_BEHIND_ID_BLOCK = int(os.getenv("WRITE_BEHIND_ID_BLOCK", 100))
+
+
+class IdAllocator:
+    """Hands out primary keys for ``model`` from blocks reserved in the database"""
+
+    def __init__(self, model=ChatMessageModel, block_size: int = WRITE_BEHIND_ID_BLOCK):
+        self.model = model
+        self.table = model.__tablename__
+        self.block_size = block_size
+        # Reserve the next block once this many ids of the current one are left
+        self.low_water = block_size // 4
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="id-allocator")
+        self._ids: deque = deque()
+        self._refill: Optional[asyncio.Task] = None
+
+    async def allocate(self) -> int:
+        """Next id; waits only when the reserved ids ran out before the refill finished"""
+        if len(self._ids) <= self.low_water:
+            self._start_refill()
+        while not self._ids:
+            error = await self._start_refill()
+            if error is not None and not self._ids:
+                raise error
+        return self._ids.popleft()
+
+    def _start_refill(self) -> asyncio.Task:
+        if self._refill is None:
+            self._refill = asyncio.ensure_future(self._refill_block())
+        return self._refill
+
+    async def _refill_block(self) -> Optional[Exception]:
+        """Reserve a block on the executor; returns the error instead of raising it"""
+        try:
+            ids = await asyncio.get_running_loop().run_in_executor(self.executor, self._reserve_block)
+            self._ids.extend(ids)
+            return None
+        except Exception as e:
+            logger.error(f"Reserving {self.table} ids failed: {e}")
+            return e
+        finally:
+            self._refill = None
+
+    def _reserve_block(self) -> List[int]:
+        try:
+            return self._reserve()
+        except IntegrityError:
+            # Another process created the sequence row first; it exists now
+            return self._reserve()
+
+    def _reserve(self) -> List[int]:
+        db = SessionLocal()
+        try:
+            if db.bind.dialect.name == "postgresql":
+                ids = db.execute(
+                    text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+                    {"table": self.table, "n": self.block_size}
+                ).scalars().all()
+                db.commit()
+                return list(ids)
+
+            # Start above the highest id in use, whoever inserted it
+            max_id = db.query(func.coalesce(func.max(self.model.id), 0)).scalar()
+            sequence = db.get(IdSequenceModel, self.table)
+            if sequence is None:
+                sequence = IdSequenceModel(name=self.table, next_id=max_id + 1)
+                db.add(sequence)
+                db.flush()
+            db.query(IdSequenceModel)\
+              .filter(IdSequenceModel.name == self.table)\
+              .update(
+                  {IdSequenceModel.next_id: func.max(IdSequenceModel.next_id, max_id + 1) + self.block_size},
+                  synchronize_session=False
+              )
+            # Read back inside the same transaction, which now holds the write lock
+            end = db.query(IdSequenceModel.next_id).filter(IdSequenceModel.name == self.table).scalar()
+            db.commit()
+            return list(range(end - self.block_size, end))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def _encode(row: Dict) -> str:
+    return json.dumps({k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()})
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Naive values (SQLite, older journals) are UTC
+    return value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+
+
+def _same_row(existing, row: Dict) -> bool:
+    """Whether ``existing`` is ``row`` inserted before (replay), not another message with its id"""
+    return (
+        existing.user_id == row["user_id"]
+        and existing.content == row["content"]
+        and _utc(existing.timestamp) == _utc(row.get("timestamp"))
+    )
+
+
+def _decode(line: str) -> Dict:
+    row = json.loads(line)
+    if row.get("timestamp"):
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class WriteBehindBuffer:
+    """Journaled buffer of rows inserted into ``model``'s table in batches"""
+
+    def __init__(
+        self,
+        model=ChatMessageModel,
+        journal_dir: str = WRITE_BEHIND_DIR,
+        flush_interval_ms: float = WRITE_BEHIND_FLUSH_MS,
+        max_batch: int = WRITE_BEHIND_BATCH,
+        fsync: bool = WRITE_BEHIND_FSYNC
+    ):
+        self.model = model
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+
+        self.pending: List[Dict] = []
+        self._inflight: List[Dict] = []
+        self._segment = None
+        self._segment_count = 0
+        self._instance: Optional[str] = None
+        self._instance_pid: Optional[int] = None
+        self._lock_file = None
+        self._closed_segments: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        # Statistics
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.conflicts = 0
+
+    def _instance_name(self) -> str:
+        """``<pid>-<token>``, unique per process instance even when a pid is reused"""
+        if self._instance is None or self._instance_pid != os.getpid():
+            self._instance_pid = os.getpid()
+            self._instance = f"{self._instance_pid}-{secrets.token_hex(4)}"
+            self._lock_file = None
+        return self._instance
+
+    def _lock_path(self, owner: str) -> str:
+        return os.path.join(self.journal_dir, f"{owner}.lock")
+
+    def _hold_lock(self):
+        """Lock this instance's lock file for as long as it runs"""
+        owner = self._instance_name()
+        if fcntl is None or self._lock_file is not None:
+            return
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = self._lock_path(owner)
+        while self._lock_file is None:
+            f = open(path, "a")
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            try:
+                # A replay may have removed the file between open and flock
+                current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                self._lock_file = f
+            else:
+                f.close()
+
+    def _release_lock(self):
+        if self._lock_file is not None:
+            os.remove(self._lock_file.name)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _owner_alive(self, owner: str) -> bool:
+        """Whether the instance that wrote segments named ``owner`` may still run"""
+        if owner == self._instance_name():
+            return True
+        pid = int(owner.split("-")[0])
+        if "-" not in owner or fcntl is None:
+            # Segment without an instance token, or no locks: same pid is a previous instance
+            return pid != os.getpid() and _process_alive(pid)
+        try:
+            f = open(self._lock_path(owner), "r")
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return True
+        # Free: the owner is gone. Remove its lock file while holding it.
+        os.remove(f.name)
+        f.close()
+        return False
+
+    def _new_segment_path(self) -> str:
+        self._segment_count += 1
+        return os.path.join(self.journal_dir, f"{self._instance_name()}-{self._segment_count}.jsonl")
+
+    def _open_segment(self):
+        self._hold_lock()
+        # "x": a segment is always a new file, never one left by someone else
+        self._segment = open(self._new_segment_path(), "x", encoding="utf-8")
+
+    def _rotate_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._closed_segments.append(self._segment.name)
+            self._segment = None
+
+    def enqueue(self, row: Dict):
+        """Journal a row and buffer it for the next batch insert"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.ensure_future(self._run())
+        if self._segment is None:
+            self._open_segment()
+
+        self._segment.write(_encode(row) + "\n")
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+        self.pending.append(row)
+        self.enqueued += 1
+        if len(self.pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Insert everything buffered so far"""
+        if not self.pending or self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            self._rotate_segment()
+            batch, self.pending = self.pending, []
+            segments, self._closed_segments = self._closed_segments, []
+            self._inflight = batch
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self._insert, batch)
+            except Exception as e:
+                # Keep everything; the next flush retries and the journal still has it
+                self.flush_failures += 1
+                self.pending = batch + self.pending
+                self._closed_segments = segments + self._closed_segments
+                logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+                return
+            finally:
+                self._inflight = []
+
+            for path in segments:
+                os.remove(path)
+            self.flushes += 1
+            self.flushed += len(batch)
+
+    def _insert(self, rows: List[Dict]):
+        db = SessionLocal()
+        try:
+            ids = [row["id"] for row in rows]
+            existing = {
+                found.id: found
+                for found in db.query(self.model.id, self.model.user_id, self.model.content, self.model.timestamp)
+                               .filter(self.model.id.in_(ids))
+            }
+            new_rows = [row for row in rows if row["id"] not in existing]
+            # A different message under a reserved id means something inserted
+            # without the allocator (e.g. a worker with write-behind off)
+            conflicts = [row for row in rows if row["id"] in existing and not _same_row(existing[row["id"]], row)]
+            if new_rows:
+                db.execute(insert(self.model.__table__), new_rows)
+            db.commit()
+            if conflicts:
+                self._reject(conflicts)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _reject(self, rows: List[Dict]):
+        """Keep rows whose id was taken by another message in ``conflicts.rejected``"""
+        path = os.path.join(self.journal_dir, "conflicts.rejected")
+        os.makedirs(self.journal_dir, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(_encode(row) + "\n" for row in rows))
+            f.flush()
+            os.fsync(f.fileno())
+        self.conflicts += len(rows)
+        logger.error(
+            f"Write-behind: ids {[row['id'] for row in rows]} already belong to other messages; "
+            f"rows kept in {path}"
+        )
+
+    def replay(self) -> int:
+        """Insert rows from journal segments left behind by instances that are gone"""
+        replayed = 0
+        alive: Dict[str, bool] = {}
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, "*.jsonl"))):
+            owner = os.path.basename(path)[:-len(".jsonl")].rsplit("-", 1)[0]
+            if owner not in alive:
+                alive[owner] = self._owner_alive(owner)
+            if alive[owner]:
+                continue
+            # Claim the segment under our name so other workers starting now skip it
+            self._hold_lock()
+            claimed = self._new_segment_path()
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            path = claimed
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            rows = []
+            for line in lines:
+                try:
+                    rows.append(_decode(line))
+                except ValueError:
+                    # A torn last line from a crash mid-append was never acknowledged
+                    logger.warning(f"Skipping unreadable journal line in {path}")
+            if rows:
+                self._insert(rows)
+            os.remove(path)
+            replayed += len(rows)
+        if replayed:
+            logger.info(f"Replayed {replayed} write-behind rows")
+        return replayed
+
+    def pending_for(self, user_id: int) -> List[ChatMessageModel]:
+        """Buffered (or being flushed) rows of one user, newest first, as transient model instances"""
+        rows = self._inflight + self.pending
+        return [self.model(**row) for row in reversed(rows) if row["user_id"] == user_id]
+
+    async def close(self):
+        """Flush everything and stop; must run before the process exits"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        self._rotate_segment()
+        if not self.pending:
+            for path in self._closed_segments:
+                os.remove(path)
+            self._closed_segments = []
+        # Anything still journaled is replayed by the next start
+        self._release_lock()
+        self.executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        """Buffer statistics"""
+        return {
+            "enabled": WRITE_BEHIND,
+            "pending": len(self.pending),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "conflicts": self.conflicts
+        }
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+message_ids = IdAllocator()
+write_behind = WriteBehindBuffer()
@@ -16,6 +16,28 @@ if __name__ == "__main__":
     workers = int(os.getenv("WORKERS", 1))
     log_level = os.getenv("LOG_LEVEL", "info").lower()
     reload = os.getenv("ENVIRONMENT", "production") == "development"
+    ws_per_message_deflate = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    # Load models once in a master process and fork workers that share them
+    prefork = os.getenv("PREFORK", "false").lower() == "true"
+    memory_report_interval = float(os.getenv("PREFORK_MEMORY_REPORT_INTERVAL", 0))
+    
+    if prefork and not reload:
+        import logging
+        from utils.prefork import serve_prefork
+
+        logging.basicConfig(level=log_level.upper())
+        serve_prefork(
+            "app:app",
+            host=host,
+            port=port,
+            workers=workers,
+            memory_report_interval=memory_report_interval,
+            log_level=log_level,
+            access_log=True,
+            ws="websockets",
+            ws_per_message_deflate=ws_per_message_deflate
+        )
+        raise SystemExit(0)
     
     # Run the application
     uvicorn.run(
@@ -25,5 +47,7 @@ if __name__ == "__main__":
         workers=workers if not reload else 1,
         log_level=log_level,
         reload=reload,
-        access_log=True
+        access_log=True,
+        ws="websockets",
+        ws_per_message_deflate=ws_per_message_deflate
     )
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""
+Backfill of the analysis columns on historical chat messages.
+
+Messages saved before the chat path recorded its analysis have no
+``detected_emotions``/``intent`` (user messages) or ``response_type`` (AI
+replies). This job streams those rows in id order in chunks of
+``chunk_size``, scores user messages with the emotion model (or the
+rule-based detector) and sentiment scorer in batches of ``batch_size`` on a
+pool of ``workers`` threads, and bulk-updates each chunk in one
+transaction:
+
+  - user messages: ``detected_emotions``, ``intent``, and ``emotion_score``
+    / ``sentiment`` where still empty
+  - AI replies: ``response_type`` from the user message before it, with
+    the same rules the live path uses to pick a reply (``unknown`` when
+    there is none)
+
+After each chunk the last id is written to a checkpoint file, so an
+interrupted run resumes where it stopped. Rows are selected by their empty
+columns, so re-running from the start is safe too, only slower. Archived
+months (models/archive.py) are not touched.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from models.database import SessionLocal, ChatMessageModel
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "./backfill_checkpoint.json")
+
+CRISIS_ANALYSIS = {"emotions": {"crisis": 1.0}, "distress_level": 1.0}
+
+
+def load_checkpoint(path: str) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_id": 0, "rows": 0}
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    """Write atomically, so a crash never leaves a half-written checkpoint"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def reply_type(user_message: str, distress: Optional[float], chat_service) -> str:
+    """Response type the live path would pick for a reply to ``user_message``"""
+    if chat_service._detect_crisis_indicators(user_message):
+        return "crisis"
+    distress = distress or 0
+    if distress > 0.7:
+        return "coping"
+    if distress > 0.4:
+        return "supportive"
+    return "conversational"
+
+
+class AnalysisBackfill:
+    def __init__(
+        self,
+        ml_service,
+        chat_service,
+        chunk_size: int = 1000,
+        batch_size: int = 32,
+        workers: int = 2,
+        checkpoint_path: str = BACKFILL_CHECKPOINT,
+        use_model: bool = True
+    ):
+        self.ml = ml_service
+        self.chat = chat_service
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.use_model = use_model
+        # Latest user message per user seen in this run: (content, distress)
+        self._last_user_message: Dict[int, Tuple[str, Optional[float]]] = {}
+
+    def _emotion_batch(self, texts: List[str]) -> List[Dict]:
+        """Emotions and distress per text, on a worker thread"""
+        analyses: List[Optional[Dict]] = [None] * len(texts)
+        scored = []
+        for index, text in enumerate(texts):
+            if self.ml._detect_crisis_keywords(text):
+                analyses[index] = CRISIS_ANALYSIS
+            else:
+                scored.append(index)
+        if scored:
+            batch = [texts[index] for index in scored]
+            if self.use_model and self.ml.emotion_pipeline is not None:
+                emotions = self.ml._predict_emotions_batch(batch)
+            else:
+                emotions = [self.ml._rule_based_emotion_detection(text) for text in batch]
+            for index, scores in zip(scored, emotions):
+                analyses[index] = {"emotions": scores, "distress_level": self.ml._calculate_distress_level(scores)}
+        return analyses
+
+    async def _analyze(self, texts: List[str], pool: ThreadPoolExecutor) -> Tuple[List[Dict], List[Dict]]:
+        loop = asyncio.get_running_loop()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        emotion_batches = await asyncio.gather(*[
+            loop.run_in_executor(pool, self._emotion_batch, batch) for batch in batches
+        ])
+        sentiments = await self.ml.analyze_sentiment_batch(texts, use_cache=False)
+        return [analysis for batch in emotion_batches for analysis in batch], sentiments
+
+    def _fetch_chunk(self, db, after_id: int):
+        pending = or_(
+            and_(ChatMessageModel.is_user.is_(True), ChatMessageModel.detected_emotions.is_(None)),
+            and_(ChatMessageModel.is_user.is_(False), ChatMessageModel.response_type.is_(None))
+        )
+        return db.execute(
+            select(
+                ChatMessageModel.id, ChatMessageModel.user_id, ChatMessageModel.content, ChatMessageModel.is_user,
+                ChatMessageModel.sentiment, ChatMessageModel.emotion_score
+            )
+            .where(ChatMessageModel.id > after_id, pending)
+            .order_by(ChatMessageModel.id)
+            .limit(self.chunk_size)
+        ).all()
+
+    def _previous_user_messages(self, db, replies) -> Dict[int, Tuple[str, Optional[float]]]:
+        """User message before each reply, for replies whose user was not seen yet"""
+        reply = aliased(ChatMessageModel)
+        previous = aliased(ChatMessageModel)
+        previous_id = (
+            select(func.max(ChatMessageModel.id))
+            .where(
+                ChatMessageModel.user_id == reply.user_id,
+                ChatMessageModel.is_user.is_(True),
+                ChatMessageModel.id < reply.id
+            )
+            .correlate(reply)
+            .scalar_subquery()
+        )
+        rows = db.execute(
+            select(reply.id, previous.content, previous.emotion_score)
+            .join(previous, previous.id == previous_id)
+            .where(reply.id.in_([row.id for row in replies]))
+        ).all()
+        return {reply_id: (content, distress) for reply_id, content, distress in rows}
+
+    async def _process_chunk(self, db, rows, pool: ThreadPoolExecutor) -> int:
+        user_rows = [row for row in rows if row.is_user]
+        analyses, sentiments = await self._analyze([row.content for row in user_rows], pool)
+
+        user_updates = []
+        analyzed = {}
+        for row, analysis, sentiment in zip(user_rows, analyses, sentiments):
+            distress = row.emotion_score if row.emotion_score is not None else analysis["distress_level"]
+            analyzed[row.id] = (row.content, distress)
+            user_updates.append({
+                "id": row.id,
+                "detected_emotions": json.dumps(analysis["emotions"]),
+                "intent": self.chat.detect_intent(row.content),
+                "emotion_score": distress,
+                "sentiment": row.sentiment or sentiment["sentiment"]
+            })
+
+        # Replies take the analysis of the user message before them; rows
+        # are in id order, so that is the latest user message seen so far
+        reply_updates = []
+        unseen = []
+        for row in rows:
+            if row.is_user:
+                self._last_user_message[row.user_id] = analyzed[row.id]
+            elif row.user_id in self._last_user_message:
+                content, distress = self._last_user_message[row.user_id]
+                reply_updates.append({"id": row.id, "response_type": reply_type(content, distress, self.chat)})
+            else:
+                unseen.append(row)
+        if unseen:
+            previous = self._previous_user_messages(db, unseen)
+            for row in unseen:
+                if row.id in previous:
+                    content, distress = previous[row.id]
+                    reply_updates.append({"id": row.id, "response_type": reply_type(content, distress, self.chat)})
+                else:
+                    reply_updates.append({"id": row.id, "response_type": "unknown"})
+
+        # Bulk UPDATE ... WHERE id = :id, one executemany per column set
+        if user_updates:
+            db.execute(update(ChatMessageModel), user_updates)
+        if reply_updates:
+            db.execute(update(ChatMessageModel), reply_updates)
+        db.commit()
+        return len(rows)
+
+    async def run(self, from_start: bool = False, limit: Optional[int] = None) -> Dict:
+        """Backfill until no pending rows remain (or ``limit`` rows); returns totals"""
+        checkpoint = {"last_id": 0, "rows": 0} if from_start else load_checkpoint(self.checkpoint_path)
+        last_id = checkpoint["last_id"]
+        processed = 0
+        started = time.perf_counter()
+        logger.info(f"Backfill starting after id {last_id}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as pool:
+            while limit is None or processed < limit:
+                db = SessionLocal()
+                try:
+                    rows = self._fetch_chunk(db, last_id)
+                    if limit is not None:
+                        rows = rows[:limit - processed]
+                    if not rows:
+                        break
+                    processed += await self._process_chunk(db, rows, pool)
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+
+                last_id = rows[-1].id
+                checkpoint = {
+                    "last_id": last_id,
+                    "rows": checkpoint["rows"] + len(rows),
+                    "updated_at": datetime.utcnow().isoformat()
+                }
+                save_checkpoint(self.checkpoint_path, checkpoint)
+                elapsed = time.perf_counter() - started
+                logger.info(f"Backfilled {processed} rows up to id {last_id} ({processed / elapsed:.0f} rows/s)")
+
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": processed,
+            "last_id": last_id,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(processed / elapsed, 1) if elapsed else 0.0,
+            "total_rows": checkpoint["rows"]
+        }
@@ -7,14 +7,20 @@ from typing import Optional, Dict
 from models.database import get_db, UserModel
 from models.user import UserCreate, UserLogin, User
 from utils.exceptions import CustomHTTPException
+from utils.security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, token_verifier
+from utils.password_hasher import PasswordHasher, build_password_context
 from fastapi import status
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.SECRET_KEY = "your-secret-key-change-in-production"
-        self.ALGORITHM = "HS256"
-        self.ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
+        self.pwd_context = build_password_context()
+        self.password_hasher = PasswordHasher(self.pwd_context)
+        self.SECRET_KEY = SECRET_KEY
+        self.ALGORITHM = ALGORITHM
+        self.ACCESS_TOKEN_EXPIRE_MINUTES = ACCESS_TOKEN_EXPIRE_MINUTES
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
@@ -50,7 +56,7 @@ class AuthService:
                 )
 
             # Create new user
-            hashed_password = self.get_password_hash(user_data.password)
+            hashed_password = await self.password_hasher.hash(user_data.password)
             db_user = UserModel(
                 email=user_data.email,
                 name=user_data.name,
@@ -82,7 +88,7 @@ class AuthService:
         try:
             user = db.query(UserModel).filter(UserModel.email == credentials.email).first()
             
-            if not user or not self.verify_password(credentials.password, user.hashed_password):
+            if not user or not await self.password_hasher.verify(credentials.password, user.hashed_password):
                 raise CustomHTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Incorrect email or password",
@@ -103,6 +109,12 @@ class AuthService:
                 expires_delta=access_token_expires
             )
             
+            # Hashes made with a deprecated scheme or old cost settings are
+            # upgraded by the caller once the response has been sent
+            rehash = None
+            if self.pwd_context.needs_update(user.hashed_password):
+                rehash = {"user_id": user.id, "current_hash": user.hashed_password}
+            
             return {
                 "access_token": access_token,
                 "user": {
@@ -110,7 +122,8 @@ class AuthService:
                     "email": user.email,
                     "name": user.name,
                     "preferred_name": user.preferred_name
-                }
+                },
+                "rehash": rehash
             }
             
         except Exception as e:
@@ -124,6 +137,29 @@ class AuthService:
         finally:
             db.close()
 
+    async def upgrade_password_hash(self, user_id: int, current_hash: str, password: str) -> bool:
+        """Re-hash a verified password with the current scheme and cost settings.
+
+        The update only applies if the stored hash is still ``current_hash``,
+        so a password change that lands in between is never overwritten.
+        """
+        new_hash = await self.password_hasher.hash(password)
+        db = next(get_db())
+        try:
+            updated = db.query(UserModel)\
+                        .filter(UserModel.id == user_id, UserModel.hashed_password == current_hash)\
+                        .update({UserModel.hashed_password: new_hash}, synchronize_session=False)
+            db.commit()
+            if updated:
+                logger.info(f"Upgraded password hash for user {user_id}")
+            return bool(updated)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to upgrade password hash for user {user_id}: {e}")
+            return False
+        finally:
+            db.close()
+
     async def get_user_by_id(self, user_id: int) -> Optional[UserModel]:
         """Get user by ID"""
         db = next(get_db())
@@ -135,8 +171,7 @@ class AuthService:
     def decode_token(self, token: str) -> Dict:
         """Decode JWT token"""
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            return payload
+            return token_verifier.decode(token)
         except JWTError:
             raise CustomHTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
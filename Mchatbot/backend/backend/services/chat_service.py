@@ -1,22 +1,77 @@
+from sqlalchemy import Date, case, cast, func, literal_column, select
 from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 import json
 
-from models.database import get_db, ChatMessageModel, UserModel, CopingStrategyModel
-from models.chat import ChatMessage, ChatResponse, ConversationContext
-from services.ml_service import MLService
+from models.database import get_db, get_read_db, ChatMessageModel, UserModel, UserProgressModel
+from models.db_writer import DB_SINGLE_WRITER, db_writer
+from models.archive import cold_store
+from models.write_behind import WRITE_BEHIND, message_ids, write_behind
+from models.chat import ChatMessage, ChatResponse, ConversationContext, EmotionTrend, EmotionTrendBucket
+from services.ml_service import MLService, get_ml_service
+from services.coping_index import coping_index
+from services.context_cache import context_cache
 from utils.exceptions import CustomHTTPException
+from utils.metrics import Histogram
+from utils.tracing import span
 from fastapi import status
+import time
+
+CHAT_STAGE_SECONDS = Histogram("chat_turn_stage_seconds", "Time per chat turn stage", ["stage"])
+_ANALYSIS_STAGE = CHAT_STAGE_SECONDS.labels("analysis")
+_CONTEXT_STAGE = CHAT_STAGE_SECONDS.labels("context")
+_GENERATION_STAGE = CHAT_STAGE_SECONDS.labels("generation")
+_PERSISTENCE_STAGE = CHAT_STAGE_SECONDS.labels("persistence")
+
+# Emotion trend bucket sizes and the user_progress period they materialize to
+TREND_PERIODS = {"day": "daily", "week": "weekly"}
+SENTIMENTS = ("positive", "negative", "neutral")
+
+def _trend_bucket(dialect: str, period: str):
+    """SQL expression for the first day (weeks start on Monday) of a message's bucket"""
+    timestamp = ChatMessageModel.timestamp
+    # Literal, not bound, arguments: the SELECT and GROUP BY copies must compile identically
+    if dialect == "postgresql":
+        return cast(func.date_trunc(literal_column(f"'{period}'"), timestamp), Date)
+    if period == "week":
+        # SQLite: forward to Sunday (unless already one), then back to its Monday
+        return func.date(timestamp, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+    return func.date(timestamp)
+
+def _utc(value: datetime) -> datetime:
+    """Timezone-aware UTC; naive values (as SQLite returns them) are UTC already"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _bucket_start(value, period: str) -> date:
+    """Bucket start as a date, from a SQL result (date or ISO string) or a message timestamp"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    if period == "week":
+        value -= timedelta(days=value.weekday())
+    return value
 
 class ChatService:
-    def __init__(self):
-        self.ml_service = MLService()
+    def __init__(self, ml_service: Optional[MLService] = None):
+        # Share the process-wide instance so model weights are loaded only once
+        self.ml_service = ml_service or get_ml_service()
         self.crisis_keywords = [
             "suicide", "kill myself", "end it all", "don't want to live",
             "hurt myself", "self-harm", "ending my life", "suicide plan"
         ]
         
+    async def analyze_message(self, content: str) -> Tuple[Dict, str]:
+        """Emotion analysis and sentiment label of a user message"""
+        started = time.perf_counter()
+        with span("analyze_emotion"):
+            emotion_analysis = await self.ml_service.analyze_emotion(content)
+        with span("analyze_sentiment"):
+            sentiment_analysis = await self.ml_service.analyze_sentiment(content)
+        _ANALYSIS_STAGE.observe(time.perf_counter() - started)
+        return emotion_analysis, sentiment_analysis.get("sentiment", "neutral")
+
     async def save_message(
         self,
         user_id: int,
@@ -26,29 +81,59 @@ class ChatService:
         sentiment: Optional[str] = None,
         detected_emotions: Optional[Dict] = None,
         intent: Optional[str] = None,
-        response_type: Optional[str] = None
+        response_type: Optional[str] = None,
+        defer: bool = False
     ) -> ChatMessage:
-        """Save a chat message to database"""
-        db = next(get_db())
-        try:
-            # Check for crisis indicators
-            escalation_triggered = self._detect_crisis_indicators(content) if is_user else False
-            
-            message = ChatMessageModel(
-                user_id=user_id,
-                content=content,
-                is_user=is_user,
-                sentiment=sentiment,
-                emotion_score=emotion_score,
-                detected_emotions=json.dumps(detected_emotions) if detected_emotions else None,
-                intent=intent,
-                response_type=response_type,
-                escalation_triggered=escalation_triggered
-            )
-            
+        """Save a chat message to database
+
+        With ``defer`` and write-behind enabled the message is journaled and
+        inserted by the next batch flush instead of being committed here.
+        """
+        # Check for crisis indicators
+        escalation_triggered = self._detect_crisis_indicators(content) if is_user else False
+        row = dict(
+            user_id=user_id,
+            content=content,
+            is_user=is_user,
+            sentiment=sentiment,
+            emotion_score=emotion_score,
+            detected_emotions=json.dumps(detected_emotions) if detected_emotions else None,
+            intent=intent,
+            response_type=response_type,
+            escalation_triggered=escalation_triggered
+        )
+        
+        def write(db: Session) -> ChatMessageModel:
+            message = ChatMessageModel(**row)
             db.add(message)
-            db.commit()
-            db.refresh(message)
+            return message
+        
+        started = time.perf_counter()
+        try:
+            with span("save_message", is_user=is_user, deferred=WRITE_BEHIND and defer):
+                if WRITE_BEHIND:
+                    # Ids come from reserved blocks, so direct inserts never take a buffered reply's id
+                    # and timestamps share one clock, so buffered replies order correctly against them
+                    row["id"] = await message_ids.allocate()
+                    row["timestamp"] = datetime.now(timezone.utc)
+                if WRITE_BEHIND and defer:
+                    write_behind.enqueue(row)
+                    message = ChatMessageModel(**row)
+                elif DB_SINGLE_WRITER:
+                    message = await db_writer.submit(write)
+                else:
+                    db = next(get_db())
+                    try:
+                        message = write(db)
+                        db.commit()
+                        db.refresh(message)
+                    except Exception:
+                        db.rollback()
+                        raise
+                    finally:
+                        db.close()
+            context_cache.append_message(user_id, content)
+            _PERSISTENCE_STAGE.observe(time.perf_counter() - started)
             
             return ChatMessage(
                 id=message.id,
@@ -62,24 +147,29 @@ class ChatService:
             )
             
         except Exception as e:
-            db.rollback()
             raise CustomHTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to save message",
                 error_code="MESSAGE_SAVE_FAILED"
             )
-        finally:
-            db.close()
 
     async def get_chat_history(self, user_id: int, limit: int = 50) -> List[ChatResponse]:
         """Get user's recent chat history"""
-        db = next(get_db())
+        db = next(get_read_db())
         try:
             messages = db.query(ChatMessageModel)\
                         .filter(ChatMessageModel.user_id == user_id)\
                         .order_by(ChatMessageModel.timestamp.desc())\
                         .limit(limit)\
                         .all()
+            if WRITE_BEHIND:
+                # Replies still waiting for a flush are newer than anything committed
+                pending = write_behind.pending_for(user_id)
+                committed = {msg.id for msg in messages}
+                messages = [msg for msg in pending if msg.id not in committed] + messages
+                messages.sort(key=lambda msg: (_utc(msg.timestamp), msg.id), reverse=True)
+                messages = messages[:limit]
+            messages = cold_store.with_recent(ChatMessageModel, user_id, messages, limit)
             
             return [
                 ChatResponse(
@@ -98,6 +188,119 @@ class ChatService:
         finally:
             db.close()
 
+    async def get_emotion_trend(
+        self, user_id: int, days: int = 30, period: str = "day", materialize: bool = False
+    ) -> EmotionTrend:
+        """Average distress and sentiment mix of the user's messages per day or week
+
+        Aggregated in SQL with a GROUP BY over the user_id/timestamp index, so
+        the cost grows with the number of buckets, not messages. Archived
+        months are folded in from the cold store. The window starts at the
+        beginning of the day or week ``days`` ago, so no bucket is cut short
+        (and a shorter window never materializes a partial one over a full
+        one). With ``materialize`` the buckets are also written to
+        user_progress.
+        """
+        start = datetime.combine(_bucket_start(datetime.utcnow() - timedelta(days=days), period), datetime.min.time())
+        # Archived months are read from the cold store only, so rows still in
+        # the database while a month is being archived are not counted twice
+        archived_until = cold_store.archived_until(ChatMessageModel.__tablename__)
+        hot_start = max(start, archived_until) if archived_until else start
+        # bucket start -> [messages, scored messages, emotion score sum, positive, negative, neutral]
+        totals: Dict[date, List[float]] = {}
+
+        db = next(get_read_db())
+        try:
+            bucket = _trend_bucket(db.bind.dialect.name, period).label("bucket")
+            rows = db.execute(
+                select(
+                    bucket,
+                    func.count(),
+                    func.count(ChatMessageModel.emotion_score),
+                    func.sum(ChatMessageModel.emotion_score),
+                    *[func.sum(case((ChatMessageModel.sentiment == label, 1), else_=0)) for label in SENTIMENTS]
+                )
+                .where(
+                    ChatMessageModel.user_id == user_id,
+                    ChatMessageModel.is_user.is_(True),
+                    ChatMessageModel.timestamp >= hot_start
+                )
+                .group_by(bucket)
+            ).all()
+        finally:
+            db.close()
+        for value, *counts in rows:
+            totals[_bucket_start(value, period)] = [count or 0 for count in counts]
+
+        if archived_until and start < archived_until:
+            for message in cold_store.with_since(ChatMessageModel, user_id, [], start):
+                if not message.is_user:
+                    continue
+                entry = totals.setdefault(_bucket_start(message.timestamp, period), [0] * (3 + len(SENTIMENTS)))
+                entry[0] += 1
+                if message.emotion_score is not None:
+                    entry[1] += 1
+                    entry[2] += message.emotion_score
+                if message.sentiment in SENTIMENTS:
+                    entry[3 + SENTIMENTS.index(message.sentiment)] += 1
+
+        buckets = [
+            EmotionTrendBucket(
+                start=bucket_start,
+                messages=messages,
+                scored_messages=scored,
+                average_emotion_score=round(score_sum / scored, 4) if scored else None,
+                sentiment=dict(zip(SENTIMENTS, sentiments))
+            )
+            for bucket_start, (messages, scored, score_sum, *sentiments) in sorted(totals.items())
+        ]
+        materialized = await self._materialize_trend(user_id, TREND_PERIODS[period], buckets) if materialize else 0
+        return EmotionTrend(period=period, days=days, buckets=buckets, materialized=materialized)
+
+    async def _materialize_trend(self, user_id: int, progress_period: str, buckets: List[EmotionTrendBucket]) -> int:
+        """Replace the user's chat trend metrics for these buckets in user_progress"""
+        rows = []
+        for bucket in buckets:
+            bucket_date = datetime.combine(bucket.start, datetime.min.time())
+            metrics = {"chat_frequency": bucket.messages}
+            if bucket.average_emotion_score is not None:
+                metrics["chat_emotion_average"] = bucket.average_emotion_score
+            for label, count in bucket.sentiment.items():
+                metrics[f"chat_sentiment_{label}"] = round(count / bucket.messages, 4)
+            rows.extend(
+                UserProgressModel(
+                    user_id=user_id, metric_name=name, metric_value=value, date=bucket_date, period=progress_period
+                )
+                for name, value in metrics.items()
+            )
+        if not rows:
+            return 0
+        metric_names = ["chat_frequency", "chat_emotion_average"] + [f"chat_sentiment_{label}" for label in SENTIMENTS]
+        dates = sorted({row.date for row in rows})
+
+        def write(db: Session) -> int:
+            db.query(UserProgressModel)\
+              .filter(UserProgressModel.user_id == user_id)\
+              .filter(UserProgressModel.period == progress_period)\
+              .filter(UserProgressModel.metric_name.in_(metric_names))\
+              .filter(UserProgressModel.date.in_(dates))\
+              .delete(synchronize_session=False)
+            db.add_all(rows)
+            return len(rows)
+
+        if DB_SINGLE_WRITER:
+            return await db_writer.submit(write)
+        db = next(get_db())
+        try:
+            written = write(db)
+            db.commit()
+            return written
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
     async def generate_response(
         self,
         user_id: int,
@@ -106,54 +309,103 @@ class ChatService:
         sentiment: str
     ) -> str:
         """Generate AI response based on user message and emotional state"""
+        response, _ = await self.generate_reply(user_id, user_message, emotion_analysis, sentiment)
+        return response
+
+    async def generate_reply(
+        self,
+        user_id: int,
+        user_message: str,
+        emotion_analysis: Dict,
+        sentiment: str
+    ) -> Tuple[str, str]:
+        """Generate AI response and the type of response chosen (crisis, coping, supportive, conversational, fallback)"""
         try:
             # Get conversation context
-            context = await self._get_conversation_context(user_id)
-            
-            # Check for crisis situation
-            if self._detect_crisis_indicators(user_message):
-                return await self._generate_crisis_response(user_message, context)
+            started = time.perf_counter()
+            with span("get_conversation_context"):
+                context = await self._get_conversation_context(user_id)
+            context_fetched = time.perf_counter()
+            _CONTEXT_STAGE.observe(context_fetched - started)
             
-            # Determine response type based on emotion analysis
-            distress_level = emotion_analysis.get("distress_level", 0)
-            dominant_emotion = emotion_analysis.get("dominant_emotion", "neutral")
-            
-            if distress_level > 0.7:
-                return await self._generate_high_distress_response(user_message, context, dominant_emotion)
-            elif distress_level > 0.4:
-                return await self._generate_moderate_support_response(user_message, context, dominant_emotion)
-            else:
-                return await self._generate_conversational_response(user_message, context)
+            with span("generate_response") as generation:
+                # Check for crisis situation
+                if self._detect_crisis_indicators(user_message):
+                    reply = await self._generate_crisis_response(user_message, context), "crisis"
+                else:
+                    # Determine response type based on emotion analysis
+                    distress_level = emotion_analysis.get("distress_level", 0)
+                    dominant_emotion = emotion_analysis.get("dominant_emotion", "neutral")
+                    
+                    if distress_level > 0.7:
+                        reply = await self._generate_high_distress_response(user_message, context, dominant_emotion), "coping"
+                    elif distress_level > 0.4:
+                        reply = await self._generate_moderate_support_response(user_message, context, dominant_emotion), "supportive"
+                    else:
+                        reply = await self._generate_conversational_response(user_message, context), "conversational"
+                if generation is not None:
+                    generation.set_attribute("response_type", reply[1])
+            _GENERATION_STAGE.observe(time.perf_counter() - context_fetched)
+            return reply
                 
         except Exception as e:
             # Fallback response if AI generation fails
-            return "I hear you, and I want you to know that your feelings are valid. Sometimes it helps to take a moment to breathe. Would you like to try a quick breathing exercise together?"
+            return "I hear you, and I want you to know that your feelings are valid. Sometimes it helps to take a moment to breathe. Would you like to try a quick breathing exercise together?", "fallback"
+
+    def detect_intent(self, message: str) -> str:
+        """Classify what the user is doing with a message (rule-based)"""
+        message_lower = message.lower().strip()
+        if self._detect_crisis_indicators(message_lower):
+            return "crisis"
+        if any(phrase in message_lower for phrase in ("help me", "what should i", "how do i", "how can i", "any advice", "can you help")):
+            return "seeking_help"
+        if any(phrase in message_lower for phrase in ("thank", "appreciate", "grateful")):
+            return "gratitude"
+        if message_lower.split(" ", 1)[0].strip("!,.") in ("hi", "hello", "hey") and len(message_lower) < 30:
+            return "greeting"
+        if message_lower.endswith("?"):
+            return "question"
+        if any(phrase in message_lower for phrase in ("i feel", "i'm feeling", "i am feeling", "i can't", "i hate", "so tired of")):
+            return "venting"
+        return "sharing"
 
     async def _get_conversation_context(self, user_id: int) -> ConversationContext:
-        """Get conversation context for the user"""
-        db = next(get_db())
+        """Get conversation context for the user (from the context cache when warm)"""
+        db = None
         try:
-            # Get recent messages
-            recent_messages = db.query(ChatMessageModel)\
-                               .filter(ChatMessageModel.user_id == user_id)\
-                               .order_by(ChatMessageModel.timestamp.desc())\
-                               .limit(10)\
-                               .all()
-            
-            # Get user profile
-            user = db.query(UserModel).filter(UserModel.id == user_id).first()
+            def load_recent_messages(limit: int) -> List[str]:
+                nonlocal db
+                db = db or next(get_db())
+                recent_messages = db.query(ChatMessageModel.id, ChatMessageModel.content)\
+                                   .filter(ChatMessageModel.user_id == user_id)\
+                                   .order_by(ChatMessageModel.timestamp.desc(), ChatMessageModel.id.desc())\
+                                   .limit(limit)\
+                                   .all()
+                # Fall through to archived months for users with little recent history
+                recent_messages = cold_store.with_recent(ChatMessageModel, user_id, recent_messages, limit)
+                return [msg.content for msg in reversed(recent_messages)]
+
+            def load_profile() -> Dict:
+                nonlocal db
+                db = db or next(get_db())
+                user = db.query(UserModel).filter(UserModel.id == user_id).first()
+                return {
+                    "name": user.preferred_name or user.name,
+                    "age_range": user.age_range
+                }
+
+            recent_messages = context_cache.get_recent_messages(user_id, load_recent_messages)
+            user_profile = context_cache.get_profile(user_id, load_profile)
             
             return ConversationContext(
                 user_id=user_id,
-                recent_messages=[msg.content for msg in reversed(recent_messages)],
-                user_profile={
-                    "name": user.preferred_name or user.name,
-                    "age_range": user.age_range
-                },
+                recent_messages=recent_messages,
+                user_profile=dict(user_profile),
                 session_length=len(recent_messages)
             )
         finally:
-            db.close()
+            if db is not None:
+                db.close()
 
     def _detect_crisis_indicators(self, message: str) -> bool:
         """Detect crisis indicators in user message"""
@@ -182,7 +434,7 @@ If you're in immediate danger, please call emergency services (911) or go to you
         name_part = f"{user_name}, " if user_name else ""
         
         # Get appropriate coping strategy
-        coping_strategy = await self._get_coping_strategy(emotion)
+        coping_strategy = await self._get_coping_strategy(emotion, context.user_id)
         
         base_response = f"{name_part}I can sense that you're going through a really difficult time right now, and I want you to know that your feelings are completely valid. What you're experiencing sounds overwhelming."
         
@@ -257,20 +509,14 @@ In the meantime, remember that difficult emotions are temporary, even when they
         else:
             return supportive_responses[len(user_message) % len(supportive_responses)]
 
-    async def _get_coping_strategy(self, emotion: str) -> Optional[Dict]:
+    async def _get_coping_strategy(self, emotion: str, user_id: Optional[int] = None) -> Optional[Dict]:
         """Get appropriate coping strategy for emotion"""
-        db = next(get_db())
-        try:
-            strategy = db.query(CopingStrategyModel)\
-                        .filter(CopingStrategyModel.effectiveness_emotions.contains(emotion))\
-                        .first()
-            
-            if strategy:
-                return {
-                    "name": strategy.name,
-                    "instructions": strategy.instructions,
-                    "duration": strategy.duration_minutes
-                }
-            return None
-        finally:
-            db.close()
\ No newline at end of file
+        with span("get_coping_strategy", emotion=emotion):
+            strategy = coping_index.select([emotion], user_id=user_id)
+        if strategy:
+            return {
+                "name": strategy["name"],
+                "instructions": strategy["instructions"],
+                "duration": strategy["duration"]
+            }
+        return None
@@ -0,0 +1,138 @@
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.database import UserModel
+
+logger = logging.getLogger(__name__)
+
+# Messages of context kept per user (the chat turn history window)
+CONTEXT_WINDOW = int(os.getenv("CONTEXT_WINDOW", 10))
+# Active users kept in memory; the least recently used are dropped first
+CONTEXT_CACHE_USERS = int(os.getenv("CONTEXT_CACHE_USERS", 5000))
+# Entries are re-read from the database after this many seconds, which
+# bounds staleness when another worker process served some of the turns
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", 300))
+
+
+class ConversationContextCache:
+    """Per-user ring buffer of recent messages plus a user profile cache.
+
+    The message window is warmed from the database on first access and then
+    appended to by the chat write path, so building a turn's context needs
+    no query. Profiles are dropped whenever a UserModel row is updated.
+    """
+
+    def __init__(
+        self,
+        window: int = CONTEXT_WINDOW,
+        max_users: int = CONTEXT_CACHE_USERS,
+        ttl: float = CONTEXT_CACHE_TTL
+    ):
+        self.window = window
+        self.max_users = max_users
+        self.ttl = ttl
+        # user_id -> (loaded_at, deque of message contents, oldest first)
+        self._messages: "OrderedDict[int, Tuple[float, deque]]" = OrderedDict()
+        # user_id -> (loaded_at, profile dict)
+        self._profiles: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, entries: OrderedDict, user_id: int):
+        entry = entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del entries[user_id]
+            return None
+        entries.move_to_end(user_id)
+        return entry[1]
+
+    def _put(self, entries: OrderedDict, user_id: int, value):
+        entries[user_id] = (time.monotonic(), value)
+        entries.move_to_end(user_id)
+        while len(entries) > self.max_users:
+            entries.popitem(last=False)
+
+    def get_recent_messages(self, user_id: int, loader: Callable[[int], List[str]]) -> List[str]:
+        """Recent message contents, oldest first; ``loader`` reads them on a miss"""
+        messages = self._get(self._messages, user_id)
+        if messages is None:
+            self.misses += 1
+            messages = deque(loader(self.window), maxlen=self.window)
+            self._put(self._messages, user_id, messages)
+        else:
+            self.hits += 1
+        return list(messages)
+
+    def append_message(self, user_id: int, content: str):
+        """Record a newly saved message; users not in the cache are warmed on next read"""
+        messages = self._get(self._messages, user_id)
+        if messages is not None:
+            messages.append(content)
+
+    def get_profile(self, user_id: int, loader: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Cached user profile; ``loader`` reads it on a miss"""
+        profile = self._get(self._profiles, user_id)
+        if profile is None:
+            self.misses += 1
+            profile = loader()
+            if profile is not None:
+                self._put(self._profiles, user_id, profile)
+        else:
+            self.hits += 1
+        return profile
+
+    def invalidate_profile(self, user_id: int):
+        self._profiles.pop(user_id, None)
+
+    def invalidate(self, user_id: int):
+        """Drop everything cached for a user"""
+        self._messages.pop(user_id, None)
+        self._profiles.pop(user_id, None)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._messages),
+            "profiles": len(self._profiles),
+            "window": self.window,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+context_cache = ConversationContextCache()
+
+
+_UPDATED_USERS = "context_cache_updated_users"
+
+
+@event.listens_for(UserModel, "after_update")
+def _record_profile_update(mapper, connection, target):
+    # Flush time: a read before the commit would cache the old profile
+    # again, so drop it once the change is committed
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_UPDATED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_profiles(session):
+    for user_id in session.info.pop(_UPDATED_USERS, ()):
+        context_cache.invalidate_profile(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_profile_updates(session):
+    session.info.pop(_UPDATED_USERS, None)
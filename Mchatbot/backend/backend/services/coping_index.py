@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.database import SessionLocal, CopingStrategyModel
+
+logger = logging.getLogger(__name__)
+
+# Rebuild at least this often, so changes made by other worker processes
+# are picked up too (changes in this process mark the index dirty at once)
+COPING_INDEX_TTL = float(os.getenv("COPING_INDEX_TTL", 300))
+
+# Emotion model labels mapped to related strategy tags, matched at lower weight
+EMOTION_ALIASES = {
+    "fear": ["anxiety", "panic"],
+    "anxiety": ["stress", "panic"],
+    "sadness": ["depression", "negative_thinking"],
+    "anger": ["tension", "stress"],
+    "disgust": ["stress"],
+    "stress": ["tension", "overwhelm"]
+}
+ALIAS_WEIGHT = 0.5
+
+# Easier techniques first when scores tie: people in distress should not be
+# handed a 15-minute exercise when a 3-minute one fits as well
+_DIFFICULTY_ORDER = {"easy": 0, "medium": 1, "hard": 2}
+
+
+class CopingStrategyIndex:
+    """In-memory emotion -> coping strategies index over ``coping_strategies``.
+
+    Built once from the table and rebuilt lazily after a commit that inserted,
+    updated or deleted a CopingStrategyModel in this process (or after
+    ``COPING_INDEX_TTL`` seconds), so lookups never touch the database.
+    """
+
+    def __init__(self, ttl: float = COPING_INDEX_TTL, rotation_size: int = 10000):
+        self.ttl = ttl
+        self.strategies: Dict[int, Dict] = {}
+        # emotion -> [(strategy id, position of the emotion in its list)]
+        self.by_emotion: Dict[str, List] = {}
+        self.loaded_at: Optional[float] = None
+        self._dirty = True
+        # Per-user rotation counters, least recently used dropped first
+        self._rotation: "OrderedDict[int, int]" = OrderedDict()
+        self.rotation_size = rotation_size
+
+        # Statistics
+        self.rebuilds = 0
+        self.lookups = 0
+
+    def mark_dirty(self, *args):
+        self._dirty = True
+
+    def load(self):
+        """(Re)build the index from the database"""
+        db = SessionLocal()
+        try:
+            rows = db.query(CopingStrategyModel).all()
+        finally:
+            db.close()
+
+        strategies = {}
+        by_emotion: Dict[str, List] = {}
+        for row in rows:
+            try:
+                emotions = json.loads(row.effectiveness_emotions or "[]")
+            except ValueError:
+                logger.warning(f"Coping strategy {row.id} has invalid effectiveness_emotions; skipping")
+                continue
+            strategies[row.id] = {
+                "id": row.id,
+                "name": row.name,
+                "category": row.category,
+                "description": row.description,
+                "instructions": row.instructions,
+                "duration": row.duration_minutes,
+                "difficulty": row.difficulty_level
+            }
+            for position, emotion in enumerate(emotions):
+                by_emotion.setdefault(emotion.lower(), []).append((row.id, position))
+
+        self.strategies, self.by_emotion = strategies, by_emotion
+        self.loaded_at = time.monotonic()
+        self._dirty = False
+        self.rebuilds += 1
+        logger.info(f"Coping strategy index built: {len(strategies)} strategies, {len(by_emotion)} emotions")
+
+    def _ensure_fresh(self):
+        if self._dirty or self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def rank(self, emotions: Union[List[str], Dict[str, float]], limit: int = 3) -> List[Dict]:
+        """Strategies ranked for one or more emotions.
+
+        ``emotions`` is either a list, most important first, or a mapping of
+        emotion -> score such as MLService emotion analysis output. A
+        strategy scores higher the more of the emotions it is tagged with,
+        and the earlier each emotion appears in its tag list.
+        """
+        self._ensure_fresh()
+        self.lookups += 1
+        if not isinstance(emotions, dict):
+            emotions = {emotion: 1.0 / (i + 1) for i, emotion in enumerate(emotions)}
+
+        scores: Dict[int, float] = {}
+        for emotion, weight in emotions.items():
+            emotion = emotion.lower()
+            tags = [(emotion, weight)] + [(alias, weight * ALIAS_WEIGHT) for alias in EMOTION_ALIASES.get(emotion, [])]
+            for tag, tag_weight in tags:
+                for strategy_id, position in self.by_emotion.get(tag, []):
+                    scores[strategy_id] = scores.get(strategy_id, 0.0) + tag_weight / (position + 1)
+
+        ranked = sorted(
+            scores,
+            key=lambda sid: (
+                -scores[sid],
+                _DIFFICULTY_ORDER.get(self.strategies[sid]["difficulty"], 1),
+                sid
+            )
+        )
+        return [self.strategies[sid] for sid in ranked[:limit]]
+
+    def select(self, emotions: Union[List[str], Dict[str, float]], user_id: Optional[int] = None, candidates: int = 3) -> Optional[Dict]:
+        """One strategy for the emotions, rotating through the top candidates per user"""
+        ranked = self.rank(emotions, limit=candidates)
+        if not ranked:
+            return None
+        if user_id is None:
+            return ranked[0]
+
+        turn = self._rotation.pop(user_id, 0)
+        self._rotation[user_id] = turn + 1
+        if len(self._rotation) > self.rotation_size:
+            self._rotation.popitem(last=False)
+        return ranked[turn % len(ranked)]
+
+    def get_stats(self) -> Dict:
+        """Index statistics"""
+        return {
+            "strategies": len(self.strategies),
+            "emotions": len(self.by_emotion),
+            "rebuilds": self.rebuilds,
+            "lookups": self.lookups,
+            "age_s": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+        }
+
+
+coping_index = CopingStrategyIndex()
+
+_CHANGED = "coping_strategies_changed"
+
+
+def _record_change(mapper, connection, target):
+    # Flush time: the rows are not committed yet, so a rebuild now would
+    # still read the old ones. Remember the change until the commit.
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_CHANGED, False):
+        coping_index.mark_dirty()
+
+
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(CopingStrategyModel, _event, _record_change)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
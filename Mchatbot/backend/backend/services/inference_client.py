@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "/tmp/mchatbot-inference.sock")
+INFERENCE_TIMEOUT_MS = float(os.getenv("INFERENCE_TIMEOUT_MS", 2000))
+INFERENCE_MAX_IN_FLIGHT = int(os.getenv("INFERENCE_MAX_IN_FLIGHT", 64))
+# How long to stop trying a worker that is down before reconnecting
+INFERENCE_RETRY_INTERVAL = float(os.getenv("INFERENCE_RETRY_INTERVAL", 5))
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON object
+_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 1024 * 1024
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict:
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame too large: {length} bytes")
+    return json.loads(await reader.readexactly(length))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Dict):
+    body = json.dumps(message, separators=(",", ":")).encode()
+    writer.write(_HEADER.pack(len(body)) + body)
+
+
+class InferenceUnavailable(Exception):
+    """The inference worker cannot serve this request (down, saturated or slow)"""
+
+
+class InferenceClient:
+    """Client for the standalone inference worker over a Unix domain socket.
+
+    One connection is shared by all coroutines in the process and requests
+    are multiplexed by id. ``predict`` never waits for capacity: when too
+    many requests are in flight, the worker reports itself saturated, the
+    call times out or the worker is down, it raises InferenceUnavailable
+    immediately so the caller can fall back to rule-based detection.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = INFERENCE_SOCKET,
+        timeout_ms: float = INFERENCE_TIMEOUT_MS,
+        max_in_flight: int = INFERENCE_MAX_IN_FLIGHT,
+        retry_interval: float = INFERENCE_RETRY_INTERVAL
+    ):
+        self.socket_path = socket_path
+        self.timeout = timeout_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.retry_interval = retry_interval
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._down_until = 0.0
+
+        # Statistics
+        self.requests = 0
+        self.failures = {"down": 0, "saturated": 0, "timeout": 0, "error": 0}
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def _ensure_connected(self):
+        if self.connected:
+            return
+        if time.monotonic() < self._down_until:
+            raise InferenceUnavailable("inference worker marked down")
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self._mark_down(f"connect failed: {e}")
+                raise InferenceUnavailable(f"cannot connect to inference worker: {e}")
+            self._reader_task = asyncio.ensure_future(self._read_responses(self._reader))
+            logger.info(f"Connected to inference worker at {self.socket_path}")
+
+    def _mark_down(self, reason: str):
+        self._down_until = time.monotonic() + self.retry_interval
+        logger.warning(f"Inference worker unavailable ({reason}); retrying in {self.retry_interval}s")
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                message = await read_frame(reader)
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            self._mark_down(f"connection lost: {e}")
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(InferenceUnavailable("connection to inference worker lost"))
+        self._pending.clear()
+
+    async def predict(self, text: str) -> Dict[str, float]:
+        """Emotion scores for ``text`` from the inference worker"""
+        self.requests += 1
+        if self.in_flight >= self.max_in_flight:
+            self.failures["saturated"] += 1
+            raise InferenceUnavailable("too many requests in flight")
+
+        try:
+            await self._ensure_connected()
+        except InferenceUnavailable:
+            self.failures["down"] += 1
+            raise
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            write_frame(self._writer, {"id": request_id, "text": text})
+            await asyncio.wait_for(self._writer.drain(), self.timeout)
+            response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.failures["timeout"] += 1
+            raise InferenceUnavailable("inference request timed out")
+        except InferenceUnavailable:
+            self.failures["down"] += 1
+            raise
+        except (ConnectionError, AttributeError) as e:
+            self.failures["down"] += 1
+            self._mark_down(f"send failed: {e}")
+            self._close()
+            raise InferenceUnavailable(f"inference request failed: {e}")
+        finally:
+            self._pending.pop(request_id, None)
+
+        if "error" in response:
+            key = "saturated" if response["error"] == "saturated" else "error"
+            self.failures[key] += 1
+            raise InferenceUnavailable(f"inference worker error: {response['error']}")
+        return response["emotions"]
+
+    def get_stats(self) -> Dict:
+        """Client statistics"""
+        return {
+            "socket": self.socket_path,
+            "connected": self.connected,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": dict(self.failures)
+        }
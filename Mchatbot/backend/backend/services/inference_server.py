@@ -0,0 +1,112 @@
+"""
+Standalone emotion inference worker.
+
+Owns the emotion model and serves API processes started with
+ML_BACKEND=remote over a Unix domain socket. Concurrent requests, from any
+number of API workers, are coalesced into batched model calls. When the
+batch queue is full the worker answers "saturated" straight away so the
+caller can fall back to rule-based detection instead of queueing.
+
+Run from the backend directory:
+    python -m services.inference_server
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+from services.inference_client import INFERENCE_SOCKET, read_frame, write_frame
+from services.ml_service import MLService
+from utils.batching import BatchQueueFull
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceServer:
+    def __init__(self, ml_service: MLService, socket_path: str = INFERENCE_SOCKET):
+        self.ml_service = ml_service
+        self.socket_path = socket_path
+        self.batcher = ml_service.emotion_batcher
+        self.connections = 0
+
+    async def _answer(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock, request: dict):
+        response = {"id": request.get("id")}
+        try:
+            response["emotions"] = await self.batcher.submit(request["text"])
+        except BatchQueueFull:
+            response["error"] = "saturated"
+        except Exception as e:
+            logger.error(f"Inference failed: {e}")
+            response["error"] = "inference_failed"
+
+        if writer.is_closing():
+            return
+        write_frame(writer, response)
+        async with write_lock:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                request = await read_frame(reader)
+                task = asyncio.ensure_future(self._answer(writer, write_lock, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning(f"Dropping client after bad frame: {e}")
+        finally:
+            self.connections -= 1
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        logger.info(
+            f"Inference worker {os.getpid()} listening on {self.socket_path} "
+            f"(batch size {self.batcher.max_batch_size}, queue {self.batcher.max_queue})"
+        )
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with server:
+            await stop.wait()
+
+        logger.info(f"Inference worker stopping: {self.batcher.get_stats()}")
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "info").upper())
+
+    ml_service = MLService()
+    ml_service._load_emotion_model()
+    if ml_service.emotion_pipeline is None:
+        logger.error(f"Emotion model failed to load ({ml_service.model_load_error}); not starting")
+        sys.exit(1)
+
+    asyncio.run(InferenceServer(ml_service).serve())
+
+
+if __name__ == "__main__":
+    main()
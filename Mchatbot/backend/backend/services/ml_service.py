@@ -1,23 +1,82 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-from textblob import TextBlob
-import nltk
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import os
+import re
 import time
 from functools import lru_cache
 
-# Download required NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('vader_lexicon', quiet=True)
-except:
-    pass
+from services.inference_client import InferenceClient
+from utils.admission import AdmissionController
+from utils.batching import BatchQueueFull, MicroBatcher
+from utils.metrics import Counter, Gauge, Histogram
 
-from nltk.sentiment import SentimentIntensityAnalyzer
+# torch/transformers, nltk and TextBlob are imported lazily: importing this
+# module must stay cheap and must never touch the network.
+
+# Local bundle with pre-fetched resources:
+#   <ML_BUNDLE_DIR>/nltk_data/        NLTK data (sentiment/vader_lexicon.zip)
+#   <ML_BUNDLE_DIR>/emotion_model/    saved emotion model + tokenizer
+ML_BUNDLE_DIR = os.getenv("ML_BUNDLE_DIR", "")
+# Never download anything; resources must come from the bundle or local caches
+ML_OFFLINE = os.getenv("ML_OFFLINE", "false").lower() == "true"
+# background: serve rule-based results until the model is loaded
+# blocking: finish loading the model before startup completes
+# disabled: never load the model
+ML_WARMUP = os.getenv("ML_WARMUP", "background").lower()
+EMOTION_MODEL_NAME = os.getenv("EMOTION_MODEL_NAME", "j-hartmann/emotion-english-distilroberta-base")
+# local: run the emotion model in this process
+# remote: send emotion inference to the standalone worker (services.inference_server)
+ML_BACKEND = os.getenv("ML_BACKEND", "local").lower()
+
+# Emotion model inputs are truncated to this many tokens. Longer texts are
+# split at sentence boundaries into chunks of at most this size, scored
+# separately and averaged weighted by chunk length.
+ML_MAX_SEQ_LENGTH = int(os.getenv("ML_MAX_SEQ_LENGTH", 128))
+ML_CHUNK_LONG_TEXTS = os.getenv("ML_CHUNK_LONG_TEXTS", "true").lower() == "true"
+# Token-length bucket boundaries: each bucket is one padded model call, so
+# short messages are not padded to the length of the longest in the batch
+ML_LENGTH_BUCKETS = [int(b) for b in os.getenv("ML_LENGTH_BUCKETS", "16,32,64").split(",") if b.strip()]
+# Concurrent emotion requests are coalesced into batches (in-process and in
+# the inference worker)
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 16))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", 5))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 256))
+# Sentiment scoring runs on the executor too: concurrent messages are
+# batched, bulk callers (analyze_sentiment_batch) send chunks of this size
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", 32))
+SENTIMENT_BATCH_WAIT_MS = float(os.getenv("SENTIMENT_BATCH_WAIT_MS", 2))
+SENTIMENT_BULK_CHUNK = int(os.getenv("SENTIMENT_BULK_CHUNK", 256))
+
+# Load shedding: past either threshold, messages the rule-based detector
+# rates below ML_SHED_MAX_DISTRESS skip the model until load recovers
+ML_LOAD_SHEDDING = os.getenv("ML_LOAD_SHEDDING", "true").lower() == "true"
+ML_SHED_QUEUE_DEPTH = int(os.getenv("ML_SHED_QUEUE_DEPTH", 32))
+ML_SHED_LATENCY_MS = float(os.getenv("ML_SHED_LATENCY_MS", 1500))
+ML_SHED_RECOVER_RATIO = float(os.getenv("ML_SHED_RECOVER_RATIO", 0.5))
+ML_SHED_PROBE_INTERVAL = float(os.getenv("ML_SHED_PROBE_INTERVAL", 1.0))
+ML_SHED_MAX_DISTRESS = float(os.getenv("ML_SHED_MAX_DISTRESS", 0.5))
+
+ML_INFERENCE_SECONDS = Histogram(
+    "ml_inference_seconds", "Emotion model latency per request, including batch queue wait", ["backend"]
+)
+ML_CACHE_LOOKUPS = Counter("ml_cache_lookups_total", "Analysis result cache lookups", ["analysis", "result"])
+ML_QUEUE_DEPTH = Gauge("ml_inference_queue_depth", "Emotion requests waiting for or running on the model")
+_EMOTION_CACHE_HIT = ML_CACHE_LOOKUPS.labels("emotion", "hit")
+_EMOTION_CACHE_MISS = ML_CACHE_LOOKUPS.labels("emotion", "miss")
+_SENTIMENT_CACHE_HIT = ML_CACHE_LOOKUPS.labels("sentiment", "hit")
+_SENTIMENT_CACHE_MISS = ML_CACHE_LOOKUPS.labels("sentiment", "miss")
+
+SENTIMENT_ERROR_FALLBACK = {
+    "sentiment": "neutral",
+    "confidence": 0.1,
+    "scores": {"compound": 0},
+    "model_used": "error_fallback"
+}
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +87,34 @@ class MLService:
         self.sentiment_analyzer = None
         self.emotion_pipeline = None
         self.executor = ThreadPoolExecutor(max_workers=2)
+        self._warmup_task: Optional[asyncio.Task] = None
+        self.model_load_error: Optional[str] = None
+        self.model_load_seconds: Optional[float] = None
+        self.inference_client = InferenceClient() if ML_BACKEND == "remote" else None
+        self.emotion_batcher = MicroBatcher(
+            self._predict_emotions_batch,
+            self.executor,
+            max_batch_size=INFERENCE_BATCH_SIZE,
+            max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+            max_queue=INFERENCE_QUEUE_SIZE,
+            name="emotion"
+        )
+        self.sentiment_batcher = MicroBatcher(
+            self._score_sentiment_batch,
+            self.executor,
+            max_batch_size=SENTIMENT_BATCH_SIZE,
+            max_wait_ms=SENTIMENT_BATCH_WAIT_MS,
+            max_queue=INFERENCE_QUEUE_SIZE,
+            name="sentiment"
+        )
+        self.admission = AdmissionController(
+            max_queue_depth=ML_SHED_QUEUE_DEPTH,
+            max_latency_ms=ML_SHED_LATENCY_MS,
+            recover_ratio=ML_SHED_RECOVER_RATIO,
+            probe_interval=ML_SHED_PROBE_INTERVAL
+        )
+        self._inference_metric = ML_INFERENCE_SECONDS.labels(ML_BACKEND)
+        ML_QUEUE_DEPTH.set_function(lambda: self.inference_queue_depth)
         
         # Cache for ML responses
         self.emotion_cache = {}
@@ -76,33 +163,125 @@ class MLService:
         }
 
     async def initialize(self):
-        """Initialize ML models asynchronously"""
-        try:
-            # Initialize sentiment analyzer
-            self.sentiment_analyzer = SentimentIntensityAnalyzer()
-            logger.info("Sentiment analyzer initialized successfully")
-            
-            # Initialize emotion detection pipeline with a smaller, faster model
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                self.executor,
-                self._load_emotion_model
+        """Initialize ML models asynchronously
+
+        The sentiment analyzer is ready when this returns. The emotion model
+        is loaded according to ``ML_WARMUP``; until it is up, emotion
+        analysis uses the rule-based path.
+        """
+        loop = asyncio.get_event_loop()
+        if self.sentiment_analyzer is None:
+            try:
+                self.sentiment_analyzer = await loop.run_in_executor(
+                    self.executor,
+                    self._load_sentiment_analyzer
+                )
+                logger.info("Sentiment analyzer initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize sentiment analyzer: {e}")
+                # Continue without VADER - TextBlob fallback is used instead
+                self.sentiment_analyzer = None
+
+        if self.inference_client is not None:
+            logger.info(f"Emotion inference delegated to worker at {self.inference_client.socket_path}")
+        elif self.emotion_pipeline is not None:
+            logger.info("Emotion model already loaded (preloaded before fork)")
+        elif ML_WARMUP == "disabled":
+            self.model_load_error = "disabled"
+            logger.info("Emotion model warm-up disabled; using rule-based emotion detection")
+        elif self.emotion_pipeline is None and self._warmup_task is None:
+            self._warmup_task = asyncio.ensure_future(
+                loop.run_in_executor(self.executor, self._load_emotion_model)
             )
-            
-            logger.info("ML Service initialized successfully")
-            
+            if ML_WARMUP == "blocking":
+                await self._warmup_task
+
+        logger.info("ML Service initialized successfully")
+
+    def preload(self):
+        """Load all models synchronously, without an event loop.
+
+        Used by the pre-fork server: the master loads the weights once, and
+        forked workers share those pages copy-on-write instead of each
+        loading a private copy.
+        """
+        try:
+            self.sentiment_analyzer = self._load_sentiment_analyzer()
         except Exception as e:
-            logger.error(f"Failed to initialize ML models: {e}")
-            # Continue without ML models - use rule-based fallbacks
-            self.sentiment_analyzer = None
-            self.emotion_pipeline = None
+            logger.error(f"Failed to preload sentiment analyzer: {e}")
+        if ML_WARMUP != "disabled" and self.inference_client is None:
+            self._load_emotion_model()
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the emotion model has finished loading (or failed to)
+
+        With the remote backend the model lives in the inference worker, and
+        requests fall back to rule-based detection while it is unavailable.
+        """
+        if self.inference_client is not None:
+            return True
+        return self.emotion_pipeline is not None or self.model_load_error is not None
+
+    def get_readiness(self) -> Dict:
+        """Readiness details for the /api/ready endpoint"""
+        readiness = {
+            "ready": self.is_ready,
+            "backend": ML_BACKEND,
+            "emotion_model_loaded": self.emotion_pipeline is not None,
+            "sentiment_analyzer_loaded": self.sentiment_analyzer is not None,
+            "degraded": self.model_load_error is not None,
+            "model_load_error": self.model_load_error,
+            "model_load_seconds": self.model_load_seconds
+        }
+        if self.inference_client is not None:
+            readiness["inference_worker"] = self.inference_client.get_stats()
+        return readiness
+
+    def _configure_offline_mode(self):
+        """Point NLTK/Hugging Face at local resources and forbid downloads"""
+        if ML_BUNDLE_DIR:
+            import nltk
+            nltk_dir = os.path.join(ML_BUNDLE_DIR, "nltk_data")
+            if os.path.isdir(nltk_dir) and nltk_dir not in nltk.data.path:
+                nltk.data.path.insert(0, nltk_dir)
+
+        if ML_OFFLINE:
+            os.environ.setdefault("HF_HUB_OFFLINE", "1")
+            os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    def _load_sentiment_analyzer(self):
+        """Load VADER, downloading its lexicon only if allowed and missing"""
+        import nltk
+        self._configure_offline_mode()
+
+        try:
+            nltk.data.find("sentiment/vader_lexicon.zip")
+        except LookupError:
+            if ML_OFFLINE:
+                raise
+            nltk.download("vader_lexicon", quiet=True)
+
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+
+    def _resolve_emotion_model(self) -> str:
+        """Use the bundled model directory when present, else the hub name"""
+        if ML_BUNDLE_DIR:
+            bundled = os.path.join(ML_BUNDLE_DIR, "emotion_model")
+            if os.path.isdir(bundled):
+                return bundled
+        return EMOTION_MODEL_NAME
 
     def _load_emotion_model(self):
         """Load emotion detection model in thread executor"""
+        started = time.perf_counter()
+        model_name = self._resolve_emotion_model()
         try:
+            self._configure_offline_mode()
+            from transformers import pipeline
+
             # Use a smaller, faster model for better performance
-            model_name = "j-hartmann/emotion-english-distilroberta-base"
-            
             self.emotion_pipeline = pipeline(
                 "text-classification",
                 model=model_name,
@@ -110,28 +289,13 @@ class MLService:
                 return_all_scores=True
             )
             
-            logger.info("Emotion detection model loaded successfully")
+            self.model_load_seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"Emotion detection model loaded successfully in {self.model_load_seconds}s")
             
         except Exception as e:
             logger.warning(f"Failed to load emotion model: {e}. Using rule-based emotion detection.")
             self.emotion_pipeline = None
-        except RuntimeError as e:
-            if "CUDA" in str(e):
-                logger.warning("CUDA not available, falling back to CPU for emotion model")
-                try:
-                    self.emotion_pipeline = pipeline(
-                        "text-classification",
-                        model=model_name,
-                        device=-1,
-                        return_all_scores=True
-                    )
-                    logger.info("Emotion detection model loaded successfully on CPU")
-                except Exception as cpu_e:
-                    logger.warning(f"Failed to load emotion model on CPU: {cpu_e}. Using rule-based detection.")
-                    self.emotion_pipeline = None
-            else:
-                logger.warning(f"Failed to load emotion model: {e}. Using rule-based emotion detection.")
-                self.emotion_pipeline = None
+            self.model_load_error = str(e)
 
     async def analyze_emotion(self, text: str) -> Dict:
         """Analyze emotion and calculate distress level"""
@@ -140,8 +304,10 @@ class MLService:
             cache_key = self._get_cache_key(text, "emotion")
             cached_result = self._get_from_cache(self.emotion_cache, cache_key)
             if cached_result:
+                _EMOTION_CACHE_HIT.inc()
                 logger.info(f"Emotion analysis cache hit for text: {text[:50]}...")
                 return cached_result
+            _EMOTION_CACHE_MISS.inc()
             
             # Quick crisis check
             crisis_detected = self._detect_crisis_keywords(text)
@@ -154,27 +320,11 @@ class MLService:
                     "model_used": "crisis_detection",
                     "confidence": 0.95
                 }
+                self.admission.record("crisis")
                 self._add_to_cache(self.emotion_cache, cache_key, result)
                 return result
             
-            if self.emotion_pipeline:
-                # Use ML model for emotion detection
-                try:
-                    loop = asyncio.get_event_loop()
-                    emotions = await loop.run_in_executor(
-                        self.executor,
-                        self._predict_emotions,
-                        text
-                    )
-                    model_used = "ml_model"
-                except Exception as ml_error:
-                    logger.warning(f"ML emotion analysis failed: {ml_error}. Falling back to rule-based detection.")
-                    emotions = self._rule_based_emotion_detection(text)
-                    model_used = "rule_based_fallback"
-            else:
-                # Fallback to rule-based emotion detection
-                emotions = self._rule_based_emotion_detection(text)
-                model_used = "rule_based"
+            emotions, model_used = await self._infer_emotions(text)
             
             # Calculate distress level
             distress_level = self._calculate_distress_level(emotions)
@@ -191,8 +341,11 @@ class MLService:
                 "confidence": self._calculate_confidence(emotions, model_used)
             }
             
-            # Cache the result
-            self._add_to_cache(self.emotion_cache, cache_key, result)
+            # Cache model results only: keyword results (model still loading,
+            # shed, or inference failing) are cheap to redo and must not
+            # outlive the condition that produced them
+            if model_used.startswith("ml_model"):
+                self._add_to_cache(self.emotion_cache, cache_key, result)
             return result
             
         except Exception as e:
@@ -206,18 +359,142 @@ class MLService:
                 "confidence": 0.1
             }
 
+    @property
+    def inference_queue_depth(self) -> int:
+        """Emotion requests waiting for or running on the model"""
+        if self.inference_client is not None:
+            return self.inference_client.in_flight
+        return self.emotion_batcher.queue_depth
+
+    async def _infer_emotions(self, text: str):
+        """Emotion scores and the name of the model that produced them"""
+        if self.inference_client is None and not self.emotion_pipeline:
+            # Fallback to rule-based emotion detection
+            return self._rule_based_emotion_detection(text), "rule_based"
+
+        tier = "model"
+        if ML_LOAD_SHEDDING and self.admission.should_shed(self.inference_queue_depth):
+            emotions = self._rule_based_emotion_detection(text)
+            if self._calculate_distress_level(emotions) < ML_SHED_MAX_DISTRESS:
+                self.admission.record("shed")
+                return emotions, "rule_based_shed"
+            # Distressed messages keep the model even under load
+            tier = "priority"
+
+        started = time.perf_counter()
+        try:
+            if self.inference_client is not None:
+                emotions, model_used = await self.inference_client.predict(text), "ml_model_remote"
+            else:
+                # Use ML model for emotion detection
+                emotions, model_used = await self.emotion_batcher.submit(text), "ml_model"
+        except Exception as ml_error:
+            logger.warning(f"ML emotion analysis failed: {ml_error}. Falling back to rule-based detection.")
+            self.admission.record("fallback")
+            return self._rule_based_emotion_detection(text), "rule_based_fallback"
+
+        elapsed = time.perf_counter() - started
+        self._inference_metric.observe(elapsed)
+        self.admission.observe(elapsed)
+        self.admission.record(tier)
+        if tier == "priority":
+            # Admitted past shedding because of distress: keep the tier visible
+            model_used = f"{model_used}_priority"
+        return emotions, model_used
+
+    def get_stats(self) -> Dict:
+        """Inference backend, batching and load-shedding statistics"""
+        stats = {
+            "backend": ML_BACKEND,
+            "model_loaded": self.emotion_pipeline is not None,
+            "load_shedding_enabled": ML_LOAD_SHEDDING,
+            "admission": self.admission.get_stats(),
+            "batching": self.emotion_batcher.get_stats(),
+            "sentiment_batching": self.sentiment_batcher.get_stats()
+        }
+        if self.inference_client is not None:
+            stats["inference_worker"] = self.inference_client.get_stats()
+        return stats
+
+    def _segment_text(self, text: str, length: int, max_length: int) -> List[Tuple[str, int]]:
+        """Split a text longer than ``max_length`` tokens into sentence chunks
+
+        Returns (chunk, token_count) pairs. A single sentence longer than
+        ``max_length`` becomes its own chunk and is truncated by the tokenizer.
+        """
+        if length <= max_length:
+            return [(text, length)]
+
+        sentences = [s for s in _SENTENCE_BOUNDARY.split(text) if s.strip()]
+        if len(sentences) < 2:
+            return [(text, max_length)]
+
+        tokenizer = self.emotion_pipeline.tokenizer
+        budget = max_length - tokenizer.num_special_tokens_to_add()
+        sentence_lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+
+        chunks = []
+        current, current_length = [], 0
+        for sentence, sentence_length in zip(sentences, sentence_lengths):
+            if current and current_length + sentence_length > budget:
+                chunks.append((" ".join(current), current_length))
+                current, current_length = [], 0
+            current.append(sentence)
+            current_length += sentence_length
+        if current:
+            chunks.append((" ".join(current), current_length))
+
+        return [(chunk, min(chunk_length, budget)) for chunk, chunk_length in chunks]
+
+    def _predict_emotions_batch(
+        self,
+        texts: List[str],
+        max_length: int = ML_MAX_SEQ_LENGTH,
+        chunk_long_texts: bool = ML_CHUNK_LONG_TEXTS
+    ) -> List[Dict[str, float]]:
+        """Predict emotions for several texts, one padded model call per length bucket"""
+        texts = list(texts)
+        tokenizer = self.emotion_pipeline.tokenizer
+        lengths = [len(ids) for ids in tokenizer(texts)["input_ids"]]
+
+        # (text index, segment, token count) for every piece the model scores
+        segments = []
+        for index, (text, length) in enumerate(zip(texts, lengths)):
+            if chunk_long_texts:
+                pieces = self._segment_text(text, length, max_length)
+            else:
+                pieces = [(text, min(length, max_length))]
+            segments.extend((index, segment, segment_length) for segment, segment_length in pieces)
+
+        buckets: Dict[int, List] = {}
+        for segment in segments:
+            bound = next((b for b in ML_LENGTH_BUCKETS if segment[2] <= b), max_length)
+            buckets.setdefault(bound, []).append(segment)
+
+        totals: List[Dict[str, float]] = [{} for _ in texts]
+        weights = [0] * len(texts)
+        for bucket in buckets.values():
+            results = self.emotion_pipeline(
+                [segment for _, segment, _ in bucket],
+                batch_size=len(bucket),
+                truncation=True,
+                max_length=max_length
+            )
+            for (index, _, weight), scores in zip(bucket, results):
+                weights[index] += weight
+                for result in scores:
+                    emotion = result['label'].lower()
+                    totals[index][emotion] = totals[index].get(emotion, 0.0) + result['score'] * weight
+
+        return [
+            {emotion: score / weight for emotion, score in total.items()}
+            for total, weight in zip(totals, weights)
+        ]
+
     def _predict_emotions(self, text: str) -> Dict[str, float]:
         """Predict emotions using ML model"""
         try:
-            results = self.emotion_pipeline(text)
-            emotions = {}
-            
-            for result in results[0]:  # results is a list with one element
-                emotion = result['label'].lower()
-                score = result['score']
-                emotions[emotion] = score
-            
-            return emotions
+            return self._predict_emotions_batch([text])[0]
             
         except Exception as e:
             logger.error(f"Error in ML emotion prediction: {e}")
@@ -250,15 +527,69 @@ class MLService:
         return emotions
 
     async def analyze_sentiment(self, text: str) -> Dict:
-        """Analyze sentiment of text with confidence scores"""
+        """Analyze sentiment of text with confidence scores
+
+        Scoring (VADER, or TextBlob without it) is pure Python and runs on
+        the executor: concurrent calls are batched by ``sentiment_batcher``
+        instead of holding the event loop for each message.
+        """
+        cache_key = self._get_cache_key(text, "sentiment")
+        cached_result = self._get_from_cache(self.sentiment_cache, cache_key)
+        if cached_result:
+            _SENTIMENT_CACHE_HIT.inc()
+            logger.info(f"Sentiment analysis cache hit for text: {text[:50]}...")
+            return cached_result
+        _SENTIMENT_CACHE_MISS.inc()
+
+        try:
+            result = await self.sentiment_batcher.submit(text)
+        except BatchQueueFull:
+            # Overloaded: answer neutral without caching it
+            return dict(SENTIMENT_ERROR_FALLBACK)
+        except Exception as e:
+            logger.error(f"Error in sentiment analysis: {e}")
+            result = dict(SENTIMENT_ERROR_FALLBACK)
+        self._add_to_cache(self.sentiment_cache, cache_key, result)
+        return result
+
+    async def analyze_sentiment_batch(self, texts: List[str], use_cache: bool = True) -> List[Dict]:
+        """Sentiment of many texts, in order, scored in executor batches
+
+        For backfills and other bulk work: bypasses the micro-batch queue
+        (which coalesces single requests) and scores
+        ``SENTIMENT_BULK_CHUNK`` texts per executor call. Repeated texts are
+        scored once. With ``use_cache=False`` the analysis cache is neither
+        read nor filled, so a bulk job does not evict live entries.
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            if use_cache:
+                cached = self._get_from_cache(self.sentiment_cache, self._get_cache_key(text, "sentiment"))
+                if cached:
+                    results[index] = cached
+                    continue
+            pending.setdefault(text, []).append(index)
+
+        loop = asyncio.get_running_loop()
+        unique = list(pending)
+        for offset in range(0, len(unique), SENTIMENT_BULK_CHUNK):
+            chunk = unique[offset:offset + SENTIMENT_BULK_CHUNK]
+            scored = await loop.run_in_executor(self.executor, self._score_sentiment_batch, chunk)
+            for text, result in zip(chunk, scored):
+                if use_cache:
+                    self._add_to_cache(self.sentiment_cache, self._get_cache_key(text, "sentiment"), result)
+                for index in pending[text]:
+                    results[index] = result
+        return results
+
+    def _score_sentiment_batch(self, texts: List[str]) -> List[Dict]:
+        """Score texts on the calling thread (the executor); one result per text"""
+        return [self._score_sentiment(text) for text in texts]
+
+    def _score_sentiment(self, text: str) -> Dict:
+        """VADER scores, TextBlob polarity without VADER, neutral if both fail"""
         try:
-            # Check cache first
-            cache_key = self._get_cache_key(text, "sentiment")
-            cached_result = self._get_from_cache(self.sentiment_cache, cache_key)
-            if cached_result:
-                logger.info(f"Sentiment analysis cache hit for text: {text[:50]}...")
-                return cached_result
-            
             if self.sentiment_analyzer:
                 scores = self.sentiment_analyzer.polarity_scores(text)
                 
@@ -269,56 +600,44 @@ class MLService:
                 else:
                     sentiment = "neutral"
                 
-                result = {
+                return {
                     "sentiment": sentiment,
                     "confidence": abs(scores['compound']),
                     "scores": scores,
                     "model_used": "vader"
                 }
-                self._add_to_cache(self.sentiment_cache, cache_key, result)
-                return result
-            else:
-                # Fallback using TextBlob
-                try:
-                    blob = TextBlob(text)
-                    polarity = blob.sentiment.polarity
-                    
-                    if polarity > 0.1:
-                        sentiment = "positive"
-                    elif polarity < -0.1:
-                        sentiment = "negative"
-                    else:
-                        sentiment = "neutral"
-                    
-                    result = {
-                        "sentiment": sentiment,
-                        "confidence": abs(polarity),
-                        "scores": {"compound": polarity},
-                        "model_used": "textblob"
-                    }
-                    self._add_to_cache(self.sentiment_cache, cache_key, result)
-                    return result
-                except Exception as textblob_error:
-                    logger.warning(f"TextBlob sentiment analysis failed: {textblob_error}")
-                    result = {
-                        "sentiment": "neutral",
-                        "confidence": 0.1,
-                        "scores": {"compound": 0},
-                        "model_used": "fallback"
-                    }
-                    self._add_to_cache(self.sentiment_cache, cache_key, result)
-                    return result
-                    
+
+            # Fallback using TextBlob
+            try:
+                from textblob import TextBlob
+                blob = TextBlob(text)
+                polarity = blob.sentiment.polarity
+                
+                if polarity > 0.1:
+                    sentiment = "positive"
+                elif polarity < -0.1:
+                    sentiment = "negative"
+                else:
+                    sentiment = "neutral"
+                
+                return {
+                    "sentiment": sentiment,
+                    "confidence": abs(polarity),
+                    "scores": {"compound": polarity},
+                    "model_used": "textblob"
+                }
+            except Exception as textblob_error:
+                logger.warning(f"TextBlob sentiment analysis failed: {textblob_error}")
+                return {
+                    "sentiment": "neutral",
+                    "confidence": 0.1,
+                    "scores": {"compound": 0},
+                    "model_used": "fallback"
+                }
+                
         except Exception as e:
             logger.error(f"Error in sentiment analysis: {e}")
-            result = {
-                "sentiment": "neutral",
-                "confidence": 0.1,
-                "scores": {"compound": 0},
-                "model_used": "error_fallback"
-            }
-            self._add_to_cache(self.sentiment_cache, cache_key, result)
-            return result
+            return dict(SENTIMENT_ERROR_FALLBACK)
 
     def _detect_crisis_keywords(self, text: str) -> bool:
         """Detect crisis keywords in text"""
@@ -343,11 +662,11 @@ class MLService:
 
     def _calculate_confidence(self, emotions: Dict[str, float], model_used: str) -> float:
         """Calculate confidence score for emotion analysis"""
-        if model_used == "ml_model":
+        if model_used in ("ml_model", "ml_model_remote", "ml_model_priority", "ml_model_remote_priority"):
             # Higher confidence for ML model predictions
             max_emotion_score = max(emotions.values()) if emotions else 0
             return min(max_emotion_score * 1.2, 1.0)  # Boost ML confidence slightly
-        elif model_used == "rule_based":
+        elif model_used in ("rule_based", "rule_based_shed"):
             # Lower confidence for rule-based detection
             max_emotion_score = max(emotions.values()) if emotions else 0
             return max_emotion_score * 0.7
@@ -432,32 +751,29 @@ class MLService:
 
     async def get_coping_strategies(self, emotions: List[str]) -> List[Dict]:
         """Get appropriate coping strategies for given emotions"""
-        strategies = {
-            "anxiety": {
-                "name": "Box Breathing",
-                "description": "A simple breathing technique to reduce anxiety",
-                "instructions": "Breathe in for 4, hold for 4, breathe out for 4, hold for 4. Repeat 4 times."
-            },
-            "sadness": {
-                "name": "Gentle Self-Care",
-                "description": "Simple activities to nurture yourself",
-                "instructions": "Try a warm bath, listen to comforting music, or reach out to someone who cares about you."
-            },
-            "anger": {
-                "name": "Progressive Muscle Relaxation",
-                "description": "Release physical tension associated with anger",
-                "instructions": "Tense and release each muscle group, starting from your toes and working up to your head."
-            },
-            "stress": {
-                "name": "5-4-3-2-1 Grounding",
-                "description": "A grounding technique to center yourself",
-                "instructions": "Name 5 things you see, 4 you can touch, 3 you hear, 2 you smell, and 1 you taste."
+        from services.coping_index import coping_index
+
+        return [
+            {
+                "name": strategy["name"],
+                "description": strategy["description"],
+                "instructions": strategy["instructions"]
             }
-        }
-        
-        return [strategies.get(emotion, strategies["stress"]) for emotion in emotions if emotion in strategies]
+            for strategy in coping_index.rank(emotions)
+        ]
 
     def __del__(self):
         """Cleanup executor on deletion"""
         if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=False)
\ No newline at end of file
+            self.executor.shutdown(wait=False)
+
+
+_ml_service: Optional[MLService] = None
+
+
+def get_ml_service() -> MLService:
+    """Process-wide MLService shared by the API routes and ChatService"""
+    global _ml_service
+    if _ml_service is None:
+        _ml_service = MLService()
+    return _ml_service
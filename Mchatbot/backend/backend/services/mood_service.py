@@ -5,8 +5,9 @@ from datetime import datetime, timedelta
 import json
 import statistics
 
-from models.database import get_db, MoodEntryModel
-from models.mood import MoodCreate, MoodEntry, MoodAnalytics, MoodTrend, MoodInsight
+from models.database import get_db, get_read_db, MoodEntryModel
+from models.archive import cold_store
+from models.mood import MoodCreate, MoodEntry, MoodAnalytics, MoodDashboard, MoodTrend, MoodInsight
 from utils.exceptions import CustomHTTPException
 from fastapi import status
 
@@ -64,9 +65,9 @@ class MoodService:
         finally:
             db.close()
 
-    async def get_mood_history(self, user_id: int, days: int = 30) -> List[MoodEntry]:
-        """Get mood history for specified number of days"""
-        db = next(get_db())
+    def _load_window(self, user_id: int, days: int) -> List[MoodEntry]:
+        """Entries of the last ``days`` days, newest first, with JSON columns decoded once"""
+        db = next(get_read_db())
         try:
             start_date = datetime.utcnow() - timedelta(days=days)
             
@@ -75,6 +76,7 @@ class MoodService:
                        .filter(MoodEntryModel.timestamp >= start_date)\
                        .order_by(desc(MoodEntryModel.timestamp))\
                        .all()
+            entries = cold_store.with_since(MoodEntryModel, user_id, entries, start_date)
             
             return [
                 MoodEntry(
@@ -97,75 +99,78 @@ class MoodService:
         finally:
             db.close()
 
+    async def get_mood_history(self, user_id: int, days: int = 30) -> List[MoodEntry]:
+        """Get mood history for specified number of days"""
+        return self._load_window(user_id, days)
+
     async def get_mood_analytics(self, user_id: int, days: int = 30) -> MoodAnalytics:
         """Generate comprehensive mood analytics"""
-        db = next(get_db())
-        try:
-            start_date = datetime.utcnow() - timedelta(days=days)
-            
-            entries = db.query(MoodEntryModel)\
-                       .filter(MoodEntryModel.user_id == user_id)\
-                       .filter(MoodEntryModel.timestamp >= start_date)\
-                       .all()
-            
-            if not entries:
-                return MoodAnalytics(
-                    current_average=0.0,
-                    trend="insufficient_data",
-                    mood_distribution={},
-                    emotion_frequency={},
-                    correlations={},
-                    insights=[],
-                    recommendations=[]
-                )
-            
-            # Calculate basic statistics
-            mood_scores = [entry.mood_score for entry in entries]
-            current_average = statistics.mean(mood_scores)
-            
-            # Calculate trend
-            trend = self._calculate_trend(entries)
-            
-            # Mood distribution
-            mood_distribution = self._calculate_mood_distribution(mood_scores)
-            
-            # Emotion frequency
-            emotion_frequency = self._calculate_emotion_frequency(entries)
-            
-            # Correlations with other factors
-            correlations = self._calculate_correlations(entries)
-            
-            # Generate insights
-            insights = self._generate_insights(entries, current_average, trend)
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(insights, correlations, emotion_frequency)
-            
+        history = self._load_window(user_id, days)
+        return self._build_analytics(history[::-1])
+
+    async def get_mood_dashboard(self, user_id: int, days: int = 30) -> MoodDashboard:
+        """History and analytics for the progress dashboard from a single window query"""
+        history = self._load_window(user_id, days)
+        return MoodDashboard(
+            days=days,
+            history=history,
+            analytics=self._build_analytics(history[::-1])
+        )
+
+    def _build_analytics(self, entries: List[MoodEntry]) -> MoodAnalytics:
+        """Analytics over decoded entries, oldest first"""
+        if not entries:
             return MoodAnalytics(
-                current_average=round(current_average, 2),
-                trend=trend,
-                mood_distribution=mood_distribution,
-                emotion_frequency=emotion_frequency,
-                correlations=correlations,
-                insights=insights,
-                recommendations=recommendations
+                current_average=0.0,
+                trend="insufficient_data",
+                mood_distribution={},
+                emotion_frequency={},
+                correlations={},
+                insights=[],
+                recommendations=[]
             )
-            
-        finally:
-            db.close()
+        
+        # Calculate basic statistics
+        mood_scores = [entry.mood_score for entry in entries]
+        current_average = statistics.mean(mood_scores)
+        
+        # Calculate trend
+        trend = self._calculate_trend(entries)
+        
+        # Mood distribution
+        mood_distribution = self._calculate_mood_distribution(mood_scores)
+        
+        # Emotion frequency
+        emotion_frequency = self._calculate_emotion_frequency(entries)
+        
+        # Correlations with other factors
+        correlations = self._calculate_correlations(entries)
+        
+        # Generate insights
+        insights = self._generate_insights(entries, current_average, trend, emotion_frequency)
+        
+        # Generate recommendations
+        recommendations = self._generate_recommendations(insights, correlations, emotion_frequency)
+        
+        return MoodAnalytics(
+            current_average=round(current_average, 2),
+            trend=trend,
+            mood_distribution=mood_distribution,
+            emotion_frequency=emotion_frequency,
+            correlations=correlations,
+            insights=insights,
+            recommendations=recommendations
+        )
 
-    def _calculate_trend(self, entries: List[MoodEntryModel]) -> str:
-        """Calculate mood trend over time"""
+    def _calculate_trend(self, entries: List[MoodEntry]) -> str:
+        """Calculate mood trend over time (entries oldest first)"""
         if len(entries) < 7:
             return "insufficient_data"
         
-        # Sort by timestamp
-        sorted_entries = sorted(entries, key=lambda x: x.timestamp)
-        
         # Split into two halves and compare averages
-        mid_point = len(sorted_entries) // 2
-        first_half = sorted_entries[:mid_point]
-        second_half = sorted_entries[mid_point:]
+        mid_point = len(entries) // 2
+        first_half = entries[:mid_point]
+        second_half = entries[mid_point:]
         
         first_avg = statistics.mean([e.mood_score for e in first_half])
         second_avg = statistics.mean([e.mood_score for e in second_half])
@@ -203,19 +208,17 @@ class MoodService:
         
         return distribution
 
-    def _calculate_emotion_frequency(self, entries: List[MoodEntryModel]) -> Dict[str, int]:
+    def _calculate_emotion_frequency(self, entries: List[MoodEntry]) -> Dict[str, int]:
         """Calculate frequency of different emotions"""
         emotion_count = {}
         
         for entry in entries:
-            if entry.emotions:
-                emotions = json.loads(entry.emotions)
-                for emotion in emotions:
-                    emotion_count[emotion] = emotion_count.get(emotion, 0) + 1
+            for emotion in entry.emotions:
+                emotion_count[emotion] = emotion_count.get(emotion, 0) + 1
         
         return emotion_count
 
-    def _calculate_correlations(self, entries: List[MoodEntryModel]) -> Dict[str, float]:
+    def _calculate_correlations(self, entries: List[MoodEntry]) -> Dict[str, float]:
         """Calculate correlations between mood and other factors"""
         correlations = {}
         
@@ -261,8 +264,8 @@ class MoodService:
         
         return round(numerator / denominator, 3)
 
-    def _generate_insights(self, entries: List[MoodEntryModel], average: float, trend: str) -> List[str]:
-        """Generate actionable insights from mood data"""
+    def _generate_insights(self, entries: List[MoodEntry], average: float, trend: str, emotion_count: Dict[str, int]) -> List[str]:
+        """Generate actionable insights from mood data (entries oldest first)"""
         insights = []
         
         # Trend insights
@@ -278,23 +281,14 @@ class MoodService:
             insights.append("Your recent mood levels suggest you might benefit from additional coping strategies.")
         
         # Pattern insights
-        recent_entries = sorted(entries, key=lambda x: x.timestamp)[-7:]  # Last week
+        recent_entries = entries[-7:]  # Last week
         if len(recent_entries) >= 5:
             recent_scores = [e.mood_score for e in recent_entries]
             if max(recent_scores) - min(recent_scores) > 5:
                 insights.append("You've experienced significant mood fluctuations recently.")
         
         # Emotion insights
-        all_emotions = []
-        for entry in entries:
-            if entry.emotions:
-                all_emotions.extend(json.loads(entry.emotions))
-        
-        if all_emotions:
-            emotion_count = {}
-            for emotion in all_emotions:
-                emotion_count[emotion] = emotion_count.get(emotion, 0) + 1
-            
+        if emotion_count:
             most_common = max(emotion_count, key=emotion_count.get)
             if emotion_count[most_common] > len(entries) * 0.3:
                 if most_common in self.emotion_categories["negative"]:
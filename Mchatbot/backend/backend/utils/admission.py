@@ -0,0 +1,95 @@
+import time
+from typing import Dict, Optional
+
+
+class AdmissionController:
+    """Decide when the emotion model is overloaded and requests should be shed.
+
+    Shedding starts when the inference queue depth or the smoothed (EWMA)
+    inference latency exceeds its threshold, and stops only once both are
+    back under ``recover_ratio`` of their thresholds, so the state does not
+    flap around a single boundary. While shedding, one request per
+    ``probe_interval`` is still admitted so latency keeps being measured and
+    the controller can recover on its own.
+
+    Which requests may be shed is the caller's decision; the controller only
+    counts the tier that served each one.
+    """
+
+    def __init__(
+        self,
+        max_queue_depth: int = 32,
+        max_latency_ms: float = 1500,
+        recover_ratio: float = 0.5,
+        probe_interval: float = 1.0,
+        ewma_alpha: float = 0.2
+    ):
+        self.max_queue_depth = max_queue_depth
+        self.max_latency = max_latency_ms / 1000
+        self.recover_ratio = recover_ratio
+        self.probe_interval = probe_interval
+        self.ewma_alpha = ewma_alpha
+
+        self.shedding = False
+        self.latency_ewma: Optional[float] = None
+        self._last_probe = 0.0
+        self._shedding_since: Optional[float] = None
+        self._last_queue_depth = 0
+
+        # Statistics
+        self.transitions = 0
+        self.counts: Dict[str, int] = {}
+
+    def observe(self, seconds: float):
+        """Record the latency of one model inference"""
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += self.ewma_alpha * (seconds - self.latency_ewma)
+
+    def _update_state(self, queue_depth: int):
+        self._last_queue_depth = queue_depth
+        latency = self.latency_ewma or 0.0
+        if not self.shedding:
+            if queue_depth > self.max_queue_depth or latency > self.max_latency:
+                self.shedding = True
+                self._shedding_since = time.monotonic()
+                self.transitions += 1
+        elif (queue_depth <= self.max_queue_depth * self.recover_ratio
+              and latency <= self.max_latency * self.recover_ratio):
+            self.shedding = False
+            self._shedding_since = None
+            self.transitions += 1
+
+    def should_shed(self, queue_depth: int) -> bool:
+        """True if a low-risk request should skip the model right now"""
+        self._update_state(queue_depth)
+        if not self.shedding:
+            return False
+
+        now = time.monotonic()
+        if now - self._last_probe >= self.probe_interval:
+            self._last_probe = now
+            self.record("probe")
+            return False
+        return True
+
+    def record(self, tier: str):
+        """Count a request served by ``tier``"""
+        self.counts[tier] = self.counts.get(tier, 0) + 1
+
+    def get_stats(self) -> Dict:
+        """Admission statistics"""
+        decided = sum(count for tier, count in self.counts.items() if tier != "probe")
+        shed = self.counts.get("shed", 0)
+        return {
+            "shedding": self.shedding,
+            "shedding_for_s": round(time.monotonic() - self._shedding_since, 1) if self._shedding_since else 0.0,
+            "queue_depth": self._last_queue_depth,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+            "max_queue_depth": self.max_queue_depth,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "transitions": self.transitions,
+            "tiers": dict(self.counts),
+            "shed_rate": round(shed / decided, 4) if decided else 0.0
+        }
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_QUEUE_WAIT_SECONDS = Histogram(
+    "batch_queue_wait_seconds", "Time items wait in a micro-batch queue", ["batcher"]
+)
+BATCH_SIZE = Histogram(
+    "batch_size", "Items per micro-batch", ["batcher"], buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+class BatchQueueFull(Exception):
+    """Raised when a MicroBatcher's queue is at capacity"""
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into batched executor calls.
+
+    Items submitted while a batch is running (or within ``max_wait_ms`` of
+    the first waiting item) are grouped, up to ``max_batch_size``, and passed
+    to ``process_batch`` on ``executor``. ``process_batch`` must return one
+    result per input, in order. ``name`` labels the batcher's metrics.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        executor: Executor,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 256,
+        name: str = "default"
+    ):
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._queue_wait_metric = BATCH_QUEUE_WAIT_SECONDS.labels(name)
+        self._batch_size_metric = BATCH_SIZE.labels(name)
+
+        # Statistics
+        self.batches = 0
+        self.items = 0
+        self.total_queue_wait = 0.0
+        self.total_batch_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise BatchQueueFull(f"batch queue full ({self.max_queue} items)")
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that timed out and cancelled their future need no work
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                self.total_queue_wait += started - queued_at
+                self._queue_wait_metric.observe(started - queued_at)
+            self._batch_size_metric.observe(len(batch))
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.process_batch, [item for item, _, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Batch processing failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.batches += 1
+                self.items += len(batch)
+                self.total_batch_seconds += time.perf_counter() - started
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def get_stats(self) -> Dict:
+        """Batching statistics"""
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "avg_queue_wait_ms": round(self.total_queue_wait / self.items * 1000, 2) if self.items else 0.0,
+            "avg_batch_ms": round(self.total_batch_seconds / self.batches * 1000, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,200 @@
+"""
+Event-loop blocking detector for development and staging.
+
+A heartbeat task on the event loop ticks every ``LOOP_WATCHDOG_INTERVAL_MS``.
+A watchdog thread checks the heartbeat; when the loop has not ticked for
+``LOOP_WATCHDOG_THRESHOLD_MS``, some callback is holding it, and the thread
+grabs the loop thread's current stack. That stack is logged (in full the
+first time a call site is seen) and the stall is charged to its call site:
+the innermost frame in this code base, i.e. the line of ours that made the
+blocking call (sync database session, bcrypt, VADER, TextBlob...), together
+with the innermost frame overall (what it was blocked in).
+
+``GET /api/admin/loop-blockers`` returns the offenders ranked by total time
+they held the loop. Sampling costs one thread wake-up per interval, but the
+stack grab and logging make this a staging tool: it is on by default only
+for ENVIRONMENT=development or staging (override with LOOP_WATCHDOG).
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from utils.profiler import BACKEND_DIR, short_path
+
+logger = logging.getLogger(__name__)
+
+# Unset or empty: on for development and staging
+LOOP_WATCHDOG = (
+    os.getenv("LOOP_WATCHDOG") or str(os.getenv("ENVIRONMENT", "production") in ("development", "staging"))
+).lower() == "true"
+LOOP_WATCHDOG_THRESHOLD_MS = float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", 100))
+LOOP_WATCHDOG_INTERVAL_MS = float(os.getenv("LOOP_WATCHDOG_INTERVAL_MS", 20))
+# Distinct call sites kept; further new sites are only counted in the totals
+LOOP_WATCHDOG_MAX_SITES = int(os.getenv("LOOP_WATCHDOG_MAX_SITES", 200))
+
+_OWN_FILES = (os.path.abspath(__file__), os.path.join(BACKEND_DIR, "utils", "profiler.py"))
+
+
+def _location(frame) -> str:
+    return f"{short_path(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def call_site(frame) -> Dict[str, str]:
+    """Innermost frame of ours (the blocking call) and innermost frame overall"""
+    leaf = _location(frame)
+    site = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (
+            filename.startswith(BACKEND_DIR + os.sep)
+            and filename not in _OWN_FILES
+            and "site-packages" not in filename
+        ):
+            site = _location(frame)
+            break
+        frame = frame.f_back
+    return {"site": site or leaf, "leaf": leaf}
+
+
+class LoopWatchdog:
+    """Heartbeat task plus watchdog thread; see the module docstring"""
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_WATCHDOG_THRESHOLD_MS,
+        interval_ms: float = LOOP_WATCHDOG_INTERVAL_MS,
+        max_sites: int = LOOP_WATCHDOG_MAX_SITES
+    ):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.max_sites = max_sites
+        self.offenders: Dict[str, Dict] = {}
+        self.stalls = 0
+        self.blocked_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start watching ``loop``; call from a coroutine running on it"""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self.started_at = time.time()
+        logger.info(f"Event-loop watchdog on: stalls over {self.threshold * 1000:.0f} ms are logged")
+
+    async def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        stalled_since = None  # heartbeat value when the current stall was caught
+        site = None
+        while not self._stop.wait(self.interval / 2):
+            last_beat = self._last_beat
+            if stalled_since is not None and last_beat != stalled_since:
+                # Loop is back: charge the whole stall to the site caught in it
+                self._finish(site, last_beat - stalled_since - self.interval)
+                stalled_since = site = None
+            if stalled_since is None and time.monotonic() - last_beat >= self.threshold + self.interval:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                stalled_since = last_beat
+                site = self._record(frame)
+                del frame
+
+    def _record(self, frame) -> Optional[str]:
+        located = call_site(frame)
+        with self._lock:
+            self.stalls += 1
+            entry = self.offenders.get(located["site"])
+            if entry is None:
+                if len(self.offenders) >= self.max_sites:
+                    return None
+                entry = self.offenders[located["site"]] = {
+                    "site": located["site"],
+                    "leaf": located["leaf"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_seen": None,
+                    "stack": [line.rstrip() for line in traceback.format_stack(frame)][-12:]
+                }
+                logger.warning(
+                    f"Event loop blocked at {located['site']} (in {located['leaf']}):\n" + "\n".join(entry["stack"])
+                )
+            else:
+                logger.warning(f"Event loop blocked at {located['site']} (seen {entry['count']} times before)")
+            entry["count"] += 1
+            entry["last_seen"] = datetime.utcnow().isoformat()
+        return located["site"]
+
+    def _finish(self, site: Optional[str], seconds: float):
+        seconds = max(seconds, self.threshold)
+        with self._lock:
+            self.blocked_seconds += seconds
+            entry = self.offenders.get(site) if site else None
+            if entry is not None:
+                entry["total_ms"] = round(entry["total_ms"] + seconds * 1000, 1)
+                entry["max_ms"] = round(max(entry["max_ms"], seconds * 1000), 1)
+
+    def reset(self):
+        with self._lock:
+            self.offenders.clear()
+            self.stalls = 0
+            self.blocked_seconds = 0.0
+
+    def get_report(self) -> Dict:
+        """Offenders ranked by total time they held the loop"""
+        with self._lock:
+            offenders: List[Dict] = sorted(
+                (dict(entry) for entry in self.offenders.values()),
+                key=lambda entry: (entry["total_ms"], entry["count"]),
+                reverse=True
+            )
+            return {
+                "enabled": self.running,
+                "threshold_ms": self.threshold * 1000,
+                "since": datetime.utcfromtimestamp(self.started_at).isoformat() if self.started_at else None,
+                "stalls": self.stalls,
+                "blocked_ms": round(self.blocked_seconds * 1000, 1),
+                "offenders": offenders
+            }
+
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,41 @@
+import os
+import resource
+from typing import Dict, Optional
+
+
+def get_memory_usage(pid: Optional[int] = None) -> Dict:
+    """Resident memory of a process, split into unique and shared pages (MiB).
+
+    ``unique`` is memory only this process maps (what it really costs per
+    worker), ``shared`` is memory also mapped by other processes, e.g.
+    model weights inherited copy-on-write from a pre-fork master. ``pss``
+    charges each shared page proportionally to the processes mapping it.
+    Falls back to peak RSS where /proc is unavailable.
+    """
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])  # kB
+    except OSError:
+        if pid != os.getpid():
+            return {"pid": pid, "available": False}
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+        return {"pid": pid, "available": False, "peak_rss_mb": round(peak / scale, 1)}
+
+    def mib(*keys):
+        return round(sum(fields.get(key, 0) for key in keys) / 1024, 1)
+
+    return {
+        "pid": pid,
+        "available": True,
+        "rss_mb": mib("Rss"),
+        "pss_mb": mib("Pss"),
+        "unique_mb": mib("Private_Clean", "Private_Dirty"),
+        "shared_mb": mib("Shared_Clean", "Shared_Dirty")
+    }
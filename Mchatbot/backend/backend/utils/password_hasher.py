@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# "process" keeps bcrypt off the GIL entirely, "thread" relies on the bcrypt
+# C extension releasing it, "inline" runs on the event loop (old behaviour).
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "process").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+# The first scheme hashes new passwords; the rest are still accepted but are
+# marked deprecated, so they get upgraded on the user's next login.
+PASSWORD_HASH_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt").split(",") if s.strip()]
+
+# Cost parameters, passed to passlib as "<scheme>__<setting>"
+PASSWORD_HASH_SETTINGS = {
+    "bcrypt__rounds": os.getenv("BCRYPT_ROUNDS"),
+    "argon2__time_cost": os.getenv("ARGON2_TIME_COST"),
+    "argon2__memory_cost": os.getenv("ARGON2_MEMORY_COST"),  # KiB
+    "argon2__parallelism": os.getenv("ARGON2_PARALLELISM"),
+}
+
+# Per-process context used by pool workers, built once from the parent's config
+_worker_context: Optional[CryptContext] = None
+
+
+def build_password_context(schemes: Optional[List[str]] = None, settings: Optional[Dict] = None) -> CryptContext:
+    """Build the passlib context from the configured schemes and cost settings.
+
+    Settings for schemes that are not enabled are ignored, and unset values
+    fall back to passlib's defaults.
+    """
+    schemes = schemes or PASSWORD_HASH_SCHEMES
+    settings = PASSWORD_HASH_SETTINGS if settings is None else settings
+    options = {
+        key: int(value)
+        for key, value in settings.items()
+        if value is not None and key.split("__", 1)[0] in schemes
+    }
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+def _init_worker(context_config: str):
+    global _worker_context
+    _worker_context = CryptContext.from_string(context_config)
+
+
+def _hash_in_worker(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _verify_in_worker(password: str, hashed_password: str) -> bool:
+    return _worker_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs passlib hashing on a bounded worker pool instead of the event loop.
+
+    At most ``max_workers`` hashes run at once; further callers wait on a
+    semaphore so the pool's own queue never grows, and the wait is recorded
+    in the queueing statistics returned by ``get_stats``.
+    """
+
+    def __init__(self, context: CryptContext, mode: str = PASSWORD_HASH_POOL, max_workers: int = PASSWORD_HASH_WORKERS):
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown password hash pool mode: {mode}")
+
+        self.context = context
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Queueing metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn avoids forking a process that already runs event-loop threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.context.to_string(),)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, process_func, thread_func, *args):
+        if self.mode == "inline":
+            return thread_func(*args)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.in_flight += 1
+        try:
+            func = process_func if self.mode == "process" else thread_func
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool"""
+        return await self._run(_hash_in_worker, self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the worker pool"""
+        return await self._run(_verify_in_worker, self.context.verify, password, hashed_password)
+
+    def get_stats(self) -> Dict:
+        """Queueing and throughput statistics"""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.total_run_seconds / self.completed * 1000, 2) if self.completed else 0.0
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
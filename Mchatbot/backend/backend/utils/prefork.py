@@ -0,0 +1,129 @@
+"""
+Pre-fork server: load models once in a master process, then fork workers.
+
+uvicorn's own multi-worker mode spawns fresh interpreters, so every worker
+imports the app and loads its own copy of the transformer weights. Here the
+master imports the app and preloads the models, freezes the GC so collector
+passes do not dirty the inherited object pages, and only then forks. The
+workers serve a shared listening socket and keep the weights as
+copy-on-write pages shared with the master and with each other.
+"""
+
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict
+
+import uvicorn
+
+from utils.memory import get_memory_usage
+
+logger = logging.getLogger(__name__)
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _load_app(app_path: str):
+    module_name, _, attr = app_path.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or "app")
+
+
+def _preload():
+    """Load everything worth sharing before fork"""
+    from models.database import dispose_engines, init_db
+    from services.ml_service import get_ml_service
+
+    init_db()
+    get_ml_service().preload()
+    # Connections must not be shared across processes; workers reconnect lazily
+    dispose_engines()
+
+
+def _start_worker(app, sock: socket.socket, uvicorn_kwargs: Dict) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: restore default signal handling so uvicorn can install its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    try:
+        config = uvicorn.Config(app, **uvicorn_kwargs)
+        uvicorn.Server(config).run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def log_worker_memory(pids, label: str = "Worker"):
+    """Log unique vs shared resident memory for each worker"""
+    for pid in pids:
+        usage = get_memory_usage(pid)
+        if usage.get("available"):
+            logger.info(
+                f"{label} {pid}: rss={usage['rss_mb']}MiB unique={usage['unique_mb']}MiB "
+                f"shared={usage['shared_mb']}MiB pss={usage['pss_mb']}MiB"
+            )
+
+
+def serve_prefork(app_path: str, host: str, port: int, workers: int, memory_report_interval: float = 0, **uvicorn_kwargs):
+    """Preload the app, fork ``workers`` uvicorn servers and supervise them"""
+    app = _load_app(app_path)
+    _preload()
+
+    # Move everything allocated so far out of the collector's reach
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket(host, port)
+    logger.info(f"Pre-fork master {os.getpid()} listening on {host}:{port} with {workers} workers")
+    log_worker_memory([os.getpid()], label="Master")
+
+    children = {_start_worker(app, sock, uvicorn_kwargs) for _ in range(workers)}
+    shutting_down = False
+
+    def handle_shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    next_report = time.monotonic() + memory_report_interval if memory_report_interval else None
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+
+        if pid:
+            children.discard(pid)
+            if not shutting_down:
+                logger.warning(f"Worker {pid} exited with status {status}; restarting")
+                children.add(_start_worker(app, sock, uvicorn_kwargs))
+            continue
+
+        if next_report is not None and time.monotonic() >= next_report:
+            log_worker_memory(sorted(children))
+            next_report = time.monotonic() + memory_report_interval
+        time.sleep(0.5)
+
+    sock.close()
+    logger.info("Pre-fork master exiting")
@@ -0,0 +1,207 @@
+"""
+On-demand sampling profiler for a running worker.
+
+While a profile runs, a background thread snapshots the stack of every
+thread in the process (``sys._current_frames``) every ``PROFILE_INTERVAL_MS``
+and counts identical stacks. The result is in collapsed-stack format
+("root;caller;callee count" per line), which flamegraph.pl, speedscope and
+inferno read directly. Each stack is rooted at its thread name.
+
+At the same time a task on the event loop sleeps for one interval at a time
+and records how late it wakes up: that delay is event-loop lag, time in
+which a callback held the loop (sync SQLAlchemy, bcrypt, model calls...).
+Samples of the loop thread taken while the loop is stalled by more than
+``LOOP_LAG_THRESHOLD_MS`` are rooted at "event-loop (blocked)" instead of
+"event-loop", so the flame graph shows exactly what blocked it.
+
+Started from ``GET /api/admin/profile`` (admin token) or by sending SIGUSR2
+to the worker, which writes ``PROFILE_SIGNAL_SECONDS`` of profile to
+``PROFILE_OUTPUT_DIR``.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 10))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", 30))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "./profiles")
+# Loop wake-ups later than this count as the loop being blocked
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", 50))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOOP_THREAD = "event-loop"
+
+
+def short_path(filename: str) -> str:
+    """Path relative to the backend or site-packages, for readable frames"""
+    if filename.startswith(BACKEND_DIR + os.sep):
+        return filename[len(BACKEND_DIR) + 1:]
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        return filename[marker + len("site-packages") + 1:]
+    return os.path.basename(filename)
+
+
+def frame_label(code) -> str:
+    # The function's first line rather than the current line, so samples in
+    # different lines of one function merge into one flame graph box
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def stack_labels(frame) -> List[str]:
+    """Frame labels from the outermost call to ``frame``"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def lag_summary(lags: List[float], threshold_ms: float = LOOP_LAG_THRESHOLD_MS) -> Dict:
+    """Percentiles of loop lag (seconds) in ms, plus the blocked count and time"""
+    if not lags:
+        return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "blocked": 0, "blocked_ms": 0.0}
+    ordered = sorted(lags)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 2)
+
+    blocked = [lag for lag in lags if lag * 1000 >= threshold_ms]
+    return {
+        "samples": len(lags),
+        "p50_ms": pct(50),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "blocked": len(blocked),
+        "blocked_ms": round(sum(blocked) * 1000, 1)
+    }
+
+
+class SamplingProfiler:
+    """One profile at a time per process; see the module docstring"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, lag_threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval = interval_ms / 1000
+        self.lag_threshold = lag_threshold_ms / 1000
+        self._lock = threading.Lock()
+        self.running = False
+        self.profiles = 0
+
+    async def profile(self, seconds: float) -> Dict:
+        """Sample for ``seconds``; returns collapsed stacks and loop lag stats
+
+        Raises RuntimeError when a profile is already running.
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("a profile is already running")
+            self.running = True
+        try:
+            return await self._run(seconds)
+        finally:
+            self.running = False
+
+    async def _run(self, seconds: float) -> Dict:
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        lags: List[float] = []
+        # Monotonic time the loop last woke up, read by the sampler thread
+        heartbeat = [time.monotonic()]
+        stop = threading.Event()
+
+        sampler = threading.Thread(
+            target=self._sample, args=(loop_thread, heartbeat, stop, stacks), name="profiler", daemon=True
+        )
+        started = time.monotonic()
+        sampler.start()
+        try:
+            deadline = loop.time() + seconds
+            while loop.time() < deadline:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lags.append(max(0.0, loop.time() - expected))
+                heartbeat[0] = time.monotonic()
+        finally:
+            stop.set()
+            await loop.run_in_executor(None, sampler.join)
+
+        self.profiles += 1
+        return {
+            "pid": os.getpid(),
+            "seconds": round(time.monotonic() - started, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(stacks.values()),
+            "collapsed": "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+            "loop_lag": lag_summary(lags, self.lag_threshold * 1000)
+        }
+
+    def _sample(self, loop_thread: int, heartbeat: List[float], stop: threading.Event, stacks: Counter):
+        own = threading.get_ident()
+        stall_after = self.interval + self.lag_threshold
+        while not stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            blocked = time.monotonic() - heartbeat[0] > stall_after
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident == loop_thread:
+                    root = f"{LOOP_THREAD} (blocked)" if blocked else LOOP_THREAD
+                else:
+                    root = names.get(ident, f"thread-{ident}")
+                stacks[";".join([root] + stack_labels(frame))] += 1
+
+    def get_stats(self) -> Dict:
+        return {"running": self.running, "profiles": self.profiles, "interval_ms": self.interval * 1000}
+
+
+profiler = SamplingProfiler()
+
+_signal_tasks = set()
+
+
+async def profile_to_file(seconds: float = PROFILE_SIGNAL_SECONDS, output_dir: str = PROFILE_OUTPUT_DIR) -> Optional[str]:
+    """Profile this worker and write <dir>/profile-<pid>-<time>.collapsed (+ .loop_lag.json)"""
+    try:
+        result = await profiler.profile(seconds)
+    except RuntimeError as e:
+        logger.warning(f"Profile not started: {e}")
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"profile-{result['pid']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        f.write(result["collapsed"])
+    with open(base + ".loop_lag.json", "w", encoding="utf-8") as f:
+        json.dump({key: value for key, value in result.items() if key != "collapsed"}, f, indent=2)
+    logger.info(f"Wrote {result['samples']} profile samples to {base}.collapsed (loop lag {result['loop_lag']})")
+    return base + ".collapsed"
+
+
+def install_signal_handler(loop: asyncio.AbstractEventLoop, signum: int = getattr(signal, "SIGUSR2", 0)):
+    """Profile for PROFILE_SIGNAL_SECONDS whenever the worker receives ``signum``"""
+    if not signum:
+        return
+
+    def handle():
+        task = loop.create_task(profile_to_file())
+        _signal_tasks.add(task)
+        task.add_done_callback(_signal_tasks.discard)
+
+    try:
+        loop.add_signal_handler(signum, handle)
+    except (NotImplementedError, RuntimeError, ValueError) as e:
+        # Windows loops, or not the main thread
+        logger.info(f"Profiler signal handler not installed: {e}")
@@ -3,8 +3,11 @@ import logging
 from typing import Dict, Optional, Tuple
 from collections import defaultdict
 import asyncio
+from functools import wraps
 from fastapi import HTTPException, status
 
+from utils.metrics import Counter
+
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
@@ -25,7 +28,7 @@ class RateLimiter:
         # Rate limit configurations (requests per minute)
         self.limits = {
             "auth": {"login": 5, "register": 3},  # 5 login attempts, 3 registrations per minute
-            "chat": {"message": 30},  # 30 messages per minute
+            "chat": {"message": 30, "analytics": 20},  # 30 messages, 20 trend requests per minute
             "mood": {"entry": 10, "analytics": 20},  # 10 mood entries, 20 analytics requests per minute
             "default": 60  # 60 requests per minute for other endpoints
         }
@@ -137,9 +140,16 @@ class RateLimiter:
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ["endpoint", "action"]
+)
+
 def rate_limit(endpoint: str, action: str = "default"):
     """Decorator for rate limiting endpoints"""
     def decorator(func):
+        rejections = RATE_LIMIT_REJECTIONS.labels(endpoint, action)
+
+        @wraps(func)
         async def wrapper(*args, **kwargs):
             # Extract user_id from request if available
             user_id = None
@@ -150,6 +160,7 @@ def rate_limit(endpoint: str, action: str = "default"):
             
             # Check rate limit
             if not await rate_limiter.check_rate_limit(user_id, endpoint, action):
+                rejections.inc()
                 remaining = rate_limiter.get_remaining_requests(user_id, endpoint, action)
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1,17 +1,97 @@
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import hmac
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-SECRET_KEY = "your-secret-key-change-in-production"
-ALGORITHM = "HS256"
+# Single source of truth for token signing configuration
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30 * 24 * 60))  # 30 days
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+# Shared secret for /api/admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+class TokenVerifier:
+    """JWT verifier with a bounded cache of already-verified tokens.
+
+    Entries are keyed by a SHA-256 digest of the token (the raw token is never
+    stored) and expire at the token's own ``exp`` claim, so a cached token is
+    never accepted past the point where ``jwt.decode`` would reject it.
+    """
+
+    def __init__(self, secret_key: str = SECRET_KEY, algorithm: str = ALGORITHM, max_cache_size: int = TOKEN_CACHE_SIZE):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_cache_size = max_cache_size
+        self._cache: "OrderedDict[bytes, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, token: str) -> Dict:
+        """Return the verified payload for a token, raising JWTError if invalid"""
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if now < expires_at:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return dict(payload)
+                del self._cache[key]
+            self.misses += 1
+
+        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+
+        # Tokens without an expiry are verified every time rather than cached forever
+        expires_at = payload.get("exp")
+        if self.max_cache_size > 0 and isinstance(expires_at, (int, float)):
+            with self._lock:
+                self._cache[key] = (dict(payload), float(expires_at))
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_cache_size:
+                    self._cache.popitem(last=False)
+
+        return payload
+
+    def clear(self):
+        """Drop all cached verifications (e.g. after rotating the secret key)"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+
+# Shared verifier used by both REST and WebSocket authentication
+token_verifier = TokenVerifier()
+
 
 def verify_token(token: str) -> int:
     """Verify JWT token and return user ID"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_verifier.decode(token)
         user_id: str = payload.get("sub")
         
         if user_id is None:
@@ -43,4 +123,11 @@ def create_token_data(user_id: int, email: str) -> dict:
     return {
         "sub": str(user_id),
         "email": email
-    }
\ No newline at end of file
+    }
+
+def verify_admin_token(token: Optional[str]):
+    """Check the X-Admin-Token header; admin endpoints 404 when ADMIN_TOKEN is unset"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
@@ -0,0 +1,214 @@
+"""
+Lightweight span tracing for chat turns.
+
+A turn is wrapped in ``trace(...)`` and its stages in ``span(...)``; spans
+nest through a context variable, so stages deep in a service attach to the
+turn that awaits them without passing anything around. Outside a trace,
+``span`` is a shared no-op.
+
+Finished traces are written as OTLP/JSON lines (the OpenTelemetry
+collector's file exporter format, readable by its ``otlpjsonfile``
+receiver) to ``TRACE_EXPORT_PATH`` when the turn took at least
+``TRACE_SLOW_MS`` or was picked by ``TRACE_SAMPLE_RATE``. With
+``TRACE_SERVER_TIMING=true`` the stage breakdown is also returned to the
+client (``Server-Timing`` header, ``server_timing`` field on WebSocket
+replies).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "./traces.jsonl")
+# Turns at least this slow are always exported
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", 1000))
+# Fraction of the remaining turns exported anyway
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+TRACE_SERVER_TIMING = os.getenv("TRACE_SERVER_TIMING", "false").lower() == "true"
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "mchatbot-api")
+
+_STATUS_ERROR = 2
+
+
+def _attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: str, attributes: Dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_otlp(self, trace_id: str) -> Dict:
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()]
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": _STATUS_ERROR, "message": self.error}
+        return span
+
+
+class Trace:
+    """Spans of one chat turn"""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, "", attributes)
+        self.spans: List[Span] = [self.root]
+
+    def set_attribute(self, key: str, value):
+        self.root.set_attribute(key, value)
+
+    def server_timing(self) -> str:
+        """Finished stages and the elapsed total as a Server-Timing header value"""
+        metrics = [
+            f"{span.name};dur={span.duration_ms:.1f}"
+            for span in self.spans[1:] if span.end_ns
+        ]
+        metrics.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(metrics)
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Milliseconds per finished stage (repeated stages are summed)"""
+        timings: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            if span.end_ns:
+                timings[span.name] = round(timings.get(span.name, 0.0) + span.duration_ms, 2)
+        timings["total"] = round(self.root.duration_ms, 2)
+        return timings
+
+    def to_otlp(self) -> Dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "mchatbot.tracing"},
+                    "spans": [span.to_otlp(self.trace_id) for span in self.spans]
+                }]
+            }]
+        }
+
+
+class _NoopTrace:
+    def set_attribute(self, key: str, value):
+        pass
+
+    def server_timing(self) -> str:
+        return ""
+
+    def stage_timings(self) -> Dict[str, float]:
+        return {}
+
+
+_NOOP_TRACE = _NoopTrace()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class FileExporter:
+    """Appends traces as OTLP/JSON lines"""
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.exported = 0
+
+    def export(self, finished: Trace):
+        line = json.dumps(finished.to_otlp(), separators=(",", ":"))
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.exported += 1
+        except OSError as e:
+            logger.warning(f"Failed to export trace {finished.trace_id}: {e}")
+
+
+exporter = FileExporter()
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Trace a chat turn; yields the Trace (a no-op one when tracing is off)"""
+    if not TRACING_ENABLED:
+        yield _NOOP_TRACE
+        return
+
+    current = Trace(name, attributes)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(current.root)
+    try:
+        yield current
+    except BaseException as e:
+        current.root.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        current.root.end_ns = time.time_ns()
+        duration_ms = current.root.duration_ms
+        if duration_ms >= TRACE_SLOW_MS:
+            logger.warning(f"Slow chat turn ({duration_ms:.0f} ms, trace {current.trace_id}): {current.server_timing()}")
+            exporter.export(current)
+        elif TRACE_SAMPLE_RATE and random.random() < TRACE_SAMPLE_RATE:
+            exporter.export(current)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a stage of the current trace; does nothing outside a trace"""
+    current = _current_trace.get()
+    if current is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    child = Span(name, parent.span_id if parent is not None else current.root.span_id, attributes)
+    current.spans.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end_ns = time.time_ns()
@@ -0,0 +1,92 @@
+import json
+import logging
+from typing import Dict, Optional, Tuple, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+class JSONCodec:
+    """Text frames carrying compact JSON (the default wire format)"""
+
+    name = "json"
+    binary = False
+
+    def encode(self, message: Dict) -> str:
+        return json.dumps(message, separators=(",", ":"), default=str)
+
+    def decode(self, data: Union[str, bytes]) -> Dict:
+        return json.loads(data)
+
+
+class MessagePackCodec:
+    """Binary frames carrying MessagePack with single-precision floats"""
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, message: Dict) -> bytes:
+        # Emotion scores never need more than float32 precision, which halves
+        # the size of every float in the emotion_analysis payload.
+        return msgpack.packb(message, use_bin_type=True, use_single_float=True, default=str)
+
+    def decode(self, data: Union[str, bytes]) -> Dict:
+        if isinstance(data, str):
+            return json.loads(data)
+        return msgpack.unpackb(data, raw=False)
+
+
+JSON_CODEC = JSONCodec()
+MSGPACK_CODEC = MessagePackCodec() if msgpack is not None else None
+
+
+def negotiate_codec(websocket: WebSocket) -> Tuple[Union[JSONCodec, MessagePackCodec], Optional[str]]:
+    """Pick the frame codec for a connection.
+
+    Clients opt into MessagePack either by offering the ``msgpack``
+    subprotocol or with ``?encoding=msgpack`` on the URL. Returns the codec
+    and the subprotocol to echo back on accept (if any).
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    requested = websocket.query_params.get("encoding", "json").lower()
+
+    if MSGPACK_SUBPROTOCOL in offered or requested == MessagePackCodec.name:
+        if MSGPACK_CODEC is None:
+            logger.warning("Client requested msgpack but msgpack is not installed; using JSON")
+            return JSON_CODEC, None
+        subprotocol = MSGPACK_SUBPROTOCOL if MSGPACK_SUBPROTOCOL in offered else None
+        return MSGPACK_CODEC, subprotocol
+
+    return JSON_CODEC, None
+
+
+async def send_message(websocket: WebSocket, codec, message: Dict):
+    """Encode and send a single frame"""
+    await send_encoded(websocket, codec, codec.encode(message))
+
+
+async def send_encoded(websocket: WebSocket, codec, payload: Union[str, bytes]):
+    """Send an already-encoded frame"""
+    if codec.binary:
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+
+async def receive_message(websocket: WebSocket, codec) -> Dict:
+    """Receive and decode a frame, accepting both text and binary frames"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("bytes") is not None:
+        return codec.decode(message["bytes"])
+    return JSON_CODEC.decode(message["text"])
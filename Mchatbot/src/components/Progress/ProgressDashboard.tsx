@@ -17,12 +17,9 @@ const ProgressDashboard: React.FC = () => {
 
   const loadData = async () => {
     try {
-      const [entriesData, analyticsData] = await Promise.all([
-        request(`/api/mood/history?days=${timeRange}`),
-        request(`/api/mood/analytics?days=${timeRange}`)
-      ]);
-      setMoodEntries(entriesData);
-      setAnalytics(analyticsData);
+      const dashboard = await request(`/api/mood/dashboard?days=${timeRange}`);
+      setMoodEntries(dashboard.history);
+      setAnalytics(dashboard.analytics);
     } catch (error) {
       console.error('Failed to load progress data:', error);
     }